@@ -10,12 +10,16 @@ import threading
 import time
 from typing import Dict
 
-from actuators.led_strip import scan_led_devices, LedThread
+from actuators.led_strip import scan_led_devices, probe_led_device, LedThread
 from actuators.metamotion import scan_metamotion_devices, MetaMotionThread
 from actuators.speaker import scan_speaker_devices, SpeakerThread
 from utils.logger import log_system
-from utils.lock import device_scan_lock
-from utils.config import get_speaker_config, get_metamotion_config, get_led_strip_config
+from utils import tracing
+from utils.lock import radio_lock
+from utils.config import (
+    get_speaker_config, get_metamotion_config, get_led_strip_config, get_device_registry_config, get_startup_config
+)
+from utils.device_registry import get_device_registry, RegistryRefresher
 
 class ActuatorManager:
     """
@@ -25,6 +29,10 @@ class ActuatorManager:
     Provides a unified interface for triggering action on any actuator.
     """
 
+    KINDS = ("speaker", "metamotion", "led")
+    _ADDRESSES = {"speaker": "speaker_addresses", "metamotion": "metamotion_addresses", "led": "led_addresses"}
+    _PREFIX = {"speaker": "speaker", "metamotion": "meta", "led": "led"}
+
     def __init__(self):
         self.actuators: Dict[str, threading.Thread] = {}
         self.speaker_addresses = []
@@ -33,65 +41,206 @@ class ActuatorManager:
         self.speaker_enable = {}
         self.meta_enable = {}
         self.led_enable = {}
+        self.registry = get_device_registry()
+        self.refresher = None
+        self._skipped_scans = []
+        self._started: Dict[str, float] = {}    # actuator id -> thread start (epoch seconds)
+        self._on_added = None
+        self._on_removed = None
+        self._lock = threading.Lock()
+        self._load_enables()
         log_system("[ActuatorManager] Initialized")
 
-    def scan_actuators(self):
-        """
-        Scan wanted (from config.yaml) actuator devices and store their addresses.
-        """
-        log_system("[ActuatorManager] Scanning for all actuator devices...")
+    def _load_enables(self):
         self.speaker_enable = (get_speaker_config() or {}).get("enable", True)
         self.meta_enable = (get_metamotion_config() or {}).get("enable", True)
         self.led_enable = (get_led_strip_config() or {}).get("enable", True)
 
-        if self.speaker_enable:
-            with device_scan_lock:
-                self.speaker_addresses = scan_speaker_devices(5) or []
-        if self.meta_enable:
-            with device_scan_lock:
-                self.metamotion_addresses = scan_metamotion_devices(5) or []
-        if self.led_enable:
-            with device_scan_lock:
-                self.led_addresses = scan_led_devices(10) or []
+    def is_enabled(self, kind: str) -> bool:
+        return bool({"speaker": self.speaker_enable, "metamotion": self.meta_enable, "led": self.led_enable}[kind])
+
+    def set_actuator_listener(self, callback, removed=None):
+        """
+        callback(actuator_id) is called for every actuator thread started from now on
+        (actuators attaching to a running system, see core/startup.py), removed(actuator_id) for every
+        actuator dropped by the registry refresh (known device that neither connected nor was found again).
+        """
+        self._on_added = callback
+        self._on_removed = removed
+
+    def scan_actuators(self, no_registry=()):
+        """
+        Collects wanted (from config.yaml) actuator devices and stores their addresses.
+        Kinds with devices in the device registry are not scanned: their known addresses are used directly
+        and the scan runs later in the background (RegistryRefresher): early for a kind whose known devices did
+        not all connect, new devices found are started, known ones neither connected nor found are forgotten.
+        Kinds in no_registry are always scanned now (see scan_kind).
+        """
+        log_system("[ActuatorManager] Scanning for all actuator devices...")
+        self._load_enables()
+        for kind in self.KINDS:
+            self.scan_kind(kind, use_registry=kind not in no_registry)
+        self.start_refresher()
+
+    def scan_kind(self, kind: str, use_registry: bool = True) -> list:
+        """
+        Addresses of one actuator kind ("speaker", "metamotion", "led"), from the registry or a scan.
+        use_registry False always scans now (no background refresh later), e.g. for a kind sharing the
+        BlueCoin adapter that must not scan while the BlueCoins stream.
+        """
+        if not self.is_enabled(kind):
+            return []
+        if kind == "speaker":
+            addresses = self._known("speaker", "speakers") if use_registry else []
+            scan, label = self._scan_speakers, "speakers"
+        elif kind == "metamotion":
+            addresses = self._known("metamotion", "MetaMotion devices") if use_registry else []
+            scan, label = self._scan_metamotion, "MetaMotion devices"
+        else:
+            # LED strips get a new IP from DHCP now and then: only the ones answering are used
+            timeout = get_device_registry_config()["led_probe_timeout_s"]
+            known = self._known("led", "LED strips") if use_registry else []
+            addresses = [ip for ip in known if probe_led_device(ip, timeout)]
+            scan, label = self._scan_leds, "LED strips"
+        if addresses:
+            with self._lock:
+                self._skipped_scans.append((label, lambda: self._refresh_kind(kind, scan),
+                                            lambda: self._unconnected(kind)))
+        else:
+            addresses = scan()
+        setattr(self, self._ADDRESSES[kind], addresses)
+        return addresses
+
+    def start_refresher(self):
+        """Runs the scans skipped thanks to the device registry in the background (once)."""
+        with self._lock:
+            if self.refresher is not None or not self._skipped_scans:
+                return
+            self.refresher = RegistryRefresher(self._skipped_scans)
+        self.refresher.start()
+
+    def _refresh_kind(self, kind: str, scan) -> None:
+        """
+        Background scan of a kind started from the registry: starts the threads of the devices found that are
+        not running yet, drops the known devices that did not connect and were not found (registry forget()).
+        """
+        missing = self._unconnected(kind)
+        found = scan()
+        attr = self._ADDRESSES[kind]
+        addresses = getattr(self, attr)
+        new = [a for a in found if a not in addresses]
+        if new:
+            log_system(f"[ActuatorManager] New {kind} device(s) found by the refresh: {new}")
+            setattr(self, attr, addresses + new)
+            self.initialize_kind(kind)
+        for address in missing:
+            if address not in found:
+                log_system(f"[ActuatorManager] Known {kind} {address} did not connect and was not found, "
+                           f"forgetting it", level="WARNING")
+                if self.registry is not None:
+                    self.registry.forget(kind, address)
+                self._remove(kind, address)
+
+    def _unconnected(self, kind: str) -> list:
+        """Addresses of this kind whose thread started but has not connected since (registry last_seen)."""
+        if self.registry is None:
+            return []
+        prefix = self._PREFIX[kind]
+        return [a for a in getattr(self, self._ADDRESSES[kind])
+                if f"{prefix}_{a}" in self._started
+                and not self.registry.seen_since(kind, a, self._started[f"{prefix}_{a}"])]
+
+    def _remove(self, kind: str, address: str) -> None:
+        actuator_id = f"{self._PREFIX[kind]}_{address}"
+        attr = self._ADDRESSES[kind]
+        setattr(self, attr, [a for a in getattr(self, attr) if a != address])
+        self._started.pop(actuator_id, None)
+        thread = self.actuators.pop(actuator_id, None)
+        if self._on_removed is not None:
+            try:
+                self._on_removed(actuator_id)
+            except Exception as e:
+                log_system(f"[ActuatorManager] Actuator listener error for {actuator_id}: {e}", level="ERROR")
+        if thread is not None:
+            try:
+                thread.stop()
+                log_system(f"[ActuatorManager] Stopped actuator: {actuator_id}")
+            except Exception as e:
+                log_system(f"[ActuatorManager] Error stopping actuator {actuator_id}: {e}", level="ERROR")
+
+    def _known(self, kind: str, label: str) -> list:
+        """Addresses of the devices of this kind in the device registry."""
+        if self.registry is None:
+            return []
+        addresses = list(self.registry.known(kind))
+        if addresses:
+            log_system(f"[ActuatorManager] Known {label} from the device registry: {addresses}, scan skipped")
+        return addresses
+
+    def _scan_speakers(self) -> list:
+        with radio_lock(get_startup_config()["radios"]["speaker"]):
+            addresses = scan_speaker_devices(5) or []
+        self._record("speaker", addresses)
+        return addresses
+
+    def _scan_metamotion(self) -> list:
+        with radio_lock(get_startup_config()["radios"]["metamotion"]):
+            addresses = scan_metamotion_devices(5) or []
+        self._record("metamotion", addresses)
+        return addresses
+
+    def _scan_leds(self) -> list:
+        with radio_lock(get_startup_config()["radios"]["led"]):
+            addresses = scan_led_devices(10) or []
+        self._record("led", addresses)
+        return addresses
+
+    def _record(self, kind: str, addresses: list) -> None:
+        if self.registry is not None:
+            self.registry.record(kind, {a: {} for a in addresses})
 
     def initialize_actuators(self):
         """
         Initializes all actuator threads using previously scanned addresses.
         """
         log_system("[ActuatorManager] Initializing all actuator devices...")
+        for kind in self.KINDS:
+            self.initialize_kind(kind)
+        log_system("[ActuatorManager] Initialization complete")
 
-        if self.speaker_enable:
-            for mac in self.speaker_addresses:
-                try:
-                    actuator_id = f"speaker_{mac}"
-                    thread = SpeakerThread(mac)
-                    thread.start()
-                    self.actuators[actuator_id] = thread
-                    log_system(f"[ActuatorManager] Speaker initialized: {actuator_id}")
-                except Exception as e:
-                    log_system(f"[ActuatorManager] Speaker {mac} initialization failed: {e}", level="ERROR")
-        if self.meta_enable:
-            for mac in self.metamotion_addresses:
-                try:
-                    actuator_id = f"meta_{mac}"
-                    thread = MetaMotionThread(mac)
-                    thread.start()
-                    self.actuators[actuator_id] = thread
-                    log_system(f"[ActuatorManager] MetaMotion initialized: {actuator_id}")
-                except Exception as e:
-                    log_system(f"[ActuatorManager] MetaMotion {mac} initialization failed: {e}", level="ERROR")
-        if self.led_enable:
-            for ip in self.led_addresses:
+    def initialize_kind(self, kind: str) -> list:
+        """
+        Starts the threads of one actuator kind from its scanned addresses. Returns the new actuator ids.
+        """
+        if not self.is_enabled(kind):
+            return []
+        if kind == "speaker":
+            addresses, prefix, thread_cls, label = self.speaker_addresses, "speaker", SpeakerThread, "Speaker"
+        elif kind == "metamotion":
+            addresses, prefix, thread_cls, label = self.metamotion_addresses, "meta", MetaMotionThread, "MetaMotion"
+        else:
+            addresses, prefix, thread_cls, label = self.led_addresses, "led", LedThread, "LED"
+        added = []
+        for address in addresses:
+            actuator_id = f"{prefix}_{address}"
+            if actuator_id in self.actuators:
+                continue
+            try:
+                thread = thread_cls(address)
+                self._started[actuator_id] = time.time()
+                thread.start()
+                self.actuators[actuator_id] = thread
+                added.append(actuator_id)
+                log_system(f"[ActuatorManager] {label} initialized: {actuator_id}")
+            except Exception as e:
+                log_system(f"[ActuatorManager] {label} {address} initialization failed: {e}", level="ERROR")
+                continue
+            if self._on_added is not None:
                 try:
-                    actuator_id = f"led_{ip}"
-                    thread = LedThread(ip)
-                    thread.start()
-                    self.actuators[actuator_id] = thread
-                    log_system(f"[ActuatorManager] LED initialized: {actuator_id}")
+                    self._on_added(actuator_id)
                 except Exception as e:
-                    log_system(f"[ActuatorManager] LED {ip} initialization failed: {e}", level="ERROR")
-
-        log_system("[ActuatorManager] Initialization complete")
+                    log_system(f"[ActuatorManager] Actuator listener error for {actuator_id}: {e}", level="ERROR")
+        return added
 
     def trigger(self, actuator_id: str, action_type: str, **kwargs):
         """
@@ -102,6 +251,10 @@ class ActuatorManager:
             action_type (str): Type of action to perform (currently unused, reserved for future)
             **kwargs: Additional parameters for the action.
         """
+        trace = tracing.current()
+        if trace is not None:
+            trace.mark("trigger")
+
         actuator = self.actuators.get(actuator_id)
 
         if not actuator:
@@ -121,6 +274,8 @@ class ActuatorManager:
                         return
 
             actuator.execute(**kwargs)
+            if trace is not None:
+                trace.mark("executed")
             log_system(f"[ActuatorManager] Triggered action on {actuator_id}: {kwargs}")
         except Exception as e:
             log_system(f"[ActuatorManager] Error triggering actuator {actuator_id}: {e}", level="ERROR")
@@ -137,6 +292,9 @@ class ActuatorManager:
         Stops all actuator threads and clears the registry.
         """
         log_system("[ActuatorManager] Stopping all actuator threads...")
+        if self.refresher is not None:
+            self.refresher.stop()
+            self.refresher = None
 
         for actuator_id, thread in self.actuators.items():
             try:
@@ -6,6 +6,7 @@
 # Repository: https://github.com/frarvo/STOPme
 # License: MIT
 
+import socket
 import threading
 import time
 from typing import Optional, Tuple, List
@@ -15,7 +16,10 @@ from flux_led import BulbScanner
 
 from utils.logger import log_system
 from utils.config import get_led_strip_config
-from utils.lock import device_reconnection_lock
+from utils.reconnect import get_reconnector
+from utils.device_registry import mark_seen
+
+LED_PORT = 5577  # flux_led control port
 
 # Device scanning function
 
@@ -51,6 +55,16 @@ def scan_led_devices(timeout: int = 5) -> List[str]:
 
     return ip_list
 
+def probe_led_device(ip_address: str, timeout: float = 1.0) -> bool:
+    """
+    Checks that a known LED strip still answers on its control port (no Wi-Fi scan).
+    """
+    try:
+        with socket.create_connection((ip_address, LED_PORT), timeout=timeout):
+            return True
+    except OSError:
+        return False
+
 #LedStripThread
 
 class LedThread(threading.Thread):
@@ -77,9 +91,8 @@ class LedThread(threading.Thread):
         self._bulb: Optional[flux_led.WifiLedBulb] = None
 
         cfg = get_led_strip_config()
-        self._fast_retry_attempts = int(cfg.get("fast_retry_attempts", 5))
         self._retry_interval = int(cfg.get("retry_interval", 5))
-        self._retry_sleep = int(cfg.get("retry_sleep", 60))
+        self._reconnector = get_reconnector("led", ip_address, cfg)
 
     def run(self) -> None:
         log_system(f"[LedStrip: {self.ip_address}] Thread started")
@@ -93,8 +106,7 @@ class LedThread(threading.Thread):
 
                 if self._disconnect_event.is_set():
                     self._disconnect_event.clear()
-                    with device_reconnection_lock:
-                        self._reconnection_attempts()
+                    self._reconnection_attempts()
 
                 if self._bulb:
                     self._process_action()
@@ -109,6 +121,8 @@ class LedThread(threading.Thread):
                 self._bulb.refreshState()
                 self._connection_feedback()
                 log_system(f"[LedStrip: {self.ip_address}] Connected successfully")
+                mark_seen("led", self.ip_address)
+                self._reconnector.mark_connected()
                 return
             except Exception as exc:
                 log_system(f"[LedStrip: {self.ip_address}] Connection error: {exc}", level="ERROR")
@@ -128,31 +142,17 @@ class LedThread(threading.Thread):
 
     def _reconnection_attempts(self) -> None:
         log_system(f"[LedStrip: {self.ip_address}] Starting reconnection attempts...")
-
-        for attempt in range(1, self._fast_retry_attempts + 1):
-            if self._stop_event.is_set():
-                return
-            if self._try_reconnect():
-                return
-            log_system(f"[LedStrip: {self.ip_address}] Fast retry {attempt}/{self._fast_retry_attempts} failed", level="WARNING")
-            time.sleep(self._retry_interval)
-
-        log_system(f"[LedStrip: {self.ip_address}] Switching to slow retries every {self._retry_sleep}s", level="WARNING")
-        while not self._stop_event.is_set():
-            if self._try_reconnect():
-                return
-            log_system(f"[LedStrip: {self.ip_address}] Slow retry failed", level="WARNING")
-            time.sleep(self._retry_sleep)
+        # Fast retries every retry_interval, then backing off up to retry_sleep (utils/reconnect.py)
+        if self._reconnector.reconnect(self._try_reconnect, self._stop_event):
+            self._connection_feedback()
 
     def _try_reconnect(self) -> bool:
-        try:
-            self._bulb = flux_led.WifiLedBulb(self.ip_address)
-            self._bulb.refreshState()
-            self._connection_feedback()
-            log_system(f"[LedStrip: {self.ip_address}] Reconnected successfully")
-            return True
-        except Exception:
-            return False
+        # Errors are recorded by the reconnector
+        self._bulb = flux_led.WifiLedBulb(self.ip_address)
+        self._bulb.refreshState()
+        log_system(f"[LedStrip: {self.ip_address}] Reconnected successfully")
+        mark_seen("led", self.ip_address)
+        return True
 
     def execute(
         self,
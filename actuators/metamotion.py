@@ -16,7 +16,9 @@ from utils.config import get_metamotion_config
 from utils.logger import log_system
 from bluepy.btle import Scanner
 
-from utils.lock import device_reconnection_lock
+from utils.reconnect import get_reconnector
+from utils.device_registry import mark_seen
+from utils.ble_discovery import get_ble_discovery, METAWEAR_NAME
 
 
 def scan_metamotion_devices(timeout: int) -> list[str]:
@@ -32,6 +34,16 @@ def scan_metamotion_devices(timeout: int) -> list[str]:
     cfg = get_metamotion_config() or {}
     timeout = int(cfg.get('scan_timeout',5)) if timeout is None else int(timeout)
 
+    discovery = get_ble_discovery()
+    if discovery is not None:
+        # Shared scan pass with the BlueCoins (utils/ble_discovery.py)
+        mac_list = list(discovery.take("metamotion", timeout).metawear)
+        for addr in mac_list:
+            log_system(f"[MetaMotion Scanner] Found MetaWear at {addr}")
+        if not mac_list:
+            log_system("[MetaMotion Scanner] No MetaWear devices found.", level="WARNING")
+        return mac_list
+
     log_system(f"[MetaMotion Scanner] Starting BLE scan for {timeout} seconds...")
     mac_list = []
     try:
@@ -43,7 +55,7 @@ def scan_metamotion_devices(timeout: int) -> list[str]:
 
     for dev in devices:
         name = dev.getValueText(9)  # 9 = Complete Local Name
-        if name == "MetaWear":
+        if name == METAWEAR_NAME:
             log_system(f"[MetaMotion Scanner] Found MetaWear at {dev.addr}")
             mac_list.append(dev.addr)
 
@@ -84,9 +96,8 @@ class MetaMotionThread(threading.Thread):
         self.vibration_lock = threading.Lock()
         cfg = get_metamotion_config() or {}
 
-        self.fast_retry_attempts = int(cfg.get("fast_retry_attempts", 10))
         self.retry_interval = int(cfg.get("retry_interval", 5))
-        self.retry_sleep = int(cfg.get("retry_sleep", 60))
+        self.reconnector = get_reconnector("metamotion", mac_address, cfg)
 
     def run(self):
         """
@@ -118,6 +129,8 @@ class MetaMotionThread(threading.Thread):
                 time.sleep(self.retry_interval)
 
         log_system(f"[MetaMotion: {addr}] Connected successfully")
+        mark_seen("metamotion", addr)
+        self.reconnector.mark_connected()
         self._connection_feedback()
 
     def _connection_feedback(self):
@@ -146,8 +159,7 @@ class MetaMotionThread(threading.Thread):
 
                 if self.disconnect_event.is_set():
                     self.disconnect_event.clear()
-                    with device_reconnection_lock:
-                        self._reconnection_attempts()
+                    self._reconnection_attempts()
 
                 if self.device and getattr(self.device, "is_connected", False):
                     self._process_vibration()
@@ -248,8 +260,8 @@ class MetaMotionThread(threading.Thread):
 
     def _reconnection_attempts(self):
         """
-        Attempts to reconnect to the MetaMotion device using a fast-retry strategy first, followed by
-        a slower retry loop until reconnection succeeds or stop_event is set.
+        Attempts to reconnect to the MetaMotion device, fast retries every retry_interval first, then backing off
+        up to retry_sleep (utils/reconnect.py), until reconnection succeeds or stop_event is set.
         :return:
         """
         log_system(f"[MetaMotion: {self.mac_address}] Starting reconnection procedure.")
@@ -258,36 +270,15 @@ class MetaMotionThread(threading.Thread):
         self.device = MetaWear(self.mac_address)
         self.device.on_disconnect = lambda status: self._on_disconnection(status)
 
-        # Phase 1: fast retries
-        for attempt in range(self.fast_retry_attempts):
-            if self.stop_event.is_set():
-                return
+        if self.reconnector.reconnect(self._try_reconnect, self.stop_event):
             try:
-                self.device.connect()
-                log_system(f"[MetaMotion: {self.mac_address}] Reconnected successfully.")
                 self._connection_feedback()
-                return
-            except Exception as e:
-                log_system(f"[MetaMotion: {self.mac_address}] Retry {attempt + 1}/{self.fast_retry_attempts} failed: {e}", level="ERROR")
-                for _ in range(self.retry_interval):
-                    if self.stop_event.is_set():
-                        return
-                    time.sleep(1)
-
-        # Phase 2: slow retries
-        log_system(f"[MetaMotion: {self.mac_address}] All fast retries failed. Sleeping for {self.retry_sleep}s before retrying.")
-        while not self.stop_event.is_set():
-            try:
-                self.device.connect()
-                log_system(f"[MetaMotion: {self.mac_address}] Reconnected successfully.")
-                try:
-                    self._connection_feedback()
-                except Exception:
-                    pass
-                return
-            except Exception as e:
-                log_system(f"[MetaMotion: {self.mac_address}] Slow retry failed: {e}", level="WARNING")
-                for _ in range(self.retry_interval):
-                    if self.stop_event.is_set():
-                        return
-                    time.sleep(1)
\ No newline at end of file
+            except Exception:
+                pass
+
+    def _try_reconnect(self) -> bool:
+        # Errors are recorded by the reconnector
+        self.device.connect()
+        log_system(f"[MetaMotion: {self.mac_address}] Reconnected successfully.")
+        mark_seen("metamotion", self.mac_address)
+        return True
@@ -14,7 +14,8 @@ from playsound import playsound
 from utils.logger import log_system
 from utils.config import get_speaker_config
 from utils.audio_paths import AudioLibrary
-from utils.lock import device_reconnection_lock
+from utils.reconnect import get_reconnector
+from utils.device_registry import mark_seen
 
 def scan_speaker_devices(timeout: int) -> list[str]:
     """
@@ -116,9 +117,7 @@ class SpeakerThread(threading.Thread):
         self.connected = False
         cfg = get_speaker_config() or {}
 
-        self.fast_retry_attempts = int(cfg.get("fast_retry_attempts", 5))
-        self.retry_interval = int(cfg.get("retry_interval", 5))
-        self.retry_sleep = int(cfg.get("retry_sleep", 60))
+        self.reconnector = get_reconnector("speaker", mac_address, cfg)
 
     def run(self):
         """
@@ -130,8 +129,7 @@ class SpeakerThread(threading.Thread):
             is_conn = self._is_connected()
             self.connected = is_conn
             if not is_conn:
-                with device_reconnection_lock:
-                    self._reconnection_attempts()
+                self._reconnection_attempts()
                 # Refresh status after each attempt
                 self.connected = self._is_connected()
 
@@ -195,6 +193,7 @@ class SpeakerThread(threading.Thread):
             if "Connection successful" in result.stdout:
                 self.connected = True
                 log_system(f"[Speaker: {self.mac_address}] Connected successfully")
+                mark_seen("speaker", self.mac_address)
                 self._connection_feedback()
             else:
                 log_system(f"[Speaker: {self.mac_address}] Connection failed: {result.stdout}", level="WARNING")
@@ -235,34 +234,16 @@ class SpeakerThread(threading.Thread):
 
     def _reconnection_attempts(self):
         """
-        Attempts to reconnect to the speaker using fast and slow retry strategies.
+        Attempts to reconnect to the speaker, fast retries every retry_interval first, then backing off up to
+        retry_sleep (utils/reconnect.py), until reconnection succeeds or stop_event is set.
         """
         log_system(f"[Speaker: {self.mac_address}] Starting reconnection procedure.")
+        if self.reconnector.reconnect(self._try_reconnect, self.stop_event):
+            log_system(f"[Speaker: {self.mac_address}] Reconnected successfully.")
 
-        # Fast retry attempts
-        for attempt in range(self.fast_retry_attempts):
-            if self.stop_event.is_set():
-                return
-            if self.stop_event.wait(self.retry_interval):
-                return
-            self._connect()
-            if self.connected:
-                log_system(f"[Speaker: {self.mac_address}] Reconnected successfully.")
-                return
-            else:
-                log_system(f"[Speaker: {self.mac_address}] Retry {attempt + 1}/{self.fast_retry_attempts} failed", level="WARNING")
-
-
-        # Slow retry loop
-        log_system(f"[Speaker: {self.mac_address}] All fast retries failed. Retrying every {self.retry_sleep}s.")
-        while not self.stop_event.is_set():
-            if self.stop_event.wait(self.retry_sleep):
-                return
-            self._connect()
-            if self.connected:
-                log_system(f"[Speaker: {self.mac_address}] Reconnected successfully.")
-                return
-            log_system(f"[Speaker: {self.mac_address}] Slow retry failed", level="WARNING")
+    def _try_reconnect(self) -> bool:
+        self._connect()
+        return self.connected
 
     def _connection_feedback(self):
         """
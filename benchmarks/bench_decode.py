@@ -0,0 +1,177 @@
+# benchmarks/bench_decode.py
+# Decode throughput of the BlueCoin acc/gyr/quaternion notifications: SDK path vs sensors/fast_decode.py
+#
+# Per notification (6 byte payload after the 2 byte timestamp), for each kind:
+#   sdk     : what the node does through the SDK: feature lock, field by field LittleEndian.bytes_to_int16,
+#             Sample + ExtractedData, datetime.now(), listener get_data() + _to_floats
+#             (real blue_st_sdk classes when installed, same-shape stand-ins otherwise)
+#   fast    : install_fast_path: one precompiled struct unpack, values pushed to the listener
+#   numpy   : batched decode of all payloads at once (offline tools), per notification cost
+# Decoded values of the three paths must match exactly.
+#
+# Run from the repository root:
+#   python -m benchmarks.bench_decode [--notifications 200000]
+#
+# Author: Francesco Urru
+# Github: https://github.com/frarvo
+# Repository: https://github.com/frarvo/STOPme
+# License: MIT
+
+import argparse
+import math
+import struct
+import sys
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+
+from sensors.fast_decode import (
+    PAYLOAD_BYTES, GYR_SCALE, QUAT_RAW_SCALE, install_fast_path,
+    decode_acc_block, decode_gyr_block, decode_quat_compact_block,
+)
+
+try:
+    from blue_st_sdk.feature import Sample, ExtractedData
+    from blue_st_sdk.utils.number_conversion import LittleEndian
+    _SDK = "blue_st_sdk"
+except ImportError:
+    _SDK = "stand-ins"
+
+    class Sample:
+        def __init__(self, data, description, timestamp):
+            self._data, self._description, self._timestamp = data, description, timestamp
+
+        def get_data(self):
+            return self._data
+
+    class ExtractedData:
+        def __init__(self, sample, read_bytes):
+            self._sample, self._read_bytes = sample, read_bytes
+
+        def get_sample(self):
+            return self._sample
+
+        def get_read_bytes(self):
+            return self._read_bytes
+
+    class LittleEndian:
+        @classmethod
+        def bytes_to_int16(cls, data, start=0):
+            return struct.unpack("<h", data[start:start + 2])[0]
+
+
+def _sdk_extract(kind, timestamp, data, offset):
+    """extract_data of FeatureAccelerometer / FeatureGyroscope / FeatureMemsSensorFusionCompact."""
+    x = LittleEndian.bytes_to_int16(data, offset)
+    y = LittleEndian.bytes_to_int16(data, offset + 2)
+    z = LittleEndian.bytes_to_int16(data, offset + 4)
+    if kind == "acc":
+        values = [x, y, z]
+    elif kind == "gyr":
+        values = [x / GYR_SCALE, y / GYR_SCALE, z / GYR_SCALE]
+    else:
+        t = QUAT_RAW_SCALE * QUAT_RAW_SCALE - (x * x + y * y + z * z)
+        if t < 0:
+            t = 0
+        values = [float(x), float(y), float(z), float(int(math.sqrt(t)))]
+    return ExtractedData(Sample(values, None, timestamp), PAYLOAD_BYTES)
+
+
+class _SdkFeature:
+    """Feature.update + listener on_update, as run on the node thread."""
+
+    def __init__(self, kind, listener):
+        self.kind, self.listener = kind, listener
+        self._lock = threading.Lock()
+        self.n = 4 if kind == "quat" else 3
+
+    def update(self, timestamp, data, offset, notify_update=False):
+        with self._lock:
+            extracted = _sdk_extract(self.kind, timestamp, data, offset)
+            sample = self._last_sample = extracted.get_sample()
+            read_bytes = extracted.get_read_bytes()
+            self._last_update = datetime.now()
+        if notify_update:
+            d = sample.get_data()
+            self.listener.push(self.kind, tuple(float(d[i]) for i in range(self.n)))
+        return read_bytes
+
+
+class _Collect:
+    device_id = "bench"
+
+    def __init__(self):
+        self.out = []
+
+    def push(self, kind, values, dev_ts=None):
+        self.out.append(values)
+
+
+class _Feature:
+    """Stands in for the SDK feature with listener registered on it (fast path active)."""
+
+    def __init__(self, listener):
+        self._listeners = [listener]
+
+    def update(self, timestamp, data, offset, notify_update=False):
+        raise RuntimeError("SDK update should not be reached")
+
+
+def payloads(n: int, seed: int = 0) -> list:
+    rng = np.random.default_rng(seed)
+    raw = rng.integers(-32768, 32768, (n, 3), dtype=np.int64)
+    raw[: n // 2] = rng.integers(-6000, 6000, (n // 2, 3))          # valid quaternion range
+    raw[:8] = [[10000, 0, 0], [0, 0, 0], [-10000, 0, 0], [7072, 7071, 0],
+               [5773, 5773, 5774], [32767, 32767, 32767], [-32768, -32768, -32768], [1, -1, 1]]
+    ts = b"\x34\x12"
+    return [ts + struct.pack("<3h", *r) for r in raw.tolist()]
+
+
+def run(kind: str, notes: list, block_decoder) -> bool:
+    n = len(notes)
+    sdk_out = _Collect()
+    feat = _SdkFeature(kind, sdk_out)
+    t0 = time.perf_counter()
+    for i, data in enumerate(notes):
+        feat.update(i, data, 2, True)
+    t_sdk = (time.perf_counter() - t0) / n
+
+    fast_out = _Collect()
+    fast = _Feature(fast_out)
+    install_fast_path(fast, kind, fast_out)
+    update = fast.update
+    t0 = time.perf_counter()
+    for i, data in enumerate(notes):
+        update(i, data, 2, True)
+    t_fast = (time.perf_counter() - t0) / n
+
+    blob = b"".join(d[2:] for d in notes)
+    t0 = time.perf_counter()
+    block = block_decoder(blob)
+    t_np = (time.perf_counter() - t0) / n
+
+    ref = np.array(sdk_out.out, dtype=np.float64)
+    ok = ref.shape == block.shape and np.array_equal(ref, np.array(fast_out.out)) and np.array_equal(ref, block)
+    print(f"{kind:5s} sdk={t_sdk * 1e6:6.2f} us  fast={t_fast * 1e6:6.2f} us  numpy={t_np * 1e6:6.3f} us  "
+          f"per notification  (x{t_sdk / t_fast:.1f})  values match: {ok}")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Notification decode throughput")
+    parser.add_argument("--notifications", type=int, default=200000, help="notifications per kind")
+    args = parser.parse_args()
+
+    notes = payloads(args.notifications)
+    print(f"notifications/kind={len(notes)} sdk classes: {_SDK}")
+    ok = True
+    for kind, dec in (("acc", decode_acc_block), ("gyr", decode_gyr_block), ("quat", decode_quat_compact_block)):
+        ok = run(kind, notes, dec) and ok
+    print("DECODE OK" if ok else "DECODE MISMATCH")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
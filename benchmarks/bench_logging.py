@@ -0,0 +1,79 @@
+# benchmarks/bench_logging.py
+# Micro-benchmark of the per-window logging overhead on the processing hot path.
+#
+# Per window the pipeline used to log "window #N processed" (DataBuffer) and "Event enqueued: {event}"
+# (Classifier, event dict with 18 feature floats), formatted eagerly.
+# Compares, per window:
+#   eager_info  : f-strings + log_system at INFO (old behaviour, records written by the log writer)
+#   eager_debug : f-strings + log_system at DEBUG with DEBUG filtered (formatting still paid)
+#   lazy_debug  : get_logger(...).debug with %-args, DEBUG filtered (nothing formatted)
+#
+# Run from the repository root (logs go to a temporary folder, console output off):
+#   python -m benchmarks.bench_logging [--windows 20000]
+#
+# Author: Francesco Urru
+# Github: https://github.com/frarvo
+# Repository: https://github.com/frarvo/STOPme
+# License: MIT
+
+import argparse
+import tempfile
+import time
+import uuid
+from datetime import datetime
+
+import numpy as np
+
+import utils.config as config
+from utils.logger import log_system, SystemLogger, shutdown_logging
+
+
+def _event(features: np.ndarray) -> dict:
+    return {
+        "id": uuid.uuid4().hex,
+        "timestamp": datetime.now().isoformat(),
+        "window_ts": 0.0,
+        "source": "dual_wrist",
+        "features": features.tolist(),
+        "stereotipy_tag": "3",
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-window logging overhead")
+    parser.add_argument("--windows", type=int, default=20000, help="windows per case")
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix="stopme_bench_logs_")
+    config.CONFIG["log_base_path"] = tmp
+    config.CONFIG["debug_system_console"] = False
+
+    event = _event(np.random.default_rng(0).standard_normal(18).astype(np.float32))
+    buf_log = SystemLogger("DataBuffer")
+    cls_log = SystemLogger("Classifier")
+    buf_log.threshold = cls_log.threshold = 20     # INFO: DEBUG filtered
+
+    def eager_info(n):
+        log_system(f"[DataBuffer] window #{n} processed")
+        log_system(f"[Classifier] Event enqueued: {event}")
+
+    def eager_debug(n):
+        log_system(f"[DataBuffer] window #{n} processed", level="DEBUG")
+        log_system(f"[Classifier] Event enqueued: {event}", level="DEBUG")
+
+    def lazy_debug(n):
+        buf_log.debug("window #%d processed", n)
+        cls_log.debug("Event enqueued: %s", event)
+
+    print(f"windows/case={args.windows} logs={tmp}")
+    for name, fn in (("eager_info", eager_info), ("eager_debug", eager_debug), ("lazy_debug", lazy_debug)):
+        t0 = time.perf_counter()
+        for n in range(args.windows):
+            fn(n)
+        us = (time.perf_counter() - t0) / args.windows * 1e6
+        print(f"{name:12s} {us:8.2f} us/window")
+    shutdown_logging()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+# benchmarks/bench_notification_wait.py
+# Idle CPU and delivery latency of the BLE notification wait, 50 ms polling vs the shared event loop.
+#
+# Two simulated BlueCoins: each has a "helper" pipe read the way bluepy reads the bluepy-helper stdout (poll on the
+# pipe, then readline), fed by a writer thread with one notification line every 1 / --rate-hz seconds (0: idle).
+#   poll  : one thread per node, get_status + wait_for_notifications(0.05) in a loop (old BlueCoinThread._listen)
+#   event : both nodes registered on sensors/notification_loop.py NotificationLoop (epoll)
+# Prints the process CPU time per second of wall time, the wake-ups of the waiting threads and the delay from
+# the write of a line to its listener call (the writer threads cost the same in both cases).
+#
+# Run from the repository root:
+#   python -m benchmarks.bench_notification_wait [--seconds 10] [--rate-hz 50]
+#
+# Author: Francesco Urru
+# Github: https://github.com/frarvo
+# Repository: https://github.com/frarvo/STOPme
+# License: MIT
+
+import argparse
+import os
+import select
+import threading
+import time
+
+import numpy as np
+
+from sensors.notification_loop import NotificationLoop
+
+CONNECTED = "CONNECTED"
+
+
+class _Helper:
+    def __init__(self, fd: int):
+        self.stdout = os.fdopen(fd, "r")
+
+
+class FakeNode:
+    """The part of a BlueST node the listeners use, over a pipe read like bluepy does."""
+
+    def __init__(self):
+        r, self._w = os.pipe()
+        self._helper = _Helper(r)
+        self._poller = select.poll()
+        self._poller.register(self._helper.stdout, select.POLLIN)
+        self.delays = []
+        self.calls = 0
+
+    def get_status(self):
+        return CONNECTED
+
+    def is_connected(self):
+        return True
+
+    def wait_for_notifications(self, timeout_s):
+        self.calls += 1
+        if timeout_s and not self._poller.poll(timeout_s * 1000):
+            return False
+        line = self._helper.stdout.readline()
+        self.delays.append(time.perf_counter() - float(line))
+        return True
+
+    def feed(self, rate_hz: float, stop: threading.Event):
+        if rate_hz <= 0:
+            stop.wait()
+            return
+        period = 1.0 / rate_hz
+        next_t = time.perf_counter()
+        while not stop.is_set():
+            os.write(self._w, f"{time.perf_counter():.9f}\n".encode())
+            next_t += period
+            time.sleep(max(0.0, next_t - time.perf_counter()))
+
+
+def run_poll(nodes, stop):
+    def listen(node):
+        while not stop.is_set():
+            if node.get_status() == CONNECTED:
+                node.wait_for_notifications(0.05)
+    threads = [threading.Thread(target=listen, args=(n,), daemon=True) for n in nodes]
+    for t in threads:
+        t.start()
+    return lambda: [t.join() for t in threads]
+
+
+def run_event(nodes, stop):
+    loop = NotificationLoop(housekeeping_s=1.0)
+    loop.start()
+    for node in nodes:
+        loop.register(node, lambda: None)
+    return loop.stop
+
+
+def measure(mode: str, seconds: float, rate_hz: float) -> None:
+    nodes = [FakeNode(), FakeNode()]
+    stop = threading.Event()
+    writers = [threading.Thread(target=n.feed, args=(rate_hz, stop), daemon=True) for n in nodes]
+    finish = (run_poll if mode == "poll" else run_event)(nodes, stop)
+    for w in writers:
+        w.start()
+    time.sleep(0.5)
+    for n in nodes:
+        n.delays.clear()
+        n.calls = 0
+    cpu0, wall0 = time.process_time(), time.perf_counter()
+    time.sleep(seconds)
+    cpu, wall = time.process_time() - cpu0, time.perf_counter() - wall0
+    calls = sum(n.calls for n in nodes)
+    stop.set()
+    finish()
+    delays = np.array([d for n in nodes for d in n.delays]) * 1e3
+    lat = (f"delay p50={np.percentile(delays, 50):.3f} ms p99={np.percentile(delays, 99):.3f} ms "
+           f"max={delays.max():.3f} ms" if len(delays) else "no notifications")
+    print(f"[{mode:5s}] cpu {cpu / wall * 100:.2f}% of one core, {calls / wall:.0f} waits/s, "
+          f"{len(delays)} notifications, {lat}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="BLE notification wait: polling vs event loop")
+    parser.add_argument("--seconds", type=float, default=10.0, help="measured time per case")
+    parser.add_argument("--rate-hz", type=float, default=50.0, help="notifications per node and second (0: idle)")
+    args = parser.parse_args()
+    for mode in ("poll", "event"):
+        measure(mode, args.seconds, args.rate_hz)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+# benchmarks/bench_subjects.py
+# Window throughput of the multi-subject mode (core/subjects.py) for 1..N simulated subjects.
+#
+# Each subject gets its pipeline as in the live system (synchronizer -> buffer -> classifier -> own queue, window
+# processing on the shared WindowWorkerPool) and one feeder thread standing in for its two BLE listeners: left and
+# right update_triplet() calls with synthetic samples, either at the wrist sample rate (--rate-hz, per wrist) or
+# as fast as possible (--rate-hz 0). Prints the windows processed (features + classifier) per second (all subjects), the pool threads,
+# the dropped windows and the average processing time per window.
+# At the real sample rate every subject must keep up (windows/s = subjects * rate / hop); at full speed the
+# figure shows where the pool saturates.
+#
+# Run from the repository root:
+#   python -m benchmarks.bench_subjects [--subjects 1 2 4 8] [--seconds 5] [--rate-hz 0] [--threads 0]
+#
+# Author: Francesco Urru
+# Github: https://github.com/frarvo
+# Repository: https://github.com/frarvo/STOPme
+# License: MIT
+
+import argparse
+import threading
+import time
+
+import numpy as np
+
+from core.subjects import create_pipelines
+
+
+def _subjects(n: int) -> list:
+    return [{"id": f"s{i}", "left": {"id": f"s{i}_left", "name": f"L{i}"},
+             "right": {"id": f"s{i}_right", "name": f"R{i}"}, "actuators": []} for i in range(n)]
+
+
+def _feed(pipeline, rate_hz: float, stop: threading.Event, seed: int) -> None:
+    rng = np.random.default_rng(seed)
+    acc = (rng.standard_normal((256, 3)) * 500.0).tolist()
+    gyr = (rng.standard_normal((256, 3)) * 50.0).tolist()
+    quat = rng.standard_normal((256, 4))
+    quat = (quat / np.linalg.norm(quat, axis=1, keepdims=True)).tolist()
+    sync = pipeline.synchronizer
+    left, right = pipeline.device_ids()
+    period = 1.0 / rate_hz if rate_hz > 0 else 0.0
+    next_t = time.perf_counter()
+    k = 0
+    while not stop.is_set():
+        i = k % 256
+        ts, dev_ts = time.monotonic(), k * (period or 0.01)
+        sync.update_triplet(left, acc[i], gyr[i], quat[i], ts, dev_ts)
+        sync.update_triplet(right, acc[-i], gyr[-i], quat[-i], ts, dev_ts)
+        k += 1
+        if period:
+            next_t += period
+            time.sleep(max(0.0, next_t - time.perf_counter()))
+        elif k % 64 == 0:
+            # Let the pool threads in, as BLE listeners waiting on the radio would
+            time.sleep(0)
+
+
+def _processed(stats: dict) -> int:
+    # Windows through feature extraction + classification (emitted windows when processing inline)
+    return stats.get("processed", stats["windows_processed"])
+
+
+def measure(n: int, seconds: float, rate_hz: float, threads: int) -> None:
+    from utils.config import CONFIG
+    CONFIG.setdefault("processing", {})["pool_threads"] = threads
+    pipelines, pool = create_pipelines(_subjects(n))
+    if pool is not None:
+        pool.start()
+    for p in pipelines:
+        p.buffer.start()
+    stop = threading.Event()
+    feeders = [threading.Thread(target=_feed, args=(p, rate_hz, stop, i), daemon=True)
+               for i, p in enumerate(pipelines)]
+    for f in feeders:
+        f.start()
+    time.sleep(1.0)
+    w0 = sum(_processed(p.buffer.get_stats()) for p in pipelines)
+    t0 = time.perf_counter()
+    time.sleep(seconds)
+    wall = time.perf_counter() - t0
+    stats = [p.buffer.get_stats() for p in pipelines]
+    stop.set()
+    for f in feeders:
+        f.join()
+    for p in pipelines:
+        p.buffer.stop()
+    if pool is not None:
+        pool.stop()
+
+    windows = sum(_processed(s) for s in stats) - w0
+    dropped = sum(s.get("dropped_oldest", 0) + s.get("dropped_newest", 0) for s in stats)
+    busy = [s.get("avg_process_ms", 0.0) for s in stats]
+    print(f"subjects={n:2d} pool={pool.size if pool else 'own thread'} windows/s={windows / wall:8.1f} "
+          f"per subject={windows / wall / n:7.1f} dropped={dropped} avg_process={np.mean(busy):.3f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Multi-subject window throughput")
+    parser.add_argument("--subjects", type=int, nargs="+", default=[1, 2, 4, 8], help="subject counts to run")
+    parser.add_argument("--seconds", type=float, default=5.0, help="measured time per case")
+    parser.add_argument("--rate-hz", type=float, default=0.0, help="samples per wrist and second (0: full speed)")
+    parser.add_argument("--threads", type=int, default=0, help="processing.pool_threads (0: automatic)")
+    args = parser.parse_args()
+    for n in args.subjects:
+        measure(n, args.seconds, args.rate_hz, args.threads)
+
+
+if __name__ == "__main__":
+    main()
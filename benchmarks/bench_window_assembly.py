@@ -0,0 +1,88 @@
+# benchmarks/bench_window_assembly.py
+# Micro-benchmark of the per-window cost of assembling a buffer window and calling the C processing library.
+#
+# Compares:
+#   legacy  : list of 20-float tuples -> 20 np.asarray list comprehensions (+ mg -> g) -> process_data_wrists_quat
+#   row     : (N, 20) ring view -> 20 column slices (+ mg -> g) -> process_data_wrists_quat
+#   channel : (20, capacity) ring -> one copy into a (20, N) matrix -> process_window (row pointers)
+#
+# Run from the repository root:
+#   python -m benchmarks.bench_window_assembly [--windows 2000]
+#
+# Author: Francesco Urru
+# Github: https://github.com/frarvo
+# Repository: https://github.com/frarvo/STOPme
+# License: MIT
+
+import argparse
+import time
+import numpy as np
+
+from data_pipeline.data_processing_wrapper_quat import (
+    N, process_data_wrists_quat, process_window, window_row_pointers, initialize
+)
+
+
+def _legacy(rows):
+    acc_idx = (0, 1, 2, 10, 11, 12)
+    chans = []
+    for c in range(20):
+        a = np.asarray([r[c] for r in rows], dtype=np.float32)
+        if c in acc_idx:
+            a = a / 1000.0
+        chans.append(a)
+    # C API order: RIGHT acc/gyr, LEFT acc/gyr, RIGHT quat, LEFT quat
+    order = (0, 1, 2, 3, 4, 5, 10, 11, 12, 13, 14, 15, 6, 7, 8, 9, 16, 17, 18, 19)
+    return process_data_wrists_quat(*[chans[i] for i in order])
+
+
+def _row(window):
+    chans = [window[:, c] / 1000.0 if c in (0, 1, 2, 10, 11, 12) else window[:, c] for c in range(20)]
+    order = (0, 1, 2, 3, 4, 5, 10, 11, 12, 13, 14, 15, 6, 7, 8, 9, 16, 17, 18, 19)
+    return process_data_wrists_quat(*[chans[i] for i in order])
+
+
+def _channel(ring, start, matrix, ptrs):
+    np.copyto(matrix, ring[:, start:start + N])
+    return process_window(matrix, ptrs=ptrs)
+
+
+def _time(fn, windows: int) -> float:
+    t0 = time.perf_counter()
+    for k in range(windows):
+        fn(k)
+    return (time.perf_counter() - t0) / windows * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-window assembly + processing cost")
+    parser.add_argument("--windows", type=int, default=2000, help="windows per case")
+    args = parser.parse_args()
+
+    initialize()
+    rng = np.random.default_rng(0)
+    data = (rng.standard_normal((2 * N, 20)) * 500.0).astype(np.float32)
+    rows = [tuple(float(v) for v in r) for r in data[:N]]
+    ring_rows = data.copy()
+    ring_cols = np.ascontiguousarray(data.T)
+    ring_cols[(0, 1, 2, 10, 11, 12), :] /= 1000.0
+    matrix = np.zeros((20, N), dtype=np.float32)
+    ptrs = window_row_pointers(matrix)
+
+    cases = {
+        "legacy":  lambda k: _legacy(rows),
+        "row":     lambda k: _row(ring_rows[k % N: k % N + N]),
+        "channel": lambda k: _channel(ring_cols, k % N, matrix, ptrs),
+    }
+
+    print(f"window={N} windows/case={args.windows}")
+    base = None
+    for name, fn in cases.items():
+        fn(0)  # warm up
+        us = _time(fn, args.windows)
+        base = us if base is None else base
+        print(f"{name:8s} {us:9.1f} us/window  ({base / us:5.1f}x vs legacy)")
+
+
+if __name__ == "__main__":
+    main()
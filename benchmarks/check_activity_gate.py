@@ -0,0 +1,257 @@
+# benchmarks/check_activity_gate.py
+# Parity check of the DataBuffer activity gate (activity_gate in config.yaml) against the full pipeline.
+#
+# The same rows go through two inline NumPy-backend buffers, one without and one with the gate; every window of
+# the first is classified (features + FineTree), the second classifies the windows the gate lets through and
+# repeats the last label for the others, like StereotipyClassifier.still. Per window:
+#   missed positive : gated window the full pipeline labels NON_DANGEROUS or DANGEROUS (1/2), repeated otherwise
+#   mismatch        : any window whose label differs between the two (gated: repeated label is wrong)
+# Sources:
+#   synthetic : still segments (random wrist postures, sensor noise around the thresholds, some slowly rotating)
+#               between moving ones
+#   recorded  : a recording replayed through the synchronizer (--recording FILE, see sensors/recording.py),
+#               benchmarks/data/activity_gate.rec by default
+# Also reports the time spent per window by both buffers. Exit status 1 on any mismatch or missed positive,
+# in every source; 2 when everything matched but no recording was checked.
+#
+# benchmarks/data/activity_gate.rec is a simulated 36 s session (two wrists, 50 Hz, device timestamps with
+# clock offset and drift, arrivals batched by the connection interval with scheduling jitter) written by
+# SessionRecorder with --write-recording: it checks the gate through the recorded replay path, real session
+# recordings are still needed to validate the thresholds on the subject's movements.
+#
+# Run from the repository root:
+#   python -m benchmarks.check_activity_gate [--segments 40] [--recording FILE] [--acc-std G] [--gyr-std DPS]
+#                                            [--acc-drift G] [--angle-drift DEG]
+#   python -m benchmarks.check_activity_gate --write-recording FILE     (regenerates the fixture)
+#
+# Author: Francesco Urru
+# Github: https://github.com/frarvo
+# Repository: https://github.com/frarvo/STOPme
+# License: MIT
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+import utils.config as config
+from benchmarks.check_feature_parity import synthetic_windows
+from classifiers.finetree_numpy import FineTree
+from data_pipeline.data_buffer import DataBuffer
+
+WINDOW = 150
+DRIFT_DPS = (0.0, 0.0, 0.3, 1.0, 3.0)     # rotation rates of the still segments (synthetic)
+FIXTURE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "activity_gate.rec")
+# Fixture session: (seconds, None for moving or the rotation rate of a still segment in dps)
+SESSION = ((3.0, None), (8.0, 0.0), (3.0, None), (8.0, 1.0), (3.0, None), (8.0, 0.0), (3.0, None))
+
+
+class _Run:
+    """Buffer with its per-window FineTree labels (last label repeated for gated windows) and gated flags."""
+
+    def __init__(self, tree: FineTree, gate: bool):
+        self.buffer = DataBuffer(window_size=WINDOW, layout="channel", worker=False, backend="numpy",
+                                 activity_gate=gate)
+        self.labels = []
+        self.gated = []
+        self.seconds = 0.0
+        self.buffer.set_features_sink(lambda f, ts: self._add(int(tree.predict(f[None])[0]), False))
+        self.buffer.set_gated_sink(lambda ts: self._add(self.labels[-1], True))
+
+    def _add(self, label: int, gated: bool) -> None:
+        self.labels.append(label)
+        self.gated.append(gated)
+
+
+def _quat_mul(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    # Hamilton product, (x, y, z, w)
+    ax, ay, az, aw = a
+    bx, by, bz, bw = b
+    return np.array([aw * bx + ax * bw + ay * bz - az * by,
+                     aw * by - ax * bz + ay * bw + az * bx,
+                     aw * bz + ax * by - ay * bx + az * bw,
+                     aw * bw - ax * bx - ay * by - az * bz])
+
+
+def _rotate(q: np.ndarray, v: np.ndarray) -> np.ndarray:
+    # Sensor frame coordinates of the world vector v for the orientation q (x, y, z, w)
+    x, y, z, w = q
+    r = np.array([[1 - 2 * (y * y + z * z), 2 * (x * y - z * w), 2 * (x * z + y * w)],
+                  [2 * (x * y + z * w), 1 - 2 * (x * x + z * z), 2 * (y * z - x * w)],
+                  [2 * (x * z - y * w), 2 * (y * z + x * w), 1 - 2 * (x * x + y * y)]])
+    return r.T @ v
+
+
+def _still_rows(rng, rows: int, drift: float, acc_noise: float, gyr_noise: float, rate_hz: float) -> np.ndarray:
+    # Both wrists in a random posture, rotating at drift dps around a random axis
+    seg = np.empty((rows, 20), dtype=np.float32)
+    for base in (0, 10):
+        q0 = rng.normal(size=4)
+        q0 = q0 / np.linalg.norm(q0)
+        axis = rng.normal(size=3)
+        axis = axis / np.linalg.norm(axis)
+        for k in range(rows):
+            half = np.radians(drift * k / rate_hz) / 2.0
+            q = _quat_mul(np.append(axis * np.sin(half), np.cos(half)), q0)
+            q = q * np.sign(q[3] or 1.0)
+            seg[k, base:base + 3] = _rotate(q, np.array([0.0, 0.0, 1.0]))
+            seg[k, base + 6:base + 10] = q * 10000.0
+        seg[:, base:base + 3] += rng.normal(0.0, acc_noise, (rows, 3))
+        seg[:, base + 3:base + 6] = axis * drift + rng.normal(0.0, gyr_noise, (rows, 3))
+    return seg
+
+
+def synthetic_rows(segments: int, seed: int = 0, rate_hz: float = 50.0):
+    """(rows, 20) in buffer order (acc in g, raw x10000 quaternions), even segments still or slowly rotating."""
+    rng = np.random.default_rng(seed)
+    moving = synthetic_windows(segments, WINDOW * 2, seed)
+    chunks = []
+    for i in range(segments):
+        if i % 2:
+            chunks.append(moving[i].T)
+            continue
+        acc_noise = rng.choice([0.002, 0.005, 0.01, 0.02])
+        gyr_noise = rng.choice([0.2, 0.5, 1.0, 2.0])
+        drift = DRIFT_DPS[(i // 2) % len(DRIFT_DPS)]
+        chunks.append(_still_rows(rng, WINDOW * 2, drift, acc_noise, gyr_noise, rate_hz))
+    return np.concatenate(chunks)
+
+
+def write_recording(path: str, seed: int = 1, rate_hz: float = 50.0) -> int:
+    """
+    Records the SESSION rows of both wrists with SessionRecorder as the fused listeners would: one acc, gyr,
+    quat set per sample, device ticks (offset and drift per wrist), arrivals in connection interval batches
+    with jitter. Returns the number of samples per wrist.
+    """
+    from sensors.recording import SessionRecorder
+
+    rng = np.random.default_rng(seed)
+    moving = synthetic_windows(len(SESSION), int(max(s for s, _ in SESSION) * rate_hz), seed)
+    chunks = []
+    for i, (seconds, drift) in enumerate(SESSION):
+        rows = int(seconds * rate_hz)
+        if drift is None:
+            chunks.append(moving[i].T[:rows])
+        else:
+            chunks.append(_still_rows(rng, rows, drift, 0.003, 0.3, rate_hz))
+    rows = np.concatenate(chunks).astype(np.float64)
+    rows[:, 0:3] *= 1000.0      # raw firmware units: acc in mg
+    rows[:, 10:13] *= 1000.0
+    n = len(rows)
+    period = 1.0 / rate_hz
+    recorder = SessionRecorder(path)
+    events = []
+    for device_id, base, phase, tick0, ppm in (("bc_right", 0, 0.004, 1200.0, 40.0), ("bc_left", 10, 0.0, 53000.0, -25.0)):
+        measured = 1.0 + phase + np.arange(n) * period * (1.0 + ppm * 1e-6)
+        ticks = tick0 + np.arange(n) * period * 1000.0         # device clock, ms ticks
+        # Two samples per 7.5 ms x 4 connection event, plus thread scheduling jitter
+        arrival = (np.floor(measured / 0.03) + 1) * 0.03 + rng.exponential(0.002, n)
+        arrival = np.maximum.accumulate(arrival)
+        for k in range(n):
+            events.append((arrival[k], device_id, rows[k, base:base + 10], ticks[k]))
+    events.sort(key=lambda e: e[0])
+    for ts, device_id, v, tick in events:
+        recorder.record(device_id, "acc", v[0:3], ts, tick)
+        recorder.record(device_id, "gyr", v[3:6], ts, tick)
+        recorder.record(device_id, "quat", v[6:10], ts, tick)
+    recorder.close()
+    return n
+
+
+def _feed_rows(run: _Run, rows: np.ndarray) -> None:
+    values = rows.astype(np.float64)
+    values[:, 0:3] *= 1000.0      # buffer rows carry acc in mg
+    values[:, 10:13] *= 1000.0
+    values = values.tolist()
+    t0 = time.perf_counter()
+    for k, r in enumerate(values):
+        run.buffer.add_buffer_row(r[0:3], r[3:6], r[6:10], r[10:13], r[13:16], r[16:20], k * 0.02)
+    run.seconds += time.perf_counter() - t0
+
+
+def _feed_recording(run: _Run, path: str) -> None:
+    from data_pipeline.synchronizer import create_synchronizer
+    from sensors.recording import iter_updates, apply_update
+
+    sync = create_synchronizer(buffer=run.buffer)
+    now = [0.0]
+    if hasattr(sync, "set_clock"):
+        sync.set_clock(lambda: now[0])
+    updates = list(iter_updates(path))
+    t0 = time.perf_counter()
+    for device_id, kind, values, ts, dev_ts in updates:
+        now[0] = ts
+        apply_update(sync, device_id, kind, values, ts, dev_ts)
+    run.seconds += time.perf_counter() - t0
+
+
+def compare(name: str, full: _Run, gated: _Run) -> bool:
+    ref, out = np.array(full.labels), np.array(gated.labels)
+    if len(ref) != len(out):
+        print(f"[{name}] window count differs: full {len(ref)}, gated {len(out)}")
+        return False
+    skipped = np.array(gated.gated, dtype=bool)
+    positive = (ref == 1) | (ref == 2)
+    missed = skipped & positive & (out != ref)
+    mismatch = out != ref
+    n = max(1, len(ref) + 1)      # + calibration window
+    print(f"[{name}] windows={len(ref)} gated={int(skipped.sum())} "
+          f"({100.0 * skipped.sum() / max(1, len(ref)):.1f}%) missed positives={int(missed.sum())} "
+          f"mismatches={int(mismatch.sum())}")
+    if skipped.any():
+        print(f"[{name}] full pipeline labels of the gated windows: {np.bincount(ref[skipped], minlength=4)[:4]}")
+    print(f"[{name}] time per window: full {full.seconds / n * 1e3:.3f} ms, gated {gated.seconds / n * 1e3:.3f} ms")
+    return not mismatch.any()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Activity gate vs full pipeline parity")
+    parser.add_argument("--segments", type=int, default=40, help="synthetic segments (2 windows each)")
+    parser.add_argument("--recording", default=FIXTURE, help="also check the windows of this recording "
+                                                             "(default: benchmarks/data/activity_gate.rec)")
+    parser.add_argument("--write-recording", metavar="FILE", help="write the simulated fixture session and exit")
+    parser.add_argument("--acc-std", type=float, help="activity_gate.acc_std_g (default: config.yaml)")
+    parser.add_argument("--gyr-std", type=float, help="activity_gate.gyr_std_dps (default: config.yaml)")
+    parser.add_argument("--acc-drift", type=float, help="activity_gate.acc_drift_g (default: config.yaml)")
+    parser.add_argument("--angle-drift", type=float, help="activity_gate.angle_drift_deg (default: config.yaml)")
+    args = parser.parse_args()
+    if args.write_recording:
+        print(f"{write_recording(args.write_recording)} samples per wrist written to {args.write_recording}")
+        return
+
+    gate_cfg = config.CONFIG.setdefault("activity_gate", {})
+    for key, value in (("acc_std_g", args.acc_std), ("gyr_std_dps", args.gyr_std),
+                       ("acc_drift_g", args.acc_drift), ("angle_drift_deg", args.angle_drift)):
+        if value is not None:
+            gate_cfg[key] = value
+    cfg = config.get_activity_gate_config()
+    print(f"thresholds: acc {cfg['acc_std_g']} g, gyr {cfg['gyr_std_dps']} dps, "
+          f"drift {cfg['acc_drift_g']} g / {cfg['angle_drift_deg']} deg")
+    tree = FineTree.load()
+
+    rows = synthetic_rows(args.segments)
+    full, gated = _Run(tree, False), _Run(tree, True)
+    _feed_rows(full, rows)
+    _feed_rows(gated, rows)
+    ok = compare("synthetic", full, gated)
+
+    recording = args.recording if args.recording and os.path.exists(args.recording) else None
+    if recording is None and args.recording != FIXTURE:
+        parser.error(f"recording not found: {args.recording}")
+    if recording is not None:
+        full, gated = _Run(tree, False), _Run(tree, True)
+        _feed_recording(full, recording)
+        _feed_recording(gated, recording)
+        ok &= compare("recorded", full, gated)
+    if not ok:
+        print("FAILED")
+        sys.exit(1)
+    if recording is None:
+        print("NOT VALIDATED: no recording checked (--recording FILE), synthetic windows only")
+        sys.exit(2)
+    print("OK")
+
+if __name__ == "__main__":
+    main()
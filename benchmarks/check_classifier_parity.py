@@ -0,0 +1,92 @@
+# benchmarks/check_classifier_parity.py
+# Parity check of the batched and NumPy FineTree classifiers against libPredictPericolosaWristsQuat.so.
+#
+# Feature matrices:
+#   synthetic : every feature drawn around the thresholds the tree tests on it (all branches visited),
+#               plus NaN entries (traversal stops at the node)
+#   recorded  : features of the windows cut from a recording (--recording FILE)
+# Labels must match exactly between:
+#   single  : predict_pericolosa_wrists_quat, one ctypes call per row (classifier hot path)
+#   batch   : predict_pericolosa_wrists_quat_batch, one conversion for the matrix
+#   numpy   : FineTree.load().predict, vectorized traversal of the exported tree
+#
+# Run from the repository root:
+#   python -m benchmarks.check_classifier_parity [--rows 100000] [--recording FILE]
+#
+# Author: Francesco Urru
+# Github: https://github.com/frarvo
+# Repository: https://github.com/frarvo/STOPme
+# License: MIT
+
+import argparse
+import sys
+import time
+
+import numpy as np
+
+from classifiers.predict_models_wrapper_quat import (
+    FEAT, initialize, predict_pericolosa_wrists_quat, predict_pericolosa_wrists_quat_batch
+)
+from classifiers.finetree_numpy import FineTree
+
+
+def synthetic_features(tree: FineTree, rows: int, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    X = np.empty((rows, FEAT), dtype=np.float32)
+    for f in range(FEAT):
+        th = tree.threshold[tree.feature == f]
+        if len(th):
+            X[:, f] = rng.choice(th, rows) * (1.0 + rng.normal(0.0, 0.05, rows))
+            X[: rows // 20, f] = rng.choice(th, rows // 20)          # exactly on the threshold
+        else:
+            X[:, f] = rng.normal(size=rows)
+    X[rng.random((rows, FEAT)) < 0.01] = np.nan
+    return X
+
+
+def compare(name: str, X: np.ndarray, tree: FineTree) -> bool:
+    initialize()
+    n_single = min(len(X), 20000)
+    t0 = time.perf_counter()
+    single = np.array([predict_pericolosa_wrists_quat(x) for x in X[:n_single]], dtype=np.uint8)
+    t_single = (time.perf_counter() - t0) / n_single
+
+    t0 = time.perf_counter()
+    batch = predict_pericolosa_wrists_quat_batch(X)
+    t_batch = (time.perf_counter() - t0) / len(X)
+
+    t0 = time.perf_counter()
+    numpy_ = tree.predict(X)
+    t_numpy = (time.perf_counter() - t0) / len(X)
+
+    ok_batch = np.array_equal(single, batch[:n_single])
+    ok_numpy = np.array_equal(batch, numpy_)
+    print(f"[{name}] rows={len(X)} labels={np.bincount(batch, minlength=4)[1:].tolist()}")
+    print(f"  single={t_single * 1e6:.2f} us/row  batch={t_batch * 1e6:.2f} us/row  numpy={t_numpy * 1e6:.2f} us/row")
+    print(f"  batch == single: {ok_batch}   numpy == C: {ok_numpy} "
+          f"(mismatches: {int(np.count_nonzero(batch != numpy_))})")
+    return ok_batch and ok_numpy
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Batched / NumPy FineTree parity")
+    parser.add_argument("--rows", type=int, default=100000, help="synthetic feature rows")
+    parser.add_argument("--recording", help="also check features of windows cut from this recording")
+    args = parser.parse_args()
+
+    tree = FineTree.load()
+    ok = compare("synthetic", synthetic_features(tree, args.rows), tree)
+    if args.recording:
+        from benchmarks.check_feature_parity import recorded_windows
+        from data_pipeline.data_processing_numpy_quat import QuatFeatureExtractor
+        wins = recorded_windows(args.recording)
+        if len(wins):
+            ok = compare("recorded", QuatFeatureExtractor().process_windows(wins), tree) and ok
+        else:
+            print("[recorded] no complete window in the recording")
+    print("PARITY OK" if ok else "PARITY FAILED")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
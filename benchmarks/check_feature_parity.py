@@ -0,0 +1,127 @@
+# benchmarks/check_feature_parity.py
+# Parity check of the NumPy feature extractor (data_processing_numpy_quat) against libProcessDataWristsQuat.so.
+#
+# Windows are processed in sequence by both implementations from a fresh state (same reference quaternion):
+#   synthetic : random walks, sinusoids, constant segments, zero and sign-flipped quaternions
+#   recorded  : windows cut by the buffer from a recording (--recording FILE, see sensors/recording.py)
+# Features 0-15 must match bit for bit. The angle features (16-17) go through acosf, which the C library
+# takes from the system libm, so they are compared with a relative tolerance.
+# Also reports the per-window cost of the C library (one call per window) and of the batched NumPy pass.
+#
+# Run from the repository root:
+#   python -m benchmarks.check_feature_parity [--windows 256] [--recording FILE]
+#
+# Author: Francesco Urru
+# Github: https://github.com/frarvo
+# Repository: https://github.com/frarvo/STOPme
+# License: MIT
+
+import argparse
+import sys
+import time
+
+import numpy as np
+
+import utils.config as config
+from data_pipeline.data_processing_wrapper_quat import LIB_WINDOW, process_window, initialize
+from data_pipeline.data_processing_numpy_quat import FEAT, QuatFeatureExtractor
+
+ANGLE_RTOL = 1e-5
+
+
+def synthetic_windows(count: int, n: int, seed: int = 0) -> np.ndarray:
+    """(count, 20, n) channel-major windows in buffer order, acc in g, raw x10000 quaternions."""
+    rng = np.random.default_rng(seed)
+    t = np.arange(n, dtype=np.float64)
+    wins = np.empty((count, 20, n), dtype=np.float32)
+    for i in range(count):
+        for side in (0, 10):
+            f = rng.uniform(0.02, 0.4)
+            acc = np.cumsum(rng.normal(0.0, 0.05, (3, n)), axis=1) + np.sin(f * t) * rng.uniform(0.1, 2.0)
+            gyr = rng.normal(0.0, rng.uniform(1.0, 300.0), (3, n))
+            q = rng.normal(size=4) + np.cumsum(rng.normal(0.0, 0.05, (n, 4)), axis=0)
+            q /= np.linalg.norm(q, axis=1)[:, None]
+            q[q[:, 3] < 0] *= -1.0
+            if i % 7 == 3:
+                q[rng.integers(0, n, 10)] *= -1.0      # firmware sign flips
+            wins[i, side:side + 3] = acc
+            wins[i, side + 3:side + 6] = gyr
+            wins[i, side + 6:side + 10] = np.round(q.T * 10000.0)
+        if i % 11 == 5:
+            wins[i, 0:3, : n // 2] = 1.0                  # constant segment (zero crossings on ties)
+        if i % 13 == 7:
+            wins[i, 6:10, : n // 3] = 0.0                 # zero quaternions (no normalization)
+    return wins
+
+
+def recorded_windows(path: str) -> np.ndarray:
+    """Windows cut by a C-backend channel-layout DataBuffer while replaying a recording."""
+    from data_pipeline.data_buffer import DataBuffer
+    from data_pipeline.synchronizer import create_synchronizer
+    from sensors.recording import iter_records
+
+    captured = []
+
+    class _CaptureBuffer(DataBuffer):
+        def _process_channels(self, window, ptrs):
+            captured.append(window.copy())
+            return super()._process_channels(window, ptrs)
+
+    config.CONFIG.setdefault("processing", {})["backend"] = "c"
+    sync = create_synchronizer()
+    sync.buffer = _CaptureBuffer(layout="channel", worker=False)
+    now = [0.0]
+    if hasattr(sync, "set_clock"):
+        sync.set_clock(lambda: now[0])
+    for device_id, kind, values, ts in iter_records(path):
+        now[0] = ts
+        sync.update(device_id, kind, values, ts)
+    return np.array(captured, dtype=np.float32).reshape(-1, 20, LIB_WINDOW)
+
+
+def compare(name: str, wins: np.ndarray) -> bool:
+    initialize()
+    t0 = time.perf_counter()
+    ref = np.array([process_window(w.copy()) for w in wins], dtype=np.float32).reshape(-1, FEAT)
+    t_c = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    out = QuatFeatureExtractor().process_windows(wins)
+    t_np = time.perf_counter() - t0
+
+    exact = np.array_equal(ref[:, :16], out[:, :16])
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rel = np.abs(out - ref) / np.maximum(np.abs(ref), np.float32(1e-6))
+    angle_ok = bool(np.all(rel[:, 16:] <= ANGLE_RTOL))
+
+    print(f"[{name}] windows={len(wins)}  C={t_c / len(wins) * 1e6:.1f} us/window  "
+          f"NumPy batched={t_np / len(wins) * 1e6:.1f} us/window")
+    print(f"  features 0-15 bit-exact: {exact}   "
+          f"(mismatching values: {int(np.count_nonzero(ref[:, :16] != out[:, :16]))})")
+    print(f"  angle features max rel err: {float(np.max(rel[:, 16:])):.2e} (tol {ANGLE_RTOL:g}) "
+          f"exact: {int(np.count_nonzero(ref[:, 16:] == out[:, 16:]))}/{ref[:, 16:].size}")
+    if not exact:
+        bad = np.flatnonzero(np.any(ref[:, :16] != out[:, :16], axis=0))
+        print(f"  mismatching feature indexes: {bad.tolist()}")
+    return exact and angle_ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description="NumPy vs C feature extraction parity")
+    parser.add_argument("--windows", type=int, default=256, help="synthetic windows")
+    parser.add_argument("--recording", help="also check windows cut from this recording")
+    args = parser.parse_args()
+
+    ok = compare("synthetic", synthetic_windows(args.windows, LIB_WINDOW))
+    if args.recording:
+        wins = recorded_windows(args.recording)
+        if len(wins):
+            ok = compare("recorded", wins) and ok
+        else:
+            print("[recorded] no complete window in the recording")
+    print("PARITY OK" if ok else "PARITY FAILED")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+# benchmarks/check_imu_packet.py
+# Replay-based check of the combined IMU packet decoder (sensors/feature_imu_packet.py), no hardware needed.
+#
+#   round trip : random acc/gyr/quat int16 packets, with and without sequence counter, encoded and decoded
+#   recording  : each wrist's acc/gyr/quat notifications of a recording are assembled into triplets (as the
+#                fused listener does) and quantized to the firmware int16 payloads. Each triplet is packed as
+#                the firmware would (encode_imu_packet, 2 byte timestamp first), decoded through the packet
+#                fast path and pushed to a synchronizer with update_triplet. Decoded values, sequence counters
+#                and the features of every window must match a second synchronizer fed with the same payloads
+#                decoded by the three separate feature decoders.
+# FeatureImuPacket.extract_data (SDK path) is checked too when blue_st_sdk is installed.
+#
+# Run from the repository root:
+#   python -m benchmarks.check_imu_packet [--recording FILE] [--packets 100000]
+#
+# Author: Francesco Urru
+# Github: https://github.com/frarvo
+# Repository: https://github.com/frarvo/STOPme
+# License: MIT
+
+import argparse
+import struct
+import sys
+
+import numpy as np
+
+import utils.config as config
+from sensors.fast_decode import (
+    GYR_SCALE, decode_imu_packet, encode_imu_packet, decode_acc, decode_gyr, decode_quat_compact,
+    install_packet_fast_path
+)
+
+_TS = struct.pack("<H", 0x1234)
+_VEC3 = struct.Struct("<3h")
+
+try:
+    from sensors.feature_imu_packet import FeatureImuPacket
+except ImportError:
+    FeatureImuPacket = None
+
+
+def round_trip(packets: int, seed: int = 0) -> bool:
+    rng = np.random.default_rng(seed)
+    raw = rng.integers(-32768, 32768, (packets, 9)).tolist()
+    bad = 0
+    for i, r in enumerate(raw):
+        seq = i & 0xFFFF if i % 2 else None
+        acc, gyr, quat = r[0:3], [v / GYR_SCALE for v in r[3:6]], r[6:9] + [0]
+        data = _TS + encode_imu_packet(acc, gyr, quat, seq)
+        d_acc, d_gyr, d_quat, d_seq = decode_imu_packet(data, 2)
+        ok = (list(d_acc) == acc and list(d_gyr) == gyr and list(d_quat[:3]) == r[6:9]
+              and d_quat[3] == decode_quat_compact(struct.pack("<3h", *r[6:9]))[3] and d_seq == seq)
+        if FeatureImuPacket is not None:
+            sample = FeatureImuPacket(None).extract_data(0, data, 2).get_sample()
+            ok = ok and sample.get_data() == list(d_acc) + list(d_gyr) + list(d_quat) + [-1 if seq is None else seq]
+        bad += not ok
+    print(f"[round trip] packets={packets} mismatches={bad} (SDK extract_data checked: {FeatureImuPacket is not None})")
+    return bad == 0
+
+
+class _Feature:
+    """Stands in for the SDK feature with listener registered on it (fast path active)."""
+
+    def __init__(self, listener):
+        self._listeners = [listener]
+
+    def update(self, timestamp, data, offset, notify_update=False):
+        raise RuntimeError("SDK update should not be reached")
+
+
+class _PacketSink:
+    """Stands in for ImuPacketFeatureListener, with the notification timestamp of the recording."""
+
+    def __init__(self, device_id, sync):
+        self.device_id, self.sync = device_id, sync
+        self.ts = 0.0
+        self.decoded = []
+
+    def push_packet(self, acc, gyr, quat, seq, dev_ts=None):
+        self.decoded.append((acc, gyr, quat, seq))
+        self.sync.update_triplet(self.device_id, acc, gyr, quat, self.ts)
+
+
+def _int16(values, scale: float = 1.0) -> bytes:
+    return _VEC3.pack(*(min(32767, max(-32768, int(round(v * scale)))) for v in values[:3]))
+
+
+def _separate_notifications(acc, gyr, quat):
+    """Triplet as delivered by the three separate features (int16 payloads, SDK scaling)."""
+    return decode_acc(_int16(acc)), decode_gyr(_int16(gyr, GYR_SCALE)), decode_quat_compact(_int16(quat))
+
+
+def _features_sync(out: list):
+    from data_pipeline.synchronizer import create_synchronizer
+    sync = create_synchronizer()
+    sync.buffer.set_features_sink(lambda f, ts: out.append((np.array(f, dtype=np.float32), ts)))
+    return sync
+
+
+def replay(path: str) -> bool:
+    from sensors.recording import iter_records
+    config.CONFIG.setdefault("processing", {})["worker"] = False
+    feats_packet, feats_ref = [], []
+    sync_packet, sync_ref = _features_sync(feats_packet), _features_sync(feats_ref)
+    now = [0.0]
+    for sync in (sync_packet, sync_ref):
+        if hasattr(sync, "set_clock"):
+            sync.set_clock(lambda: now[0])
+
+    sinks, updates, pending, sent = {}, {}, {}, {}
+    for device_id, kind, values, ts in iter_records(path):
+        now[0] = ts
+        if device_id not in sinks:
+            sinks[device_id] = _PacketSink(device_id, sync_packet)
+            feature = _Feature(sinks[device_id])
+            install_packet_fast_path(feature, sinks[device_id])
+            updates[device_id] = feature.update
+            pending[device_id], sent[device_id] = {}, []
+        p = pending[device_id]
+        p[kind] = tuple(values[:4 if kind == "quat" else 3])
+        if len(p) < 3:
+            continue
+        pending[device_id] = {}
+        acc, gyr, quat = _separate_notifications(p["acc"], p["gyr"], p["quat"])
+        seq = len(sent[device_id]) & 0xFFFF
+        sinks[device_id].ts = ts
+        updates[device_id](0, _TS + encode_imu_packet(acc, gyr, quat, seq), 2, True)
+        sync_ref.update_triplet(device_id, acc, gyr, quat, ts)
+        sent[device_id].append((acc, gyr, quat, seq))
+
+    ok = True
+    for device_id, sink in sinks.items():
+        match = sum(d == s for d, s in zip(sink.decoded, sent[device_id]))
+        print(f"[recording] {device_id}: packets={len(sent[device_id])} decoded equal={match}")
+        ok = ok and match == len(sent[device_id]) == len(sink.decoded)
+    same = len(feats_packet) == len(feats_ref) and all(
+        np.array_equal(a, b) and ta == tb for (a, ta), (b, tb) in zip(feats_packet, feats_ref))
+    print(f"[recording] windows={len(feats_ref)} features equal: {same}")
+    return ok and same
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Combined IMU packet decoder check")
+    parser.add_argument("--packets", type=int, default=100000, help="random round-trip packets")
+    parser.add_argument("--recording", help="replay this recording as combined packets")
+    args = parser.parse_args()
+
+    ok = round_trip(args.packets)
+    if args.recording:
+        ok = replay(args.recording) and ok
+    print("IMU PACKET OK" if ok else "IMU PACKET FAILED")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
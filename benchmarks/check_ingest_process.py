@@ -0,0 +1,156 @@
+# benchmarks/check_ingest_process.py
+# Checks the process-isolated ingestion (sensors/ingest_process.py) with simulated BlueCoins, no BLE hardware.
+#
+# Each simulated ingest process has the signature of the real one and writes one triplet per sample period
+# through RingSink, stamping the arrival time when the sample is due; acc[0] carries the sample number and
+# acc[1] the time the sample was due. The main process runs an IngestSupervisor as SensorManager does.
+#   order     : every sample reaches the sink once and in order, across a crash and a hang of the processes
+#               (one process exits, the other stops beating: both are restarted, the ring sequence goes on)
+#   stamping  : arrival stamp error (stamp - due time) with a thread hogging the GIL of the main process,
+#               listener thread in the main process (ingest "thread") vs ingest process ("process"), plus the
+#               delivery delay to the sink with the process layout (ring sweep every poll_interval_ms)
+#
+# Run from the repository root:
+#   python -m benchmarks.check_ingest_process [--seconds 5] [--rate-hz 50]
+#
+# Author: Francesco Urru
+# Github: https://github.com/frarvo
+# Repository: https://github.com/frarvo/STOPme
+# License: MIT
+
+import argparse
+import os
+import threading
+import time
+
+import numpy as np
+
+from sensors.ingest_process import IngestSupervisor, RingSink, ShmRing, _CONNECTED, _HEARTBEAT, _PID, _SEQ, _STOP
+from utils.config import get_ingest_config
+
+
+def _simulated_ingest(device_id, name, address, entry, ring_name, capacity, radio):
+    """Simulated ingest process: triplets at entry["rate_hz"], optional crash or hang at a sample number."""
+    import signal
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    ring = ShmRing.attach(ring_name, capacity)
+    header = ring.header
+    header[_PID] = os.getpid()
+    header[_HEARTBEAT] = time.monotonic_ns()
+    sink = RingSink(ring)
+    period = 1.0 / entry["rate_hz"]
+    heartbeat_s = get_ingest_config()["heartbeat_s"]
+    k = start = int(header[_SEQ])     # restarted: the sequence goes on, no second crash/hang
+    due = time.monotonic()
+    next_beat = due
+    header[_CONNECTED] = 1
+    while not header[_STOP]:
+        due += period
+        time.sleep(max(0.0, due - time.monotonic()))
+        if k == entry.get("crash_at") and k > start:
+            os._exit(1)
+        if k == entry.get("hang_at") and k > start:
+            time.sleep(3600)
+        sink.update_triplet(device_id, (float(k), due, 0.0), (0.0, 0.0, 0.0), (1.0, 0.0, 0.0, 0.0),
+                            time.monotonic(), None)
+        k += 1
+        if time.monotonic() >= next_beat:
+            header[_HEARTBEAT] = time.monotonic_ns()
+            next_beat += heartbeat_s
+    header[_CONNECTED] = 0
+    del header
+    ring.close()
+
+
+class _Collector:
+    """Sink recording (sample number, due time, stamp, delivery time) per device."""
+
+    def __init__(self):
+        self.rows = {}
+
+    def update_triplet(self, device_id, acc, gyr, quat, ts, dev_ts=None):
+        self.rows.setdefault(device_id, []).append((acc[0], acc[1], ts, time.monotonic()))
+
+    def update(self, device_id, kind, values, ts, dev_ts=None):
+        raise AssertionError("the simulated processes only write triplets")
+
+
+def _gil_hog(stop: threading.Event) -> None:
+    # Pure Python work holding the GIL between switch intervals, as logging and window processing do
+    while not stop.is_set():
+        sum(i * i for i in range(20000))
+
+
+def _ms(values) -> str:
+    v = np.asarray(values) * 1e3
+    return f"p50={np.percentile(v, 50):.3f} ms p99={np.percentile(v, 99):.3f} ms max={v.max():.3f} ms"
+
+
+def check_order(seconds: float, rate_hz: float) -> bool:
+    cfg = dict(get_ingest_config(), heartbeat_timeout_s=1.0, restart_initial_s=0.2, restart_max_s=1.0)
+    crash_at, hang_at = int(rate_hz * seconds / 4), int(rate_hz * seconds / 3)
+    supervisor = IngestSupervisor(cfg)
+    sink = _Collector()
+    procs = [supervisor.add("sim_left", "SIML", "00:00:00:00:00:01", {"rate_hz": rate_hz, "crash_at": crash_at},
+                            sink, target=_simulated_ingest),
+             supervisor.add("sim_right", "SIMR", "00:00:00:00:00:02", {"rate_hz": rate_hz, "hang_at": hang_at},
+                            sink, target=_simulated_ingest)]
+    time.sleep(seconds)
+    supervisor.stop()
+    ok = True
+    for proc in procs:
+        k = np.array([r[0] for r in sink.rows.get(proc.device_id, [])])
+        in_order = len(k) > 0 and bool(np.all(np.diff(k) == 1)) and k[0] == 0
+        stats = proc.get_stats()
+        ok &= in_order and proc.restarts >= 1
+        print(f"[order] {proc.device_id}: {len(k)} samples, in order without gaps: {in_order}, "
+              f"restarts={proc.restarts} records={stats['records']}")
+    return ok
+
+
+def check_stamping(seconds: float, rate_hz: float) -> None:
+    period = 1.0 / rate_hz
+    stop = threading.Event()
+    hog = threading.Thread(target=_gil_hog, args=(stop,), daemon=True)
+    hog.start()
+
+    # Listener thread in the main process
+    errors = []
+
+    def listener():
+        due = time.monotonic()
+        end = due + seconds
+        while due < end:
+            due += period
+            time.sleep(max(0.0, due - time.monotonic()))
+            errors.append(time.monotonic() - due)
+    thread = threading.Thread(target=listener)
+    thread.start()
+    thread.join()
+    print(f"[stamp] thread : stamp error {_ms(errors)}")
+
+    # Ingest process
+    supervisor = IngestSupervisor()
+    sink = _Collector()
+    supervisor.add("sim", "SIM", "00:00:00:00:00:03", {"rate_hz": rate_hz}, sink, target=_simulated_ingest)
+    time.sleep(seconds + 1.0)
+    supervisor.stop()
+    stop.set()
+    rows = np.array(sink.rows.get("sim", [])[int(rate_hz):])    # first second: process start
+    if len(rows):
+        print(f"[stamp] process: stamp error {_ms(rows[:, 2] - rows[:, 1])}")
+        print(f"[stamp] process: delivery to the sink {_ms(rows[:, 3] - rows[:, 1])}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Process-isolated ingestion checks")
+    parser.add_argument("--seconds", type=float, default=5.0, help="duration of each check")
+    parser.add_argument("--rate-hz", type=float, default=50.0, help="samples per second per simulated wrist")
+    args = parser.parse_args()
+    ok = check_order(args.seconds, args.rate_hz)
+    check_stamping(args.seconds, args.rate_hz)
+    print("OK" if ok else "FAILED")
+
+
+if __name__ == "__main__":
+    main()
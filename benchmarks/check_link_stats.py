@@ -0,0 +1,97 @@
+# benchmarks/check_link_stats.py
+# Check of the packet loss accounting (sensors/link_stats.py) against injected link faults, no hardware needed.
+#
+# One stream per source is generated at --rate-hz for --seconds:
+#   seq : firmware counter (uint16, wraps several times)
+#   ts  : SDK sample timestamp with --tick-ms resolution (quantized steps) and clock drift
+# Random notifications are then dropped (single and bursts), duplicated and delivered late (swapped with the
+# next one). The counters must report exactly the injected losses, duplicates and reorders
+# (timestamp streams: as long as the tick is below ~2/3 of the sample period).
+# Costs per observe call are printed too (run on the BLE thread for every notification).
+#
+# Run from the repository root:
+#   python -m benchmarks.check_link_stats [--seconds 3600] [--loss 0.01] [--tick-ms 8]
+#
+# Author: Francesco Urru
+# Github: https://github.com/frarvo
+# Repository: https://github.com/frarvo/STOPme
+# License: MIT
+
+import argparse
+import sys
+import time
+
+import numpy as np
+
+from sensors.link_stats import StreamStats
+
+
+def faulty_stream(n: int, loss: float, seed: int):
+    """Indices delivered after losses/duplicates/reorders, with the injected counts."""
+    rng = np.random.default_rng(seed)
+    keep = np.ones(n, dtype=bool)
+    drop = rng.random(n) < loss
+    drop[: 16] = False                                  # let the timestamp step be learned first
+    for start in np.flatnonzero(rng.random(n) < loss / 20):
+        drop[start:start + int(rng.integers(2, 20))] = True
+    drop[-1] = False
+    keep &= ~drop
+    out = np.flatnonzero(keep).tolist()
+    delivered, dups, reorders = [], 0, 0
+    i = 0
+    while i < len(out):
+        r = rng.random()
+        if 16 < i < len(out) - 2 and r < loss / 2 and out[i + 1] == out[i] + 1:
+            # Late delivery of a notification with no loss around it: swapped with the next one
+            delivered += [out[i + 1], out[i]]
+            reorders += 1
+            i += 2
+            continue
+        delivered.append(out[i])
+        if i > 16 and r > 1.0 - loss / 2:
+            delivered.append(out[i])
+            dups += 1
+        i += 1
+    return delivered, int(drop.sum()), dups, reorders
+
+
+def check(name: str, stats: StreamStats, observe, keys, delivered, lost, dups, reorders) -> bool:
+    t0 = time.perf_counter()
+    for i in delivered:
+        observe(keys[i])
+    cost = (time.perf_counter() - t0) / len(delivered)
+    s = stats.get_stats()
+    ok = (s["lost"] == lost and s["duplicates"] == dups and s["reorders"] == reorders
+          and s["received"] == len(delivered) - dups and s["resyncs"] == 0)
+    print(f"[{name}] injected lost={lost} dups={dups} reorders={reorders} | counted lost={s['lost']} "
+          f"gaps={s['gaps']} dups={s['duplicates']} reorders={s['reorders']} resyncs={s['resyncs']} "
+          f"loss={s['loss_rate'] * 100:.2f}%  {cost * 1e6:.2f} us/notification  {'OK' if ok else 'MISMATCH'}")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Packet loss accounting check")
+    parser.add_argument("--seconds", type=float, default=3600.0, help="simulated stream length")
+    parser.add_argument("--rate-hz", type=float, default=50.0, help="notification rate")
+    parser.add_argument("--loss", type=float, default=0.01, help="single notification loss probability")
+    parser.add_argument("--tick-ms", type=float, default=8.0, help="device timestamp resolution")
+    args = parser.parse_args()
+
+    n = int(args.seconds * args.rate_hz)
+    delivered, lost, dups, reorders = faulty_stream(n, args.loss, seed=1)
+
+    seqs = [i & 0xFFFF for i in range(n)]
+    s_seq = StreamStats("bc_right", "imu")
+    ok = check("seq", s_seq, s_seq.observe_seq, seqs, delivered, lost, dups, reorders)
+
+    drift = 1.0 + 80e-6
+    ticks = np.floor((np.arange(n) / args.rate_hz * drift + 3.7) * 1000.0 / args.tick_ms).astype(np.int64).tolist()
+    s_ts = StreamStats("bc_right", "acc")
+    ok = check("ts ", s_ts, s_ts.observe_ts, ticks, delivered, lost, dups, reorders) and ok
+
+    print("LINK STATS OK" if ok else "LINK STATS MISMATCH")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
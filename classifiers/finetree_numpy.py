@@ -0,0 +1,108 @@
+# classifiers/finetree_numpy.py
+# Pure NumPy evaluator for the stereotipy FineTree, loaded from a compact array export of the C model
+#
+# The tree compiled into libPredictPericolosaWristsQuat.so is exported once (export_tree in
+# predict_models_wrapper_quat) to finetree_pericolosa_wrists_quat.npz:
+#   feature   int16[n]     predictor index tested at the node, -1 for leaves
+#   threshold float64[n]   go left when x[feature] < threshold
+#   children  int16[n, 2]  left/right child, -1 for leaves
+#   label     uint8[n]     label returned when the traversal stops at the node
+#   lib_sha256             SHA-256 of the library the tree was exported from
+# All rows of a (W, 18) feature matrix are walked down the tree together, one level per step.
+# A NaN in the tested feature stops the traversal at that node, like the C model.
+#
+# Regenerate the export (needs the C library, the one the stored hash matches unless --lib-sha256 is given for a
+# rebuilt library whose node count was checked against TREE_NODES in predict_models_wrapper_quat):
+#   python -m classifiers.finetree_numpy --export [--lib-sha256 HEX]
+#
+# Author: Francesco Urru
+# GitHub: https://github.com/frarvo
+# Repository: https://github.com/frarvo/STOPme
+# License: MIT
+
+import argparse
+import os
+from typing import Optional
+
+import numpy as np
+
+FEAT = 18
+TREE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "finetree_pericolosa_wrists_quat.npz")
+
+
+class FineTree:
+    """
+    Array-backed classification tree. predict(X) takes (W, 18) or (18,) features, returns np.uint8 labels.
+    """
+
+    def __init__(self, feature: np.ndarray, threshold: np.ndarray, children: np.ndarray, label: np.ndarray):
+        self.feature = np.asarray(feature, dtype=np.intp)
+        self.threshold = np.asarray(threshold, dtype=np.float64)
+        self.children = np.asarray(children, dtype=np.intp).reshape(-1, 2)
+        self.label = np.asarray(label, dtype=np.uint8)
+        n = len(self.feature)
+        if not (len(self.threshold) == len(self.children) == len(self.label) == n):
+            raise ValueError("Tree arrays must have the same number of nodes")
+        self.n_nodes = n
+        # Leaves point to themselves so that finished rows can keep stepping without branching
+        leaf = self.feature < 0
+        self._var = np.where(leaf, 0, self.feature)
+        self._kids = np.where(leaf[:, None], np.arange(n)[:, None], self.children)
+
+    @classmethod
+    def load(cls, path: Optional[str] = None) -> "FineTree":
+        with np.load(path or TREE_PATH) as data:
+            return cls(data["feature"], data["threshold"], data["children"], data["label"])
+
+    def save(self, path: Optional[str] = None, lib_sha256: Optional[str] = None) -> None:
+        extra = {"lib_sha256": np.array(lib_sha256)} if lib_sha256 else {}
+        np.savez(path or TREE_PATH, feature=self.feature.astype(np.int16), threshold=self.threshold,
+                 children=self.children.astype(np.int16), label=self.label, **extra)
+
+    def predict(self, X) -> np.ndarray:
+        x = np.asarray(X, dtype=np.float32)
+        single = x.ndim == 1
+        x = np.atleast_2d(x).astype(np.float64)
+        if x.shape[1] != FEAT:
+            raise ValueError(f"Expected {FEAT} features per row, got {x.shape[1]}")
+
+        rows = np.arange(x.shape[0])
+        node = np.zeros(x.shape[0], dtype=np.intp)
+        active = rows
+        while active.size:
+            n = node[active]
+            v = x[active, self._var[n]]
+            go = (self.feature[n] >= 0) & ~np.isnan(v)
+            active, n, v = active[go], n[go], v[go]
+            node[active] = self._kids[n, (v >= self.threshold[n]).astype(np.intp)]
+        labels = self.label[node]
+        return labels[0] if single else labels
+
+
+def stored_library_hash(path: Optional[str] = None) -> Optional[str]:
+    """SHA-256 of the library an export was made from, None when the export does not record it."""
+    with np.load(path or TREE_PATH) as data:
+        return str(data["lib_sha256"]) if "lib_sha256" in data.files else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="FineTree array export")
+    parser.add_argument("--export", action="store_true", help="export the tree of the C library")
+    parser.add_argument("--path", default=TREE_PATH, help="export file")
+    parser.add_argument("--lib-sha256", help="hash of a library checked to match TREE_NODES "
+                                             "(default: the one recorded in the current export)")
+    args = parser.parse_args()
+    if not args.export:
+        parser.print_help()
+        return
+    lib_sha256 = args.lib_sha256 or (stored_library_hash() if os.path.exists(TREE_PATH) else None)
+    if not lib_sha256:
+        parser.error("no library hash recorded in the export, give --lib-sha256")
+    from classifiers.predict_models_wrapper_quat import export_tree
+    tree = FineTree(**export_tree(lib_sha256))
+    tree.save(args.path, lib_sha256)
+    print(f"Exported {tree.n_nodes} nodes ({int(np.count_nonzero(tree.feature < 0))} leaves) to {args.path}")
+
+
+if __name__ == "__main__":
+    main()
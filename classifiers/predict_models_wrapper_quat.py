@@ -7,6 +7,7 @@
 # License: MIT
 
 import ctypes as ct
+import hashlib
 import numpy as np
 import os
 from numpy.ctypeslib import ndpointer
@@ -29,6 +30,16 @@ lib.Predict_Pericolosa_Wrists_Quat.argtypes = [Float18]
 # Outputs
 lib.Predict_Pericolosa_Wrists_Quat.restype = ct.c_ubyte
 
+# Unchecked handle on the same symbol for the batch path (raw row pointers, no ndpointer checks)
+_predict_raw = lib["Predict_Pericolosa_Wrists_Quat"]
+_predict_raw.argtypes = [ct.c_void_p]
+_predict_raw.restype = ct.c_ubyte
+
+# Model constructor (MATLAB Coder CompactClassificationTree, internal symbol): fills the tree arrays, returns the
+# node count. Only bound by export_tree() (offline), for a library whose tree size is known (see export_tree)
+TREE_NODES = 185
+N_CLASSES = 3
+
 # Optional init
 try:
     lib.c_Predict_Pericolosa_Wrists_Qua.restype = None
@@ -56,4 +67,81 @@ def predict_pericolosa_wrists_quat(x) -> int:
     returns an int label for detected stereotipy (1, 2, 3)
     """
     a = _as_f32_150(x)
-    return int(lib.Predict_Pericolosa_Wrists_Quat(a))
\ No newline at end of file
+    return int(lib.Predict_Pericolosa_Wrists_Quat(a))
+
+def predict_pericolosa_wrists_quat_batch(X) -> np.ndarray:
+    """
+    X: (W, 18) feature matrix (one window per row)
+    returns np.uint8[W] labels, same as predict_pericolosa_wrists_quat row by row.
+    The matrix is converted once; each row is passed to the library by address.
+    """
+    a = np.ascontiguousarray(X, dtype=np.float32)
+    if a.ndim != 2 or a.shape[1] != FEAT:
+        raise ValueError(f"Expected shape (W, {FEAT}), got {a.shape}")
+    out = np.empty(a.shape[0], dtype=np.uint8)
+    base, stride = a.ctypes.data, a.strides[0]
+    for i in range(a.shape[0]):
+        out[i] = _predict_raw(base + i * stride)
+    return out
+
+def library_sha256() -> str:
+    """SHA-256 (hex) of the classifier library file."""
+    with open(LIB_PATH, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+def export_tree(lib_sha256: str) -> dict:
+    """
+    Read the FineTree compiled into the library as flat arrays (see classifiers/finetree_numpy.py).
+    The constructor writes the whole tree into buffers of TREE_NODES nodes before its size can be checked:
+    it is only called when lib_sha256 is the hash of the loaded library, i.e. a library whose tree is known
+    to have TREE_NODES nodes (stored with the export, finetree_numpy.py).
+    Returns:
+        feature   int16[n]     predictor index (0-based) tested at each node, -1 for leaves
+        threshold float64[n]   go left when x[feature] < threshold
+        children  int16[n, 2]  left/right child (0-based), -1 for leaves
+        label     uint8[n]     predicted label when the traversal stops at the node (min expected cost)
+    """
+    actual = library_sha256()
+    if actual != lib_sha256:
+        raise RuntimeError(f"{LIB_PATH} (sha256 {actual}) is not the library the tree size {TREE_NODES} was checked "
+                           f"against (sha256 {lib_sha256}): check its node count and TREE_NODES first")
+    try:
+        tree_com = lib["c_CompactClassificationTree_Com"]
+    except AttributeError as e:
+        raise RuntimeError(f"{LIB_PATH} has no tree constructor symbol: {e}")
+    tree_com.argtypes = [ct.c_void_p] * 12
+    tree_com.restype = ct.c_int
+
+    n = TREE_NODES
+    cut_var = np.zeros(n)
+    children = np.zeros(2 * n)
+    cut_point = np.zeros(n)
+    prune_list = np.zeros(n)
+    is_leaf = np.zeros(n, dtype=np.int32)
+    unused = np.zeros(n, dtype=np.int32)
+    class_flags = np.zeros(N_CLASSES, dtype=np.int32)
+    n_vars = np.zeros(1, dtype=np.int32)
+    prior = np.zeros(N_CLASSES)
+    class_names = np.zeros(N_CLASSES, dtype=np.int32)
+    cost = np.zeros(N_CLASSES * N_CLASSES)
+    class_prob = np.zeros(N_CLASSES * n)
+    bufs = (cut_var, children, cut_point, prune_list, is_leaf, unused,
+            class_flags, n_vars, prior, class_names, cost, class_prob)
+    nodes = tree_com(*[b.ctypes.data for b in bufs])
+    if nodes != n:
+        raise RuntimeError(f"Unexpected tree size {nodes} (expected {n})")
+
+    # Nodes pruned at level 0 or flagged as leaves stop the traversal
+    leaf = (prune_list <= 0) | (is_leaf != 0) | (cut_var <= 0)
+    feature = np.where(leaf, -1, cut_var - 1).astype(np.int16)
+    kids = np.where(leaf[:, None], -1, children.reshape(n, 2) - 1).astype(np.int16)
+
+    # Expected misclassification cost per class (same summation order as the library), first minimum wins
+    prob = class_prob.reshape(N_CLASSES, n)                    # column-major (n, 3) in the library
+    cost = cost.reshape(N_CLASSES, N_CLASSES)                  # cost[j] = cost of predicting class j
+    exp_cost = np.zeros((n, N_CLASSES))
+    for j in range(N_CLASSES):
+        for k in range(N_CLASSES):
+            exp_cost[:, j] = exp_cost[:, j] + prob[k] * cost[j, k]
+    label = (np.argmin(exp_cost, axis=1) + 1).astype(np.uint8)
+    return {"feature": feature, "threshold": cut_point.copy(), "children": kids, "label": label}
@@ -10,14 +10,20 @@ import uuid
 from datetime import datetime
 import numpy as np
 
-from utils.logger import log_system, log_event
+from utils.logger import log_system, log_event, get_logger
+from queue import Queue
+from typing import Optional
+
 from utils.event_queue import enqueue_drop_oldest, get_event_queue
+from utils import tracing
 
 # Import model wrapper
 from classifiers.predict_models_wrapper_quat import (
     predict_pericolosa_wrists_quat, initialize
 )
 
+_log = get_logger("Classifier")
+
 
 class StereotipyClassifier:
     """
@@ -26,9 +32,10 @@ class StereotipyClassifier:
     runs model, and enqueues recognition events for actuation.
     """
 
-    def __init__(self, source: str = "dual_wrist"):
+    def __init__(self, source: str = "dual_wrist", queue: Optional[Queue] = None):
         self.source = source
-        self.q = get_event_queue()
+        self.q = queue if queue is not None else get_event_queue()
+        self._last_tag: Optional[str] = None    # result repeated for windows skipped by the activity gate
         # Initialize classifier
         initialize()
 
@@ -56,8 +63,39 @@ class StereotipyClassifier:
             }
         except Exception as e:
             log_system(f"[Classifier] Error: {type(e).__name__}: {e}", level="ERROR")
+            self._last_tag = None       # nothing to repeat for gated windows
+            return None
+
+        self._last_tag = event["stereotipy_tag"]
+        trace = tracing.current()
+        if trace is not None:
+            trace.mark("classified")
+            event["trace"] = trace
+
+        return self._enqueue(event)
+
+    # Sink for windows skipped by the buffer activity gate
+    def still(self, ts: float):
+        """
+        Result of a still window whose posture matches the last classified (still) window: its result repeated,
+        no features and no model call.
+        Args:
+            ts: timestamp of last buffer row
+        """
+        if self._last_tag is None:
             return None
+        event = {
+            "id": uuid.uuid4().hex,
+            "timestamp": datetime.now().isoformat(),
+            "window_ts": float(ts) if ts is not None else None,
+            "source": self.source,
+            "features": None,
+            "stereotipy_tag": self._last_tag,
+            "gated": True
+        }
+        return self._enqueue(event)
 
+    def _enqueue(self, event: dict):
         dropped, dropped_item = enqueue_drop_oldest(self.q, event, kind="imu")
         if dropped:
             log_system("[Classifier] Oldest event dropped (queue full)", level="WARNING")
@@ -73,5 +111,5 @@ class StereotipyClassifier:
             except Exception:
                 pass
 
-        log_system(f"[Classifier] Event enqueued: {event}")
+        _log.debug("Event enqueued: %s", event)
         return event
\ No newline at end of file
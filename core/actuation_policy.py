@@ -27,8 +27,10 @@ class StereotipyActivationPolicy:
         "successful". Next time the same tag appears, choose this actuator.
     """
 
-    def __init__(self, actuator_ids: List[str]):
-        self.actuator_ids = list(actuator_ids or [])
+    def __init__(self, actuator_ids: List[str], allowed: Optional[List[str]] = None):
+        # Actuators reserved to this policy's subject (ids or addresses), None/empty: every actuator
+        self.allowed = [str(a) for a in (allowed or [])]
+        self.actuator_ids = [a for a in (actuator_ids or []) if self.accepts(a)]
         self.retries_per_actuator = max(1, int(get_policy_attempts()))
         self.rng = random.Random()
 
@@ -71,6 +73,29 @@ class StereotipyActivationPolicy:
         self._spk_key_mild = f"NON_DANGEROUS_{self.lang.upper()}"
         self._spk_key_strong = f"DANGEROUS_{self.lang.upper()}"
 
+    def accepts(self, actuator_id: str) -> bool:
+        """
+        True when the actuator may be used for this subject (actuators list of its bluecoins group).
+        """
+        if not self.allowed:
+            return True
+        return any(actuator_id == a or actuator_id.endswith("_" + a) for a in self.allowed)
+
+    def add_actuator(self, actuator_id: str) -> None:
+        """
+        Actuator attached to the running system (concurrent startup). The list is replaced, not mutated,
+        since the dispatcher thread reads it.
+        """
+        if actuator_id not in self.actuator_ids and self.accepts(actuator_id):
+            self.actuator_ids = self.actuator_ids + [actuator_id]
+
+    def remove_actuator(self, actuator_id: str) -> None:
+        """
+        Actuator gone from the running system (known device that never connected). The list is replaced.
+        """
+        if actuator_id in self.actuator_ids:
+            self.actuator_ids = [a for a in self.actuator_ids if a != actuator_id]
+
     def handle(self, event: dict) -> Optional[Dict]:
         if not self.actuator_ids:
             return None
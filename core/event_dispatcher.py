@@ -11,7 +11,8 @@ import threading
 import time
 
 from utils.event_queue import get_event_queue
-from utils.logger import log_system,log_event
+from utils import tracing
+from utils.logger import log_system,log_event,get_logger
 
 
 LABELS = {
@@ -23,21 +24,27 @@ LABELS = {
 
 ACTUATION_COOLDOWN = 5
 
+_log = get_logger("Dispatcher")
+
 class EventDispatcher:
     """
     Creates a thread that consumes event queue and dispatches actions via activation policy.
     """
-    def __init__(self, actuator_manager, policy):
+    def __init__(self, actuator_manager, policy, queue=None, name: str = "Dispatcher"):
         """
         Initializes the dispatcher with actuator manager and activation policies.
         Args:
             actuator_manager: Instance of ActuatorManager for device control.
             policy: chooses which actuator to activate
+            queue: event queue to consume (the global one when None, one per subject otherwise)
+            name: log tag, e.g. "Dispatcher: s1"
         """
         self.actuator_manager = actuator_manager
         self.policy = policy
+        self.queue = queue if queue is not None else get_event_queue()
+        self.name = name
         self._stop_event = threading.Event()
-        self._thread = threading.Thread(target=self._process_events, daemon=True)
+        self._thread = threading.Thread(target=self._process_events, daemon=True, name=name)
         self._last_tag = None
         self._last_actuation_time = None
 
@@ -46,7 +53,7 @@ class EventDispatcher:
         Starts the thread.
         """
         self._thread.start()
-        log_system("[Dispatcher] Started.")
+        log_system(f"[{self.name}] Started.")
 
     def stop(self):
         """
@@ -55,15 +62,19 @@ class EventDispatcher:
         self._stop_event.set()
         if self._thread.is_alive():
             self._thread.join()
-        log_system("[Dispatcher] Stopped.")
+        log_system(f"[{self.name}] Stopped.")
 
     def _process_events(self):
-        q = get_event_queue()
+        q = self.queue
         while not self._stop_event.is_set():
             try:
                 event = q.get(timeout=0.5)
             except queue.Empty:
                 continue
+            trace = event.get("trace")
+            if trace is not None:
+                trace.mark("dequeued")
+                tracing.set_current(trace)
             try:
                 raw_tag = event.get("stereotipy_tag", "")
                 try:
@@ -87,9 +98,9 @@ class EventDispatcher:
                             actuations = [{"target": result["actuator_id"], "params": result["params"]}]
                             self._last_actuation_time = now_time
                         except Exception as e:
-                            log_system(f"[Dispatcher] Trigger error on {result.get('actuator_id')}: {e}", level="ERROR")
+                            log_system(f"[{self.name}] Trigger error on {result.get('actuator_id')}: {e}", level="ERROR")
                     else:
-                        log_system("[Dispatcher] Policy returned no action.")
+                        _log.debug("Policy returned no action.")
                         # Reset actuation timer
                         self._last_actuation_time = None
 
@@ -117,14 +128,15 @@ class EventDispatcher:
                                     )
                                     self._last_actuation_time = now_time
                             except Exception as e:
-                                log_system(f"[Dispatcher] Trigger retry error: {e}", level="ERROR")
+                                log_system(f"[{self.name}] Trigger retry error: {e}", level="ERROR")
                     else:
                         # tag 0,3 no actions
                         pass
 
             except Exception as e:
-                log_system(f"[Dispatcher] Dispatch error: {e}", level="ERROR")
+                log_system(f"[{self.name}] Dispatch error: {e}", level="ERROR")
             finally:
+                tracing.set_current(None)
                 try:
                     q.task_done()
                 except Exception:
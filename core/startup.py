@@ -0,0 +1,126 @@
+# core/startup.py
+# Concurrent startup of sensors and actuators (startup section of config.yaml)
+#
+# Scans and connections only conflict when they use the same radio: the BLE stacks (BlueST/bluepy for the
+# BlueCoins and MetaMotion, bluetoothctl for the speakers) share the HCI adapter, the LED strips are found
+# over Wi-Fi. StartupScheduler runs every step on its own thread as soon as the steps it comes after are
+# done, holding the radio lock (utils/lock.py radio_lock) of each resource it declares, so steps on
+# different radios overlap and steps on the same adapter run one at a time.
+# main.py scans the actuators sharing the BlueCoin adapter before the BlueCoins (no scan on that adapter while
+# they stream), starts streaming as soon as both BlueCoins are connected and connects those actuators after;
+# actuators on another radio (LED Wi-Fi) come up in parallel. Each kind attaches to the running system
+# (policy and dispatcher) as it comes up.
+# Step durations are logged relative to launch, and so is the first processed window (log_first_window).
+#
+# Author: Francesco Urru
+# GitHub: https://github.com/frarvo
+# Repository: https://github.com/frarvo/STOPme
+# License: MIT
+
+import threading
+import time
+from typing import Callable, Dict, Iterable, Optional
+
+from utils.lock import radio_lock
+from utils.logger import log_system
+
+LAUNCH = time.monotonic()  # process start, reference of the startup timings
+
+
+def since_launch() -> float:
+    return time.monotonic() - LAUNCH
+
+
+class _Step:
+    __slots__ = ("name", "fn", "resources", "after", "done", "ok", "started", "finished")
+
+    def __init__(self, name: str, fn: Callable[[], Optional[bool]], resources: Iterable[str], after: Iterable[str]):
+        self.name = name
+        self.fn = fn
+        self.resources = sorted(set(resources))   # fixed order, no lock order inversion between steps
+        self.after = tuple(after)
+        self.done = threading.Event()
+        self.ok = False
+        self.started = None
+        self.finished = None
+
+
+class StartupScheduler:
+    """
+    Dependency and radio aware runner of the startup steps.
+        add(name, fn, resources, after): fn returns False on failure (None counts as success);
+                                         steps after a failed step are skipped
+        start(): every step on its own daemon thread
+        wait(name, timeout): True when the step finished successfully
+    """
+
+    def __init__(self):
+        self._steps: Dict[str, _Step] = {}
+        self._threads = []
+
+    def add(self, name: str, fn: Callable[[], Optional[bool]], resources: Iterable[str] = (),
+            after: Iterable[str] = ()) -> None:
+        if name in self._steps:
+            raise ValueError(f"duplicate startup step {name}")
+        self._steps[name] = _Step(name, fn, resources, after)
+
+    def start(self) -> None:
+        for step in self._steps.values():
+            missing = [a for a in step.after if a not in self._steps]
+            if missing:
+                raise ValueError(f"startup step {step.name} comes after unknown steps {missing}")
+        for step in self._steps.values():
+            thread = threading.Thread(target=self._run, args=(step,), daemon=True, name=f"Startup-{step.name}")
+            thread.start()
+            self._threads.append(thread)
+
+    def wait(self, name: str, timeout: Optional[float] = None) -> bool:
+        step = self._steps[name]
+        return step.done.wait(timeout) and step.ok
+
+    def wait_all(self, timeout: Optional[float] = None) -> bool:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for step in self._steps.values():
+            left = None if deadline is None else max(0.0, deadline - time.monotonic())
+            if not step.done.wait(left):
+                return False
+        return True
+
+    def _run(self, step: _Step) -> None:
+        try:
+            for name in step.after:
+                dep = self._steps[name]
+                dep.done.wait()
+                if not dep.ok:
+                    log_system(f"[Startup] {step.name} skipped ({name} failed)", level="WARNING")
+                    return
+            locks = [radio_lock(r) for r in step.resources]
+            for lock in locks:
+                lock.acquire()
+            try:
+                step.started = since_launch()
+                log_system(f"[Startup] {step.name} started at +{step.started:.1f}s"
+                           + (f" (holding {', '.join(step.resources)})" if step.resources else ""))
+                step.ok = step.fn() is not False
+            finally:
+                for lock in reversed(locks):
+                    lock.release()
+            step.finished = since_launch()
+            log_system(f"[Startup] {step.name} {'done' if step.ok else 'failed'} at +{step.finished:.1f}s "
+                       f"({step.finished - step.started:.1f}s)", level="INFO" if step.ok else "WARNING")
+        except Exception as e:
+            log_system(f"[Startup] {step.name} error: {type(e).__name__}: {e}", level="ERROR")
+        finally:
+            step.done.set()
+
+
+def log_first_window(buffer, sink: Callable) -> None:
+    """
+    Installs sink as the buffer features sink behind a one-shot wrapper that logs the time from launch
+    to the first processed window.
+    """
+    def first(features, ts):
+        buffer.set_features_sink(sink)
+        log_system(f"[Startup] First window processed at +{since_launch():.1f}s from launch")
+        return sink(features, ts)
+    buffer.set_features_sink(first)
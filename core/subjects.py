@@ -0,0 +1,108 @@
+# core/subjects.py
+# Multi-subject mode: one processing chain per child wearing a pair of BlueCoins (bluecoins section of config.yaml)
+#
+# Everything after the BLE listeners used to be single-subject: one synchronizer keyed on bc_left/bc_right,
+# the module-global event queue, one classifier, one dispatcher with one policy state, one event diary.
+# SubjectPipeline holds that chain for one subject:
+#   synchronizer (its wrists' device ids) -> DataBuffer -> StereotipyClassifier -> own event queue
+#   (windows skipped by the activity gate -> StereotipyClassifier.still, last result repeated)
+#   -> EventDispatcher with its own StereotipyActivationPolicy (actuators of its group, or all of them)
+# and writes its own event diary (Event_Diary_dual_wrist_<subject>.log; dual_wrist for the single subject).
+# The window processing of every subject runs on one WindowWorkerPool (processing.pool_threads), so adding
+# subjects adds work to the pool, not threads; windows of one subject stay in order.
+# The C feature library keeps the wrists' reference quaternions in global state, so with several subjects
+# every buffer gets its own NumPy extractor (processing.backend "auto"/"numpy"; "c" falls back with a warning).
+# The single-subject configuration runs exactly as before: global event queue, dedicated worker thread,
+# configured backend.
+#
+# Author: Francesco Urru
+# GitHub: https://github.com/frarvo
+# Repository: https://github.com/frarvo/STOPme
+# License: MIT
+
+import os
+from typing import List, Optional
+
+from classifiers.stereotipy_classifier import StereotipyClassifier
+from core.actuation_policy import StereotipyActivationPolicy
+from core.event_dispatcher import EventDispatcher
+from data_pipeline.data_buffer import DataBuffer
+from data_pipeline.synchronizer import create_synchronizer
+from data_pipeline.window_worker import WindowWorkerPool
+from utils.config import get_subjects_config, get_processing_config
+from utils.event_queue import create_event_queue
+from utils.logger import log_system
+
+
+class SubjectPipeline:
+    """
+    Processing chain of one subject. Listeners of its two devices feed self.synchronizer;
+    start_dispatcher() attaches the actuation side.
+    """
+
+    def __init__(self, subject: dict, multi: bool, pool: Optional[WindowWorkerPool] = None,
+                 backend: Optional[str] = None):
+        self.id = subject["id"]
+        self.left = subject["left"]
+        self.right = subject["right"]
+        self.actuators = list(subject.get("actuators") or [])
+        self.source = f"dual_wrist_{self.id}" if multi else "dual_wrist"
+        self.tag = f"Subject: {self.id}"
+
+        buffer = DataBuffer(backend=backend, pool=pool,
+                            name=f"WindowWorker-{self.id}" if multi else "WindowWorker")
+        self.synchronizer = create_synchronizer(self.left["id"], self.right["id"], buffer)
+        self.buffer = self.synchronizer.buffer
+        # Single subject: the global queue, as before
+        self.queue = create_event_queue() if multi else None
+        self.classifier = StereotipyClassifier(source=self.source, queue=self.queue)
+        self.buffer.set_features_sink(self.classifier.recognize)
+        self.buffer.set_gated_sink(self.classifier.still)
+        self.policy: Optional[StereotipyActivationPolicy] = None
+        self.dispatcher: Optional[EventDispatcher] = None
+
+    def device_ids(self):
+        return self.left["id"], self.right["id"]
+
+    def start_dispatcher(self, actuator_manager, actuator_ids: List[str]) -> EventDispatcher:
+        """
+        Creates and starts the subject's policy and dispatcher.
+        """
+        self.policy = StereotipyActivationPolicy(actuator_ids=actuator_ids, allowed=self.actuators)
+        name = "Dispatcher" if self.queue is None else f"Dispatcher: {self.id}"
+        self.dispatcher = EventDispatcher(actuator_manager=actuator_manager, policy=self.policy,
+                                          queue=self.queue, name=name)
+        self.dispatcher.start()
+        return self.dispatcher
+
+    def stop_dispatcher(self) -> None:
+        if self.dispatcher is not None:
+            self.dispatcher.stop()
+            self.dispatcher = None
+
+
+def create_pipelines(subjects: Optional[List[dict]] = None):
+    """
+    Returns (pipelines, pool) for the configured subjects. pool is the shared WindowWorkerPool (not started),
+    None with a single subject and processing.pool_threads 0 (dedicated worker thread).
+    """
+    subjects = subjects if subjects is not None else get_subjects_config()
+    multi = len(subjects) > 1
+    proc_cfg = get_processing_config()
+    threads = proc_cfg["pool_threads"]
+    if threads <= 0 and multi:
+        threads = min(len(subjects), os.cpu_count() or 1)
+    pool = WindowWorkerPool(threads) if threads > 0 and proc_cfg["worker"] else None
+
+    backend = None
+    if multi:
+        if proc_cfg["backend"] == "c":
+            log_system("[Subjects] The C feature library keeps global state, using NumPy feature extraction "
+                       f"for {len(subjects)} subjects", level="WARNING")
+        backend = "numpy"
+
+    pipelines = [SubjectPipeline(s, multi, pool, backend) for s in subjects]
+    log_system(f"[Subjects] {len(pipelines)} subject(s): " +
+               ", ".join(f"{p.id} ({p.left['name']}/{p.right['name']})" for p in pipelines) +
+               (f", window processing on {pool.size} shared thread(s)" if pool else ""))
+    return pipelines, pool
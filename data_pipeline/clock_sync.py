@@ -0,0 +1,94 @@
+# data_pipeline/clock_sync.py
+# Device clock to host clock mapping for the synchronizers (sync.device_timestamps)
+#
+# Every BlueST notification carries the device timestamp (uint16 ticks, unwrapped by the SDK node), taken when
+# the sample was measured. Host arrival times (time.monotonic() in the listeners) add BLE connection interval
+# batching and thread scheduling jitter on top of that. DeviceClock keeps a running least squares fit
+#     host = offset + rate * device
+# per wrist over the recent (device, arrival) pairs, with exponential forgetting so that offset and drift are
+# followed over long sessions. Samples are then placed on the host timeline by their device timestamp:
+# samples measured together stay together no matter how late Python handled them.
+# The fit is restarted when arrivals stop matching it by more than max_residual_ms (device clock reset on
+# reconnection, long stall).
+#
+# Author: Francesco Urru
+# GitHub: https://github.com/frarvo
+# Repository: https://github.com/frarvo/STOPme
+# License: MIT
+
+from typing import Dict, Optional
+
+from utils.config import get_sync_config
+
+
+class DeviceClock:
+    """
+    Running linear fit of host arrival time against device timestamp for one device.
+        to_host(dev_ts, host_ts): adds the pair to the fit, returns the fitted host time of dev_ts
+                                  (host_ts itself until min_samples pairs have been seen)
+    """
+
+    def __init__(self, window: int = 500, min_samples: int = 20, max_residual: float = 0.5):
+        self.forget = 1.0 - 1.0 / max(2, int(window))
+        self.min_samples = max(2, int(min_samples))
+        self.max_residual = float(max_residual)
+        self.resets = 0
+        self.reset()
+
+    def reset(self) -> None:
+        self._d0: Optional[float] = None
+        self._h0 = 0.0
+        self._n = 0
+        # Weighted sums of x = dev - d0, y = host - h0
+        self._s = self._sx = self._sy = self._sxx = self._sxy = 0.0
+        self._a = 0.0           # fitted y at x = 0
+        self._b = 0.0           # host seconds per device tick
+
+    def to_host(self, dev_ts: float, host_ts: float) -> float:
+        if self._d0 is None:
+            self._d0, self._h0 = float(dev_ts), float(host_ts)
+        x = dev_ts - self._d0
+        y = host_ts - self._h0
+
+        if self._n >= self.min_samples and abs(self._a + self._b * x - y) > self.max_residual:
+            # Arrivals no longer follow the fit (device clock reset on reconnection, long stall)
+            self.resets += 1
+            self.reset()
+            self._d0, self._h0 = float(dev_ts), float(host_ts)
+            x = y = 0.0
+
+        f = self.forget
+        self._s = self._s * f + 1.0
+        self._sx = self._sx * f + x
+        self._sy = self._sy * f + y
+        self._sxx = self._sxx * f + x * x
+        self._sxy = self._sxy * f + x * y
+        self._n += 1
+
+        det = self._s * self._sxx - self._sx * self._sx
+        if det > 1e-12:
+            self._b = (self._s * self._sxy - self._sx * self._sy) / det
+            self._a = (self._sy - self._b * self._sx) / self._s
+        if self._n < self.min_samples:
+            return host_ts
+        return self._h0 + self._a + self._b * x
+
+    @property
+    def ready(self) -> bool:
+        return self._n >= self.min_samples
+
+    def get_stats(self) -> Dict[str, float]:
+        return {"samples": self._n, "rate": self._b, "offset": self._h0 + self._a - self._b * (self._d0 or 0.0),
+                "resets": self.resets}
+
+
+def create_device_clocks(device_ids) -> Optional[Dict[str, DeviceClock]]:
+    """
+    One DeviceClock per device id as configured in the sync section of config.yaml,
+    None when sync.device_timestamps is off (arrival times are used as they are).
+    """
+    cfg = get_sync_config()
+    if not cfg["device_timestamps"]:
+        return None
+    return {dev: DeviceClock(cfg["clock_fit_window"], cfg["clock_fit_min"], cfg["clock_max_residual_ms"] / 1000.0)
+            for dev in device_ids}
@@ -9,33 +9,84 @@
 # License: MIT
 
 from __future__ import annotations
-from typing import List, Tuple, Callable, Optional
+from typing import Tuple, Callable, Optional
 import threading
+import time
 import numpy as np
 
-from utils.logger import log_system
-from utils.config import get_buffer_config
-from data_pipeline.data_processing_wrapper_quat import process_data_wrists_quat, initialize as init_process
+from utils.logger import log_system, get_logger
+from utils.config import get_buffer_config, get_processing_config, get_activity_gate_config
+from utils import tracing
+from data_pipeline.data_processing_numpy_quat import QuatFeatureExtractor
+from data_pipeline.window_worker import WindowWorker, WindowWorkerPool
+try:
+    from data_pipeline.data_processing_wrapper_quat import (
+        process_data_wrists_quat, process_window, window_row_pointers, initialize as init_process, LIB_WINDOW
+    )
+    _LIB_ERROR = None
+except OSError as e:  # C library missing or built for another platform
+    _LIB_ERROR = e
 
 Vec3  = Tuple[float, float, float]
 Quat4 = Tuple[float, float, float, float]
 
+_log = get_logger("DataBuffer")
+
+CHANNELS = 20   # floats per row (RIGHT 10 + LEFT 10)
+ACC_SCALE = 1000.0  # accel mg -> g
+LAYOUTS = ("channel", "row")
+BACKENDS = ("auto", "c", "numpy")
+
 class DataBuffer:
     """
     Collects aligned wrists data rows from synchronizer and emits sliding windows for processing.
 
     Usage:
       - synchronizer calls add_buffer_row(R_acc, R_gyr, R_quat, L_acc, L_gyr, L_quat, ts)
-      - when a full window is ready buffer will:
-          * build 20 explicit np.float32 vectors (length = window_size)
-          * scale accel mg -> g
-          * call process_data_wrists_quat(...)
-          * push features (np.float32[18]) to the recognizer (trained classifier)
+      - samples are stored in a preallocated float32 ring plus a float64 timestamp ring
+      - when a full window is ready buffer will call processing and push features (np.float32[18])
+        to the recognizer (trained classifier)
+
+    Window assembly layouts (buffer.layout in config.yaml):
+      - "channel" (default): (20, capacity) ring with accel already scaled mg -> g at write time.
+        Each window is gathered once into a preallocated (20, window_size) C-contiguous matrix
+        whose row pointers are handed to the C library (process_window), no per-channel copies.
+      - "row": (capacity, 20) ring, window handed out as a view (or one gathered copy if the ring wraps),
+        20 channel vectors built from its columns and passed to process_data_wrists_quat(...)
+
+    Processing stage (processing.worker in config.yaml):
+      - worker (default): completed windows are copied into a preallocated slot and handed to a
+        WindowWorker thread (start()/stop()), so the caller (BLE notification thread) only pays for the copy
+        (the thread of a WindowWorkerPool shared by every subject's buffer when pool is given)
+      - inline: windows are processed on the caller thread
+
+    Feature extraction (processing.backend in config.yaml):
+      - "c": libProcessDataWristsQuat.so
+      - "numpy": QuatFeatureExtractor, same features for any window size
+      - "auto" (default): C library when it loads and was built for window_size, NumPy otherwise
+
+    Activity gate (activity_gate in config.yaml, off by default):
+      - when a window closes, the standard deviations of the acc and gyr norms of both wrists and the posture
+        (mean acc vector, mean quaternion of each wrist) are computed from the ring, a few NumPy ops per window
+      - still window (every norm under its threshold): processed normally and kept as posture reference
+      - still window whose posture has not moved from the reference (acc_drift_g, angle_drift_deg): not
+        processed, no copy, no features, no classification; the gated sink (set_gated_sink) gets its end
+        timestamp instead, in order with the processed windows (through the worker when enabled), and repeats
+        the result of the reference window: same data up to noise, same classifier output
+      - a moving window drops the reference, and so does a reference window dropped by the worker overflow
+        policy (never classified: the window that found it gone is processed); the calibration window is never gated
     """
 
     def __init__(self,
                  window_size: Optional[int] = None,
-                 hop_size:    Optional[int] = None):
+                 hop_size:    Optional[int] = None,
+                 capacity:    Optional[int] = None,
+                 layout:      Optional[str] = None,
+                 worker:      Optional[bool] = None,
+                 backend:     Optional[str] = None,
+                 pool:        Optional[WindowWorkerPool] = None,
+                 name:        str = "WindowWorker",
+                 activity_gate: Optional[bool] = None):
         cfg = get_buffer_config() or {}
 
         # Get Window size and hop_size from config.yaml
@@ -43,65 +94,166 @@ class DataBuffer:
         self.hop_size    = int(hop_size    if hop_size    is not None else cfg.get("overlap", 75))
         self._debug_print_buffer = bool(cfg.get("debug_print_buffer", False))
         self._debug_print_features = bool(cfg.get("debug_print_features", False))
-
-        # Storage (rows and timestamps are parallel)
-        self._rows: List[Tuple[float, ...]] = []   # each row has 20 floats (collected in a Tuple)
-        self._ts:   List[float] = []               # one ts per row (separate list)
+        self.layout = str(layout if layout is not None else cfg.get("layout", "channel")).lower()
+        if self.layout not in LAYOUTS:
+            log_system(f"[DataBuffer] Unknown layout '{self.layout}', using 'channel'", level="WARNING")
+            self.layout = "channel"
+
+        # Feature extraction backend
+        proc_cfg = get_processing_config() or {}
+        self.backend = self._select_backend(str(backend if backend is not None else proc_cfg.get("backend", "auto")).lower())
+        self._extractor = QuatFeatureExtractor() if self.backend == "numpy" else None
+        c_backend = self.backend == "c"
+
+        # Ring storage (samples and timestamps are parallel). Capacity defaults to two windows so that
+        # most windows are a contiguous slice of the ring
+        self.capacity = max(self.window_size, int(capacity if capacity is not None else 2 * self.window_size))
+        if self.layout == "channel":
+            self._data = np.zeros((CHANNELS, self.capacity), dtype=np.float32)  # one column = 20 floats
+            self._row = np.zeros(CHANNELS, dtype=np.float32)                    # scratch for the incoming row
+            # Window matrix handed to the C library (filtered in place by it, so it is a scratch copy)
+            self._window = np.zeros((CHANNELS, self.window_size), dtype=np.float32)
+            self._window_ts = np.zeros(self.window_size, dtype=np.float64)
+            self._window_ptrs = window_row_pointers(self._window) if c_backend else None
+        else:
+            self._data = np.zeros((self.capacity, CHANNELS), dtype=np.float32)  # one row = 20 floats
+        self._ts   = np.zeros(self.capacity, dtype=np.float64)                  # one ts per row
+        self._head = 0                          # next write position
+        self._filled = 0                        # valid rows in the ring (<= capacity)
+        self._pending = self.window_size        # rows still needed before the next window
         self._lock = threading.Lock()
 
         # Optional consumer for features (np.float32[18])
         self._features_sink: Optional[Callable[[np.ndarray, float], None]] = None
         self._windows_emitted = 0
 
+        # Activity gate: thresholds and posture (mean acc (2, 3) in g, unit mean quaternion (2, 4)) of the last
+        # processed still window, None when there is none
+        gate_cfg = get_activity_gate_config()
+        self._gate = bool(activity_gate if activity_gate is not None else gate_cfg["enable"])
+        self._gate_cfg = gate_cfg
+        self._gate_cos = float(np.cos(np.radians(gate_cfg["angle_drift_deg"]) / 2.0))   # min |<q, q_ref>|
+        self._gate_ref: Optional[Tuple[np.ndarray, np.ndarray]] = None
+        self._gate_ref_seq: Optional[int] = None   # worker hand-off seq of the reference window
+        self._gated_sink: Optional[Callable[[float], None]] = None
+        self._windows_gated = 0
+
         # Calibrated flag
         self._calibrated = False
 
-        log_system(f"[DataBuffer] init: window= {self.window_size} hop= {self.hop_size}")
-        init_process()
+        # Optional processing worker (off the caller thread)
+        use_worker = bool(worker if worker is not None else proc_cfg.get("worker", True))
+        self._worker: Optional[WindowWorker] = None
+        if use_worker:
+            channel = self.layout == "channel"
+            self._worker = WindowWorker(
+                process=self._on_window_ready,
+                shape=(CHANNELS, self.window_size) if channel else (self.window_size, CHANNELS),
+                window_size=self.window_size,
+                queue_size=proc_cfg.get("queue_size", 4),
+                overflow=proc_cfg.get("overflow", "drop_oldest"),
+                block_timeout_ms=proc_cfg.get("block_timeout_ms", 50),
+                ptrs_fn=window_row_pointers if channel and c_backend else None,
+                name=name,
+                pool=pool,
+            )
+
+        log_system(f"[DataBuffer] init: window= {self.window_size} hop= {self.hop_size} "
+                   f"capacity= {self.capacity} layout= {self.layout} worker= {'on' if self._worker else 'off'} "
+                   f"backend= {self.backend}" + (f" activity_gate= acc {gate_cfg['acc_std_g']} g, gyr "
+                                                 f"{gate_cfg['gyr_std_dps']} dps" if self._gate else ""))
+        if c_backend:
+            init_process()
 
     # Public API for external use
 
     def add_buffer_row(self,
                        R_acc: Vec3, R_gyr: Vec3, R_quat: Quat4,
                        L_acc: Vec3, L_gyr: Vec3, L_quat: Quat4,
-                       ts_emit: float) -> None:
+                       ts_emit: float, arrival: Optional[float] = None) -> None:
         """
         Append one row to the buffer (order must match).
-        Cast to float to match processing requirements
+        Values are written straight into the float32 ring, no per-row Python objects are kept.
+        arrival: listener arrival time of the row's newest sample when ts_emit is not it (device time, grid
+        time), used as the latency trace arrival.
         """
-        window_rows = None
+        window = None
         window_ts = None
-        row = (
-            float(R_acc[0]), float(R_acc[1]), float(R_acc[2]),                      # RIGHT acc_x, acc_y, acc_z
-            float(R_gyr[0]), float(R_gyr[1]), float(R_gyr[2]),                      # RIGHT gyr_x, gyr_y, gyr_z
-            float(R_quat[0]), float(R_quat[1]), float(R_quat[2]), float(R_quat[3]), # RIGHT quat_x, quat_y, quat_z, quat_w
-
-            float(L_acc[0]), float(L_acc[1]), float(L_acc[2]),                      # LEFT acc_x, acc_y, acc_z
-            float(L_gyr[0]), float(L_gyr[1]), float(L_gyr[2]),                      # LEFT gyr_x, gyr_y, gyr_z
-            float(L_quat[0]), float(L_quat[1]), float(L_quat[2]), float(L_quat[3]), # LEFT quat_x, quat_y, quat_z, quat_w
-        )
+        window_ptrs = None
+        trace = None
+        gated = False
+        t_emit = time.monotonic() if tracing.enabled else 0.0
 
         with self._lock:
-            self._rows.append(row)
-            self._ts.append(float(ts_emit))
-
-            if len(self._rows) >= self.window_size:
-                start = len(self._rows) - self.window_size
-                window_rows = self._rows[start : start + self.window_size]
-                window_ts   = self._ts[start   : start + self.window_size]
+            i = self._head
+            row = self._row if self.layout == "channel" else self._data[i]
+            row[0:3]   = R_acc      # RIGHT acc_x, acc_y, acc_z
+            row[3:6]   = R_gyr      # RIGHT gyr_x, gyr_y, gyr_z
+            row[6:10]  = R_quat     # RIGHT quat_x, quat_y, quat_z, quat_w
+            row[10:13] = L_acc      # LEFT acc_x, acc_y, acc_z
+            row[13:16] = L_gyr      # LEFT gyr_x, gyr_y, gyr_z
+            row[16:20] = L_quat     # LEFT quat_x, quat_y, quat_z, quat_w
+            if self.layout == "channel":
+                row[0:3]   /= ACC_SCALE
+                row[10:13] /= ACC_SCALE
+                self._data[:, i] = row
+            self._ts[i] = ts_emit
+
+            self._head = (i + 1) % self.capacity
+            if self._filled < self.capacity:
+                self._filled += 1
+            self._pending -= 1
+
+            if self._pending <= 0:
+                gated = self._gate and self._calibrated and self._gate_locked()
+                slot = None
+                if self._worker is not None:
+                    # None: dropped by overflow policy. The gate reference window will never be classified
+                    # when it is dropped: nothing to repeat, this window is processed
+                    slot = self._worker.acquire()
+                    if self._gate and (slot is None or (slot.dropped and slot.seq == self._gate_ref_seq)):
+                        self._gate_ref = self._gate_ref_seq = None
+                        gated = False
+                if tracing.enabled and not gated:
+                    trace = tracing.Trace(arrival=t_emit if tracing.emit_as_arrival
+                                          else float(ts_emit if arrival is None else arrival))
+                    trace.mark("emit", t_emit)
+                if self._worker is not None:
+                    # Hand off a copy to the processing worker, only the end timestamp of a gated window
+                    if slot is not None:
+                        slot.gated = gated
+                        if gated:
+                            slot.ts[-1] = ts_emit
+                        else:
+                            self._gather_locked(slot.window, slot.ts)
+                        slot.trace = trace
+                        if trace is not None:
+                            trace.mark("ready")
+                        self._worker.publish(slot)
+                        if self._gate_ref is not None and self._gate_ref_seq is None:
+                            self._gate_ref_seq = slot.seq       # this window is the new reference
+                    gated = False       # handled by the worker
+                elif gated:
+                    window_ts = self._ts[i:i + 1].copy()
+                elif self.layout == "channel":
+                    self._gather_locked(self._window, self._window_ts)
+                    window, window_ts, window_ptrs = self._window, self._window_ts, self._window_ptrs
+                    if trace is not None:
+                        trace.mark("ready")
+                else:
+                    window, window_ts = self._window_locked()
+                    if trace is not None:
+                        trace.mark("ready")
 
                 # Slide forward by hop
-                keep_from = self.hop_size
-                if keep_from <= 0:
-                    # safety fallback: clear to avoid stall
-                    self._rows.clear()
-                    self._ts.clear()
+                if 0 < self.hop_size < self.window_size:
+                    self._pending = self.hop_size
                 else:
-                    self._rows = self._rows[keep_from:]
-                    self._ts   = self._ts[keep_from:]
+                    # safety fallback (no overlap): start a fresh window to avoid stall
+                    self._pending = self.window_size
 
-        if window_rows is not None:
-            self._on_window_ready(window_rows, window_ts)
+        if window is not None or gated:
+            self._on_window_ready(window, window_ts, window_ptrs, trace)
 
     def set_features_sink(self, sink: Callable[[np.ndarray, float], None]) -> None:
         """
@@ -109,69 +261,248 @@ class DataBuffer:
         """
         self._features_sink = sink
 
+    def set_gated_sink(self, sink: Callable[[float], None]) -> None:
+        """
+        Register a consumer to receive window_end_ts per window skipped by the activity gate (classifier.still)
+        """
+        self._gated_sink = sink
+
+    def start(self) -> None:
+        """
+        Start the processing worker (no-op when processing inline).
+        """
+        if self._worker is not None and not self._worker.running:
+            self._worker.start()
+
+    def stop(self) -> None:
+        """
+        Stop the processing worker (no-op when processing inline).
+        """
+        if self._worker is not None and self._worker.running:
+            self._worker.stop()
+
+    def wait_for_room(self, timeout: Optional[float] = None) -> bool:
+        """
+        Block until the processing worker can take another window (always True when processing inline).
+        """
+        return self._worker.wait_for_room(timeout) if self._worker is not None else True
+
+    def drain(self, timeout: Optional[float] = None) -> bool:
+        """
+        Block until every completed window has been processed (always True when processing inline).
+        """
+        return self._worker.drain(timeout) if self._worker is not None else True
+
+    def get_stats(self) -> dict:
+        """
+        Window counters (processed: features extracted, gated: skipped by the activity gate), plus the
+        processing worker hand-off counters when enabled.
+        """
+        stats = {"windows_processed": self._windows_emitted, "windows_gated": self._windows_gated}
+        if self._worker is not None:
+            stats.update(self._worker.get_stats())
+        return stats
+
+    def reset(self) -> None:
+        """
+        Discard buffered rows. The next window is emitted after window_size new rows.
+        """
+        with self._lock:
+            self._head = 0
+            self._filled = 0
+            self._pending = self.window_size
+            self._gate_ref = self._gate_ref_seq = None
+
     # Internals
-    def _on_window_ready(self, window_rows: List[Tuple[float, ...]], window_ts: List[float]) -> None:
+    def _select_backend(self, backend: str) -> str:
         """
-        Build channel vectors, call processing, emit features.
+        Resolve processing.backend against the C library availability and the window size.
         """
-        self._windows_emitted += 1
+        if backend not in BACKENDS:
+            log_system(f"[DataBuffer] Unknown backend '{backend}', using 'auto'", level="WARNING")
+            backend = "auto"
+        if backend == "numpy":
+            return backend
+        if _LIB_ERROR is not None:
+            reason = f"C library not available ({_LIB_ERROR})"
+        elif self.window_size != LIB_WINDOW:
+            reason = f"C library built for window_size {LIB_WINDOW}, configured {self.window_size}"
+        else:
+            return "c"
+        if backend == "c":
+            raise RuntimeError(f"[DataBuffer] backend 'c' unusable: {reason}")
+        log_system(f"[DataBuffer] {reason}: using NumPy feature extraction", level="WARNING")
+        return "numpy"
+
+    def _gate_locked(self) -> bool:
+        """
+        Activity gate decision for the window that just closed (lock held): True when both wrists are still and
+        their posture has not moved from the reference window, whose result the gated sink repeats. A still
+        window that is not gated becomes the reference, a moving one drops it.
+        """
+        end = self._head if self._head > 0 else self.capacity
+        start = end - self.window_size
+        data = self._data if self.layout == "channel" else self._data.T
+        if start >= 0:
+            win = data[:, start:end]
+        else:
+            win = np.concatenate((data[:, start:], data[:, :end]), axis=1)
+        acc = win[[0, 1, 2, 10, 11, 12]].reshape(2, 3, -1)
+        if self.layout == "row":
+            acc = acc / ACC_SCALE
+        gyr = win[[3, 4, 5, 13, 14, 15]].reshape(2, 3, -1)
+        cfg = self._gate_cfg
+        # NaN compares False: not still
+        still = (np.all(np.sqrt(np.einsum("wcn,wcn->wn", acc, acc)).std(axis=1) <= cfg["acc_std_g"])
+                 and np.all(np.sqrt(np.einsum("wcn,wcn->wn", gyr, gyr)).std(axis=1) <= cfg["gyr_std_dps"]))
+        if not still:
+            self._gate_ref = self._gate_ref_seq = None
+            return False
+        posture_acc = acc.mean(axis=2)
+        quat = win[[6, 7, 8, 9, 16, 17, 18, 19]].reshape(2, 4, -1).mean(axis=2)
+        posture_quat = quat / np.linalg.norm(quat, axis=1, keepdims=True)
+        ref = self._gate_ref
+        if (ref is not None and np.all(np.abs(posture_acc - ref[0]) <= cfg["acc_drift_g"])
+                and np.all(np.abs(np.einsum("wc,wc->w", posture_quat, ref[1])) >= self._gate_cos)):
+            return True
+        self._gate_ref, self._gate_ref_seq = (posture_acc, posture_quat), None
+        return False
+
+    def _window_locked(self) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Return the last window_size rows and timestamps, oldest first (lock held).
+        If the window is a contiguous slice of the ring a view is returned, otherwise a single
+        gathered copy. Views stay valid until the ring wraps onto them (at least capacity - window_size
+        further rows), which is always the case while the window is processed on the caller thread.
+        """
+        end = self._head if self._head > 0 else self.capacity
+        start = end - self.window_size
+        if start >= 0:
+            return self._data[start:end], self._ts[start:end]
+        return (np.concatenate((self._data[start:], self._data[:end])),
+                np.concatenate((self._ts[start:], self._ts[:end])))
+
+    def _gather_locked(self, dst: np.ndarray, dst_ts: np.ndarray) -> None:
+        """
+        Copy the last window_size samples and timestamps into preallocated dst / dst_ts, oldest first (lock held).
+        dst has the ring layout: (20, window_size) for "channel", (window_size, 20) for "row".
+        """
+        end = self._head if self._head > 0 else self.capacity
+        start = end - self.window_size
+        data = self._data if self.layout == "row" else self._data.T
+        out = dst if self.layout == "row" else dst.T
+        if start >= 0:
+            np.copyto(out, data[start:end])
+            np.copyto(dst_ts, self._ts[start:end])
+            return
+        split = -start
+        np.copyto(out[:split], data[start:])
+        np.copyto(out[split:], data[:end])
+        np.copyto(dst_ts[:split], self._ts[start:])
+        np.copyto(dst_ts[split:], self._ts[:end])
+
+    def _process_channels(self, window: np.ndarray, ptrs: Optional[tuple]) -> np.ndarray:
+        """
+        Channel-major path: window is the (20, window_size) matrix, accel already in g.
+        """
+        if self._debug_print_buffer:
+            _log.info(lambda: "[DEBUG] Pre-processing inputs (channel-major): "
+                              + ", ".join(f"{ch}" for ch in window))
+        if self._extractor is not None:
+            return self._extractor.process_window(window)
+        return process_window(window, ptrs=ptrs)
+
+    def _process_rows(self, window: np.ndarray) -> np.ndarray:
+        """
+        Row-major path: window is (window_size, 20), build the 20 channel vectors from its columns.
+        """
+        if self._extractor is not None:
+            channels = window.T.copy()
+            channels[0:3] /= ACC_SCALE
+            channels[10:13] /= ACC_SCALE
+            return self._extractor.process_window(channels)
 
-        # Build 20 np.float32 vectors (length = window_size)
+        # Build 20 np.float32 vectors (length = window_size) as column slices of the window
         # RIGHT accel (mg -> g)
-        accX_R = np.asarray([r[0] for r in window_rows], dtype=np.float32) / 1000.0
-        accY_R = np.asarray([r[1] for r in window_rows], dtype=np.float32) / 1000.0
-        accZ_R = np.asarray([r[2] for r in window_rows], dtype=np.float32) / 1000.0
+        accX_R = window[:, 0] / 1000.0
+        accY_R = window[:, 1] / 1000.0
+        accZ_R = window[:, 2] / 1000.0
 
         # RIGHT gyro (keep units as provided by firmware)
-        gyrX_R = np.asarray([r[3] for r in window_rows], dtype=np.float32)
-        gyrY_R = np.asarray([r[4] for r in window_rows], dtype=np.float32)
-        gyrZ_R = np.asarray([r[5] for r in window_rows], dtype=np.float32)
+        gyrX_R = window[:, 3]
+        gyrY_R = window[:, 4]
+        gyrZ_R = window[:, 5]
 
         # RIGHT quaternion (raw scaled by x10000; processing re-scales internally)
-        quatRW_x = np.asarray([r[6]  for r in window_rows], dtype=np.float32)
-        quatRW_y = np.asarray([r[7]  for r in window_rows], dtype=np.float32)
-        quatRW_z = np.asarray([r[8]  for r in window_rows], dtype=np.float32)
-        quatRW_w = np.asarray([r[9]  for r in window_rows], dtype=np.float32)
+        quatRW_x = window[:, 6]
+        quatRW_y = window[:, 7]
+        quatRW_z = window[:, 8]
+        quatRW_w = window[:, 9]
 
         # LEFT accel (mg -> g)
-        accX_L = np.asarray([r[10] for r in window_rows], dtype=np.float32) / 1000.0
-        accY_L = np.asarray([r[11] for r in window_rows], dtype=np.float32) / 1000.0
-        accZ_L = np.asarray([r[12] for r in window_rows], dtype=np.float32) / 1000.0
+        accX_L = window[:, 10] / 1000.0
+        accY_L = window[:, 11] / 1000.0
+        accZ_L = window[:, 12] / 1000.0
 
         # LEFT gyro
-        gyrX_L = np.asarray([r[13] for r in window_rows], dtype=np.float32)
-        gyrY_L = np.asarray([r[14] for r in window_rows], dtype=np.float32)
-        gyrZ_L = np.asarray([r[15] for r in window_rows], dtype=np.float32)
+        gyrX_L = window[:, 13]
+        gyrY_L = window[:, 14]
+        gyrZ_L = window[:, 15]
 
         # LEFT quaternion
-        quatLW_x = np.asarray([r[16] for r in window_rows], dtype=np.float32)
-        quatLW_y = np.asarray([r[17] for r in window_rows], dtype=np.float32)
-        quatLW_z = np.asarray([r[18] for r in window_rows], dtype=np.float32)
-        quatLW_w = np.asarray([r[19] for r in window_rows], dtype=np.float32)
+        quatLW_x = window[:, 16]
+        quatLW_y = window[:, 17]
+        quatLW_z = window[:, 18]
+        quatLW_w = window[:, 19]
+
+        if self._debug_print_buffer:
+            _log.info(lambda: "[DEBUG] Pre-processing inputs: "
+                              f"{accX_R}, {accY_R}, {accZ_R}, {gyrX_R}, {gyrY_R}, {gyrZ_R}, "
+                              f"{accX_L}, {accY_L}, {accZ_L}, {gyrX_L}, {gyrY_L}, {gyrZ_L}, "
+                              f"{quatRW_x}, {quatRW_y}, {quatRW_z}, {quatRW_w} ,"
+                              f"{quatLW_x}, {quatLW_y}, {quatLW_z}, {quatLW_w} ,")
+
+        return process_data_wrists_quat(
+            accX_R, accY_R, accZ_R, gyrX_R, gyrY_R, gyrZ_R,
+            accX_L, accY_L, accZ_L, gyrX_L, gyrY_L, gyrZ_L,
+            quatRW_x, quatRW_y, quatRW_z, quatRW_w,
+            quatLW_x, quatLW_y, quatLW_z, quatLW_w
+        )
+
+    def _on_window_ready(self, window: np.ndarray, window_ts: np.ndarray, ptrs: Optional[tuple] = None,
+                         trace: Optional[tracing.Trace] = None) -> None:
+        """
+        Call processing on the window for the configured layout, emit features.
+        Runs on the processing worker thread, or on the caller thread when processing inline.
+        window_ts: (window_size,) float64, ptrs: cached row pointers of a channel-major window,
+        trace: latency trace (the sink sees it as tracing.current())
+        window None: window skipped by the activity gate, only window_ts[-1] is valid
+        """
+        if window is None:
+            self._windows_gated += 1
+            if self._gated_sink is not None:
+                try:
+                    self._gated_sink(float(window_ts[-1]))
+                except Exception as e:
+                    log_system(f"[DataBuffer] gated sink error: {type(e).__name__}: {e}", level="ERROR")
+            return
+
+        self._windows_emitted += 1
 
         # Call C processing
         try:
-            if self._debug_print_buffer:
-                log_system("f[DataBuffer] [DEBUG] Pre-processing inputs: "
-                            f"{accX_R}, {accY_R}, {accZ_R}, {gyrX_R}, {gyrY_R}, {gyrZ_R}, "
-                            f"{accX_L}, {accY_L}, {accZ_L}, {gyrX_L}, {gyrY_L}, {gyrZ_L}, "
-                            f"{quatRW_x}, {quatRW_y}, {quatRW_z}, {quatRW_w} ,"
-                            f"{quatLW_x}, {quatLW_y}, {quatLW_z}, {quatLW_w} ,")
-
-            features = process_data_wrists_quat(
-                accX_R, accY_R, accZ_R, gyrX_R, gyrY_R, gyrZ_R,
-                accX_L, accY_L, accZ_L, gyrX_L, gyrY_L, gyrZ_L,
-                quatRW_x, quatRW_y, quatRW_z, quatRW_w,
-                quatLW_x, quatLW_y, quatLW_z, quatLW_w
-            )
+            if self.layout == "channel":
+                features = self._process_channels(window, ptrs)
+            else:
+                features = self._process_rows(window)
             if not self._calibrated:
                 self._calibrated = True
                 log_system(f"[DataBuffer] First window used for calibration (features discarded)")
                 return
 
             if self._debug_print_features:
-                log_system(f"[DataBuffer] [DEBUG] Processed outputs: \n " +
-                           ", ".join(f"{x:.4f}" for x in features))
+                _log.info(lambda: "[DEBUG] Processed outputs: \n " +
+                                  ", ".join(f"{x:.4f}" for x in features))
 
             # Ensure dtype/shape
             features = np.asarray(features, dtype=np.float32).reshape(-1)
@@ -179,16 +510,22 @@ class DataBuffer:
             log_system(f"[DataBuffer] process_data_wrists_quat error: {type(e).__name__}: {e}", level="ERROR")
             return
 
-        window_end_ts = float(window_ts[-1]) if window_ts else 0.0
+        window_end_ts = float(window_ts[-1]) if len(window_ts) else 0.0
+
+        _log.debug("window #%d processed", self._windows_emitted)
 
-        log_system(f"[DataBuffer] window #{self._windows_emitted} processed")
+        if trace is not None:
+            trace.mark("features")
 
         # Emit to subscriber (recognizer)
         if self._features_sink is not None:
+            tracing.set_current(trace)
             try:
                 self._features_sink(features, window_end_ts)
             except Exception as e:
                 log_system(f"[DataBuffer] features sink error: {type(e).__name__}: {e}", level="ERROR")
+            finally:
+                tracing.set_current(None)
 
     # Calibration helper
     def is_calibrated(self) -> bool:
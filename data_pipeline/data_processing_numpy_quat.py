@@ -0,0 +1,191 @@
+# data_processing_numpy_quat.py
+# Pure NumPy implementation of the ProcessDataWristsQuat feature set (libProcessDataWristsQuat.so)
+#
+# Same 18 features, same float32 operation order as the C library, for any window size, with a batched
+# mode that processes a (W, 20, N) stack of windows in one vectorized pass (offline reprocessing).
+# Used as a fallback when the C library is missing or was built for a different window size.
+#
+# Processing chain (per window, both wrists):
+#   acc/gyr (g, firmware units): 4th order IIR low-pass (FILTER_B / FILTER_A, zero initial state)
+#   magnitudes |accR| |accL| |gyrR| |gyrL|
+#     -> std (N-1), range (max-min), zero-crossing rate around the mean (/(N-1)), energy (sum of squares)
+#   quaternions (x10000): scaled, normalized, folded to w >= 0
+#     -> rotation angle from a reference quaternion, 2*acos(<q0,q>) in degrees, window mean
+#   The reference quaternion of each wrist is the normalized mean of the first 5 samples of the first
+#   window processed after reset() (ProcessDataWristsQuat_init in the C library).
+#
+# Output order:
+#   [ 0- 3] std     accR, accL, gyrR, gyrL
+#   [ 4- 7] range   accR, accL, gyrR, gyrL
+#   [ 8-11] zcr     accR, accL, gyrR, gyrL
+#   [12-15] energy  accR, accL, gyrR, gyrL
+#   [16-17] angle   R, L
+#
+# Author: Francesco Urru
+# GitHub: https://github.com/frarvo
+# Repository: https://github.com/frarvo/STOPme
+# License: MIT
+
+import numpy as np
+
+FEAT = 18
+CHANNELS = 20
+
+# Low-pass filter coefficients (float32, as compiled in the C library)
+FILTER_B = np.array([0.6620158553123474, -2.6480634212493896, 3.972095012664795,
+                     -2.6480634212493896, 0.6620158553123474], dtype=np.float32)
+FILTER_A = np.array([1.0, -3.180638551712036, 3.861194372177124,
+                     -2.1121554374694824, 0.4382651448249817], dtype=np.float32)
+
+QUAT_SCALE = np.float32(1e-4)              # raw firmware quaternion -> unit
+ANGLE_SCALE = np.float32(360.0 / np.pi)    # 2 * rad2deg
+REF_SAMPLES = 5                            # samples averaged for the reference quaternion
+_STD_SCALE0 = np.float32(1.2924697e-26)    # initial scale of the scaled sum of squares
+
+# Channel-major rows in buffer order (RIGHT acc, gyr, quat, LEFT acc, gyr, quat)
+_FILT_ROWS = (0, 1, 2, 3, 4, 5, 10, 11, 12, 13, 14, 15)
+_QUAT_R = (6, 7, 8, 9)       # x, y, z, w
+_QUAT_L = (16, 17, 18, 19)
+
+
+def _seq_sum(a: np.ndarray) -> np.ndarray:
+    """Sum over axis 0 in index order (float32), like the C loops."""
+    s = a[0].copy()
+    for i in range(1, a.shape[0]):
+        s += a[i]
+    return s
+
+
+def _seq_mean(a: np.ndarray) -> np.ndarray:
+    return _seq_sum(a) / np.float32(a.shape[0])
+
+
+def lowpass(x: np.ndarray) -> np.ndarray:
+    """
+    Direct-form IIR filter along axis 0 of a (N, M) float32 array (MATLAB filter(b, a, x)).
+    """
+    n = x.shape[0]
+    y = np.zeros((n + len(FILTER_B) - 1,) + x.shape[1:], dtype=np.float32)
+    tmp = np.empty(x.shape[1:], dtype=np.float32)
+    for k in range(n):
+        xk = x[k]
+        for j, b in enumerate(FILTER_B):
+            np.multiply(xk, b, out=tmp)
+            y[k + j] += tmp
+        neg = -y[k]
+        for j in range(1, len(FILTER_A)):
+            np.multiply(neg, FILTER_A[j], out=tmp)
+            y[k + j] += tmp
+    return y[:n]
+
+
+def _std(a: np.ndarray) -> np.ndarray:
+    """Sample standard deviation along axis 0 with the overflow-safe scaled sum of squares of the C code."""
+    n = a.shape[0]
+    mean = _seq_mean(a)
+    scale = np.full(a.shape[1:], _STD_SCALE0, dtype=np.float32)
+    ssq = np.zeros(a.shape[1:], dtype=np.float32)
+    with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+        for i in range(n):
+            d = a[i] - mean
+            t = np.abs(d)
+            big = t > scale
+            r = scale / t
+            q = d / scale
+            ssq = np.where(big, ssq * r * r + np.float32(1.0), ssq + q * q)
+            scale = np.where(big, t, scale)
+    return scale * np.sqrt(ssq) / np.float32(np.sqrt(n - 1))
+
+
+def _zero_crossing_rate(a: np.ndarray) -> np.ndarray:
+    """Sign changes around the mean along axis 0, zero samples take the previous sign."""
+    n = a.shape[0]
+    s = np.sign(a - _seq_mean(a))
+    idx = np.where(s != 0, np.arange(n).reshape((n,) + (1,) * (a.ndim - 1)), 0)
+    np.maximum.accumulate(idx, axis=0, out=idx)
+    s = np.take_along_axis(s, idx, axis=0)
+    count = np.count_nonzero(s[:-1] * s[1:] < 0, axis=0)
+    return (count / float(n - 1)).astype(np.float32)
+
+
+def _normalize(q: np.ndarray) -> np.ndarray:
+    """q: (4, ...) x, y, z, w. Zero-norm quaternions are left unchanged."""
+    x, y, z, w = q
+    norm = np.sqrt(w * w + x * x + y * y + z * z)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(norm != 0, q / norm, q)
+
+
+class QuatFeatureExtractor:
+    """
+    NumPy counterpart of ProcessDataWristsQuat. Keeps the per-wrist reference quaternion like the C library:
+    the first window processed after reset() defines it.
+
+    process_window(window):    (20, N) channel-major float32 window, buffer row order, acc in g -> (18,)
+    process_windows(windows):  (W, 20, N) stack of consecutive windows -> (W, 18)
+    Inputs are not modified (the C library filters acc/gyr in place).
+    """
+
+    def __init__(self):
+        self._ref = {}      # "R"/"L" -> (4,) float32 reference quaternion (x, y, z, w)
+
+    def reset(self) -> None:
+        """Forget the reference quaternions (ProcessDataWristsQuat_init)."""
+        self._ref = {}
+
+    @property
+    def is_initialized(self) -> bool:
+        return len(self._ref) == 2
+
+    def process_window(self, window: np.ndarray) -> np.ndarray:
+        return self.process_windows(np.asarray(window)[None])[0]
+
+    def process_windows(self, windows: np.ndarray) -> np.ndarray:
+        windows = np.asarray(windows, dtype=np.float32)
+        if windows.ndim != 3 or windows.shape[1] != CHANNELS:
+            raise ValueError(f"Expected shape (W, {CHANNELS}, N), got {windows.shape}")
+        if windows.shape[2] < REF_SAMPLES:
+            raise ValueError(f"Window too short: {windows.shape[2]} samples")
+        # Time-major (N, 20, W): every step of the sequential loops works on contiguous rows
+        data = np.ascontiguousarray(windows.transpose(2, 1, 0))
+        out = np.empty((windows.shape[0], FEAT), dtype=np.float32)
+
+        filt = lowpass(data[:, _FILT_ROWS, :].reshape(data.shape[0], -1)).reshape(data.shape[0], 12, -1)
+        mags = []
+        for base in (0, 6, 3, 9):       # accR, accL, gyrR, gyrL
+            x, y, z = filt[:, base], filt[:, base + 1], filt[:, base + 2]
+            mags.append(np.sqrt(x * x + y * y + z * z))
+        mags = np.stack(mags, axis=1)   # (N, 4, W)
+
+        out[:, 0:4] = _std(mags).T
+        out[:, 4:8] = (np.fmax.reduce(mags, axis=0) - np.fmin.reduce(mags, axis=0)).T
+        out[:, 8:12] = _zero_crossing_rate(mags).T
+        out[:, 12:16] = _seq_sum(mags * mags).T
+        out[:, 16] = self._angle("R", data[:, _QUAT_R, :])
+        out[:, 17] = self._angle("L", data[:, _QUAT_L, :])
+        return out
+
+    def _angle(self, side: str, raw: np.ndarray) -> np.ndarray:
+        """raw: (N, 4, W) firmware quaternions -> (W,) mean rotation angle from the reference (deg)."""
+        q = _normalize((raw * QUAT_SCALE).transpose(1, 0, 2))        # (4, N, W)
+        ref = self._ref.get(side)
+        if ref is None:
+            # Mean of the first samples of the first window, normalized, w >= 0
+            first = q[:, :REF_SAMPLES, 0]
+            ref = _normalize(_seq_sum(first.T) / np.float32(REF_SAMPLES))
+            if ref[3] < 0:
+                ref = -ref
+            self._ref[side] = ref
+        q = np.where(q[3] < 0, -q, q)
+        x0, y0, z0, w0 = ref
+        x, y, z, w = q
+        dot = w0 * w + x0 * x + y0 * y + z0 * z
+        dot = np.fmin(np.fmax(dot, np.float32(-1.0)), np.float32(1.0))
+        return _seq_mean(np.arccos(dot.astype(np.float64)).astype(np.float32) * ANGLE_SCALE)
+
+
+def process_windows(windows: np.ndarray, extractor: QuatFeatureExtractor = None) -> np.ndarray:
+    """
+    Features of a (W, 20, N) stack of consecutive windows with a fresh (or the given) extractor.
+    """
+    return (extractor or QuatFeatureExtractor()).process_windows(windows)
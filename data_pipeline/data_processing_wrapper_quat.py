@@ -20,6 +20,7 @@ lib = ct.CDLL(LIB_PATH)
 # Define constants
 N = get_buffer_config().get("window_size")  # Input channel size
 FEAT = 18   # Output feature vector length
+LIB_WINDOW = 150  # Window length the library was generated for (fixed size loops)
 
 # Define data types
 Float150 = ndpointer(dtype=np.float32, shape=(N,), flags=("C_CONTIGUOUS",))
@@ -43,6 +44,14 @@ lib.ProcessDataWristsQuat.argtypes = [
 # Outputs
 lib.ProcessDataWristsQuat.restype = None
 
+# Unchecked handle on the same symbol for the channel-major fast path (raw row pointers, no ndpointer checks)
+_process_raw = lib["ProcessDataWristsQuat"]
+_process_raw.argtypes = [ct.c_void_p] * 21
+_process_raw.restype = None
+
+# Channel-major window rows (buffer order: RIGHT acc, gyr, quat, LEFT acc, gyr, quat) in C API argument order
+C_ARG_ROWS = (0, 1, 2, 3, 4, 5,  10, 11, 12, 13, 14, 15,  6, 7, 8, 9,  16, 17, 18, 19)
+
 # Try to use init in the library header. If stripped just skip
 try:
     lib.ProcessDataWristsQuat_init.restype = None
@@ -96,4 +105,40 @@ def process_data_wrists_quat(
     # Call C API
     lib.ProcessDataWristsQuat(*arrs, out)
 
+    return out
+
+def window_row_pointers(window: np.ndarray) -> tuple:
+    """
+    Return the 20 row addresses of a channel-major window in C API argument order.
+    window: (20, N) float32 whose rows are each contiguous (e.g. a C-contiguous matrix or a column slice of one).
+    Addresses stay valid as long as window (and the memory it views) is alive and not reallocated.
+    """
+    base = window.ctypes.data
+    stride = window.strides[0]
+    return tuple(base + r * stride for r in C_ARG_ROWS)
+
+def check_window(window: np.ndarray) -> None:
+    """
+    Validate a channel-major window for process_window. Not meant for the hot path.
+    """
+    if not isinstance(window, np.ndarray) or window.dtype != np.float32:
+        raise TypeError("Expected a float32 numpy array")
+    if window.ndim != 2 or window.shape != (20, N):
+        raise ValueError(f"Expected shape (20, {N}), got {getattr(window, 'shape', None)}")
+    if window.strides[1] != window.itemsize:
+        raise ValueError("Window rows must be contiguous")
+
+def process_window(window: np.ndarray, out: np.ndarray = None, ptrs: tuple = None) -> np.ndarray:
+    """
+    Hot-path wrapper: call the C library on a channel-major (20, N) float32 window and return imuFeatures[18].
+    Rows are in buffer order (RIGHT acc, gyr, quat, LEFT acc, gyr, quat) with acc already in g.
+    No validation or copies: the caller guarantees the layout (see check_window).
+    NOTE: the C library filters the acc/gyr inputs in place, so window must be a scratch copy.
+    Precomputed ptrs (window_row_pointers) can be passed for windows that live at a fixed address.
+    """
+    if out is None:
+        out = np.empty(FEAT, dtype=np.float32)
+    if ptrs is None:
+        ptrs = window_row_pointers(window)
+    _process_raw(*ptrs, out.ctypes.data)
     return out
\ No newline at end of file
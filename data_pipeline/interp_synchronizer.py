@@ -0,0 +1,272 @@
+# data_pipeline/interp_synchronizer.py
+# Resample LEFT/RIGHT IMU data (acc, gyr, quat) onto a common fixed-rate time grid and emit joint rows.
+#
+# Instead of dropping whole triplets when the wrists are more than max_skew_ms apart (IMUSynchronizer),
+# each wrist/kind keeps a short sample history. Grid points that are bracketed by samples on every stream
+# are emitted in blocks: acc and gyr are interpolated linearly, quaternions with SLERP.
+# Grid points falling in a gap longer than max_gap_ms on any stream are skipped.
+#
+# Author: Francesco Urru
+# Github: https://github.com/frarvo
+# Repository: https://github.com/frarvo/STOPme
+# License: MIT
+
+import math
+import threading
+from typing import Dict, Optional
+
+import numpy as np
+
+from utils.logger import log_system
+from utils.config import get_sync_config
+from data_pipeline.data_buffer import DataBuffer
+from data_pipeline.clock_sync import create_device_clocks
+
+KINDS = ("acc", "gyr", "quat")
+_DIMS = {"acc": 3, "gyr": 3, "quat": 4}
+
+
+class _History:
+    """
+    Append-only sample history for one wrist and one kind (timestamps strictly increasing).
+    Storage is 2 * size long; when full the newest `size` samples are moved to the front.
+    """
+
+    def __init__(self, size: int, dim: int):
+        self.size = size
+        self.ts = np.zeros(2 * size, dtype=np.float64)
+        self.val = np.zeros((2 * size, dim), dtype=np.float64)
+        self.n = 0
+
+    def append(self, values, ts: float) -> bool:
+        if self.n and ts <= self.ts[self.n - 1]:
+            return False
+        if self.n == 2 * self.size:
+            self.ts[:self.size] = self.ts[self.size:]
+            self.val[:self.size] = self.val[self.size:]
+            self.n = self.size
+        self.ts[self.n] = ts
+        self.val[self.n] = values
+        self.n += 1
+        return True
+
+    def first_ts(self) -> float:
+        return self.ts[0] if self.n else math.inf
+
+    def last_ts(self) -> float:
+        return self.ts[self.n - 1] if self.n else -math.inf
+
+    def clear(self) -> None:
+        self.n = 0
+
+    def brackets(self, grid: np.ndarray, max_gap: float):
+        """
+        Return (i0, i1, w, valid) so that sample(grid) ~ val[i0] + w * (val[i1] - val[i0]).
+        valid is False where the grid point is not bracketed or falls in a gap > max_gap.
+        """
+        ts = self.ts[:self.n]
+        i1 = np.searchsorted(ts, grid, side="left")
+        np.minimum(i1, self.n - 1, out=i1)
+        i0 = np.maximum(i1 - 1, 0)
+        t0, t1 = ts[i0], ts[i1]
+        span = t1 - t0
+        with np.errstate(divide="ignore", invalid="ignore"):
+            w = np.where(span > 0.0, (grid - t0) / span, 1.0)
+        valid = (grid >= ts[0]) & (grid <= t1) & (span <= max_gap)
+        return i0, i1, np.clip(w, 0.0, 1.0), valid
+
+
+def _lerp(v0: np.ndarray, v1: np.ndarray, w: np.ndarray) -> np.ndarray:
+    return v0 + w[:, None] * (v1 - v0)
+
+
+def _slerp(q0: np.ndarray, q1: np.ndarray, w: np.ndarray) -> np.ndarray:
+    """
+    Vectorized SLERP between rows of q0 and q1 (x, y, z, w order, any common scale).
+    The magnitude is interpolated linearly so the raw x10000 domain is preserved,
+    and the result is folded to w >= 0 like the firmware does.
+    """
+    n0 = np.linalg.norm(q0, axis=1)
+    n1 = np.linalg.norm(q1, axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        u0 = q0 / n0[:, None]
+        u1 = q1 / n1[:, None]
+    u0 = np.nan_to_num(u0)
+    u1 = np.nan_to_num(u1)
+
+    dot = np.sum(u0 * u1, axis=1)
+    # Shortest path: firmware sign folding can flip neighbours
+    flip = dot < 0.0
+    u1[flip] = -u1[flip]
+    dot = np.abs(dot)
+
+    theta = np.arccos(np.clip(dot, -1.0, 1.0))
+    sin_t = np.sin(theta)
+    near = sin_t < 1e-6
+    with np.errstate(divide="ignore", invalid="ignore"):
+        s0 = np.where(near, 1.0 - w, np.sin((1.0 - w) * theta) / sin_t)
+        s1 = np.where(near, w, np.sin(w * theta) / sin_t)
+    q = s0[:, None] * u0 + s1[:, None] * u1
+    q /= np.maximum(np.linalg.norm(q, axis=1), 1e-12)[:, None]
+    q[q[:, 3] < 0.0] *= -1.0
+    return q * (n0 + w * (n1 - n0))[:, None]
+
+
+class InterpolatingSynchronizer:
+    """
+    Same interface as IMUSynchronizer (update / update_triplet / get_stats / reset / buffer), selected with
+    sync.mode: interp.
+    Receives data from listeners via update(device_id, kind, values, ts), resamples both wrists at rate_hz
+    and pushes rows to DataBuffer:
+        buffer.add_buffer_row(R_acc, R_gyr, R_quat, L_acc, L_gyr, L_quat, ts_grid)
+    """
+
+    def __init__(self, left_id: str = "bc_left", right_id: str = "bc_right", buffer: Optional[DataBuffer] = None):
+        sync_cfg = get_sync_config() or {}
+
+        # Grid and interpolation settings
+        self.rate_hz = max(1.0, float(sync_cfg.get("rate_hz", 50)))
+        self.period = 1.0 / self.rate_hz
+        self.max_gap = max(1, int(sync_cfg.get("max_gap_ms", 100))) / 1000.0  # seconds
+        self.block = max(1, int(sync_cfg.get("block_size", 4)))               # grid points per emission
+        history = max(8, int(sync_cfg.get("history", 64)))                    # samples per wrist/kind
+
+        self.left_id, self.right_id = left_id, right_id
+
+        # Device -> host clock fits (None: arrival times)
+        self._clocks = create_device_clocks((self.left_id, self.right_id))
+
+        log_system(f"[IMUSync] Init (interp): L={self.left_id} R={self.right_id} "
+                   f"rate={self.rate_hz:g}Hz max_gap={int(self.max_gap*1000)}ms block={self.block} "
+                   f"time={'device' if self._clocks else 'arrival'}")
+
+        # Shared state and buffer
+        self._lock = threading.Lock()
+        self._hist: Dict[str, Dict[str, _History]] = {
+            dev: {k: _History(history, _DIMS[k]) for k in KINDS}
+            for dev in (self.left_id, self.right_id)
+        }
+        self._series = [self._hist[dev][k] for dev in (self.right_id, self.left_id) for k in KINDS]
+        self._next_t: Optional[float] = None
+        # Buffer instance
+        self.buffer = buffer if buffer is not None else DataBuffer()
+
+        # stats (optional)
+        self._emits = 0
+        self._drops_left = 0
+        self._drops_right = 0
+        self._rejected = 0
+
+    # Public call for listeners
+    def update(self, device_id: str, kind: str, values, ts: float, dev_ts: Optional[float] = None) -> None:
+        """
+        device_id must match one of the configured ids (e.g., 'bc_left'/'bc_right').
+        kind: {'acc','gyr','quat'}.
+        values: 3-tuple for acc/gyr, 4-tuple for quat.
+        ts: time.monotonic() at arrival.
+        dev_ts: device timestamp of the sample (SDK Sample timestamp), None if unknown.
+        """
+        hist = self._hist.get(device_id)
+        if hist is None or kind not in hist:
+            return
+
+        with self._lock:
+            arrival = ts
+            if dev_ts is not None and self._clocks:
+                ts = self._clocks[device_id].to_host(dev_ts, ts)
+            try:
+                if not hist[kind].append(values[:_DIMS[kind]], ts):
+                    self._rejected += 1
+                    return
+            except Exception as e:
+                log_system(f"[IMUSync] Bad {kind} for {device_id}: {e}", level="WARNING")
+                return
+            self._try_emit_locked(arrival)
+
+    def update_triplet(self, device_id: str, acc, gyr, quat, ts: float, dev_ts: Optional[float] = None) -> None:
+        """
+        Complete acc/gyr/quat set of one wrist (FusedFeatureListener): one lock acquisition, one emit check.
+        """
+        hist = self._hist.get(device_id)
+        if hist is None:
+            return
+
+        with self._lock:
+            arrival = ts
+            if dev_ts is not None and self._clocks:
+                ts = self._clocks[device_id].to_host(dev_ts, ts)
+            for kind, values in (("acc", acc), ("gyr", gyr), ("quat", quat)):
+                try:
+                    if not hist[kind].append(values[:_DIMS[kind]], ts):
+                        self._rejected += 1
+                except Exception as e:
+                    log_system(f"[IMUSync] Bad {kind} for {device_id}: {e}", level="WARNING")
+            self._try_emit_locked(arrival)
+
+    # Internals (lock held)
+    def _try_emit_locked(self, arrival: float) -> None:
+        """
+        Emits the grid rows the histories now cover. arrival: listener arrival time of the sample that
+        completed them (latency trace arrival, rows carry grid times).
+        """
+        horizon = min(h.last_ts() for h in self._series)
+        if horizon == -math.inf:
+            return
+
+        # Grid starts once every stream has data, and never lags behind the retained history
+        earliest = max(h.first_ts() for h in self._series)
+        if self._next_t is None or self._next_t < earliest:
+            if self._next_t is None:
+                self._next_t = earliest
+            else:
+                skipped = math.ceil((earliest - self._next_t) / self.period)
+                self._next_t += skipped * self.period
+
+        count = int(math.floor((horizon - self._next_t) / self.period)) + 1
+        if count < self.block:
+            return
+
+        grid = self._next_t + np.arange(count, dtype=np.float64) * self.period
+        self._next_t = float(grid[-1]) + self.period
+
+        out = []
+        valid_R = np.ones(count, dtype=bool)
+        valid_L = np.ones(count, dtype=bool)
+        for j, h in enumerate(self._series):
+            i0, i1, w, ok = h.brackets(grid, self.max_gap)
+            v0, v1 = h.val[i0], h.val[i1]
+            out.append(_slerp(v0, v1, w) if KINDS[j % 3] == "quat" else _lerp(v0, v1, w))
+            if j < 3:
+                valid_R &= ok
+            else:
+                valid_L &= ok
+
+        self._drops_right += int(np.count_nonzero(~valid_R))
+        self._drops_left += int(np.count_nonzero(~valid_L & valid_R))
+        keep = np.flatnonzero(valid_R & valid_L)
+        if keep.size == 0:
+            return
+
+        Racc, Rgyr, Rquat, Lacc, Lgyr, Lquat = out
+        for k in keep:
+            self.buffer.add_buffer_row(Racc[k], Rgyr[k], Rquat[k], Lacc[k], Lgyr[k], Lquat[k], float(grid[k]), arrival)
+        self._emits += int(keep.size)
+
+    # optional helpers
+    def get_stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"emits": self._emits, "drops_left": self._drops_left, "drops_right": self._drops_right,
+                    "rejected": self._rejected}
+
+    def get_clock_stats(self) -> Dict[str, dict]:
+        with self._lock:
+            return {dev: c.get_stats() for dev, c in (self._clocks or {}).items()}
+
+    def reset(self) -> None:
+        with self._lock:
+            for c in (self._clocks or {}).values():
+                c.reset()
+            for h in self._series:
+                h.clear()
+            self._next_t = None
+            self._emits = self._drops_left = self._drops_right = self._rejected = 0
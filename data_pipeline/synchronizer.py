@@ -8,16 +8,21 @@
 
 import threading
 import time
-from dataclasses import dataclass
+from collections import deque
+from dataclasses import dataclass, field
 from typing import Optional, Tuple, Dict
 
 from utils.logger import log_system
-from utils.config import get_bluecoin_config, get_sync_config
+from utils.config import get_sync_config
 from data_pipeline.data_buffer import DataBuffer
+from data_pipeline.interp_synchronizer import InterpolatingSynchronizer
+from data_pipeline.clock_sync import create_device_clocks
 
 Vec3 = Tuple[float, float, float]
 Quat = Tuple[float, float, float, float]
 
+_MEASURED_MAX = 16      # queued triplets per wrist (device time mode)
+
 @dataclass
 class _DevState:
     acc:  Optional[Vec3]  = None
@@ -26,6 +31,9 @@ class _DevState:
     ts_acc:  float = 0.0
     ts_gyr:  float = 0.0
     ts_quat: float = 0.0
+    arrival: float = 0.0     # listener arrival time of the newest sample (device time mode)
+    # Complete triplets waiting for the other wrist, oldest first (device time mode)
+    measured: deque = field(default_factory=deque)
 
     def ready(self) -> bool:
         return (self.acc is not None) and (self.gyr is not None) and (self.quat is not None)
@@ -41,26 +49,30 @@ class _DevState:
 class IMUSynchronizer:
     """
     Takes configurations for bluecoins and IMUs from config.yaml
-    Receives data from listeners via update(device_id, kind, values, ts)
+    Receives data from listeners via update(device_id, kind, values, ts, dev_ts)
+    Samples are placed on the host timeline by their device timestamp when available (sync.device_timestamps)
     Aligns wrists within max_skew_ms, then pushes one row to DataBuffer:
         buffer.add_buffer_row(R_acc, R_gyr, R_quat, L_acc, L_gyr, L_quat, ts_emit)
+    With device timestamps, complete triplets are queued per wrist and paired by measurement time, since BLE
+    delivers several samples of one wrist per connection event.
     """
 
-    def __init__(self):
+    def __init__(self, left_id: str = "bc_left", right_id: str = "bc_right", buffer: Optional[DataBuffer] = None):
         sync_cfg = get_sync_config() or {}
 
         # Timing and alignment settings
         self.max_skew = max(0, int(sync_cfg.get("max_skew_ms", 25))) / 1000.0  # seconds
         self.stale = max(0, int(sync_cfg.get("stale_ms", 0))) / 1000.0
 
-        # Determine left/right device IDs from bluecoins section of config.yaml
-        bc = get_bluecoin_config() or []
-        ids = [e.get("id") for e in bc if isinstance(e, dict) and e.get("id")]
+        # Left/right device ids of the subject (bluecoins section of config.yaml)
+        self.left_id, self.right_id = left_id, right_id
 
-        self.left_id, self.right_id = "bc_left", "bc_right"
+        # Device -> host clock fits (None: arrival times)
+        self._clocks = create_device_clocks((self.left_id, self.right_id))
 
         log_system(f"[IMUSync] Init: L={self.left_id} R={self.right_id} "
-                   f"skew={int(self.max_skew*1000)}ms stale={'off' if self.stale==0 else str(int(self.stale*1000))+'ms'}")
+                   f"skew={int(self.max_skew*1000)}ms stale={'off' if self.stale==0 else str(int(self.stale*1000))+'ms'} "
+                   f"time={'device' if self._clocks else 'arrival'}")
 
         # Shared state and buffer
         self._lock = threading.Lock()
@@ -69,7 +81,7 @@ class IMUSynchronizer:
             self.right_id: _DevState(),
         }
         # Buffer instance
-        self.buffer = DataBuffer()
+        self.buffer = buffer if buffer is not None else DataBuffer()
 
         # stats (optional)
         self._emits = 0
@@ -78,20 +90,26 @@ class IMUSynchronizer:
 
         self._pending_row = None
 
+        # Clock used for stale checks (replaced by replay sources to follow the recording timeline)
+        self._clock = time.monotonic
+
     # Public call for listeners
-    def update(self, device_id: str, kind: str, values, ts: float) -> None:
+    def update(self, device_id: str, kind: str, values, ts: float, dev_ts: Optional[float] = None) -> None:
         """
         device_id must match one of the configured ids (e.g., 'bc_left'/'bc_right').
         kind: {'acc','gyr','quat'}.
         values: 3-tuple for acc/gyr, 4-tuple for quat.
         ts: time.monotonic() at arrival.
+        dev_ts: device timestamp of the sample (SDK Sample timestamp), None if unknown.
         """
         if device_id not in self._state:
             return
 
-        row = None
         with self._lock:
             st = self._state[device_id]
+            st.arrival = ts
+            if dev_ts is not None and self._clocks:
+                ts = self._clocks[device_id].to_host(dev_ts, ts)
             try:
                 if kind == "acc":
                     st.acc = (float(values[0]), float(values[1]), float(values[2])); st.ts_acc = ts
@@ -105,22 +123,54 @@ class IMUSynchronizer:
                 log_system(f"[IMUSync] Bad {kind} for {device_id}: {e}", level="WARNING")
                 return
 
-            self._try_emit_locked()
-            row = self._pending_row
-            self._pending_row = None
-            if row:
-                (Racc, Rgyr, Rquat, Lacc, Lgyr, Lquat, ts_emit) = row
-                self.buffer.add_buffer_row(Racc, Rgyr, Rquat, Lacc, Lgyr, Lquat, ts_emit)
+            self._emit_pending_locked()
+
+    def update_triplet(self, device_id: str, acc, gyr, quat, ts: float, dev_ts: Optional[float] = None) -> None:
+        """
+        Complete acc/gyr/quat set of one wrist (FusedFeatureListener), same result as three update() calls
+        with the same ts, with one lock acquisition and one emit check.
+        """
+        st = self._state.get(device_id)
+        if st is None:
+            return
+
+        with self._lock:
+            st.arrival = ts
+            if dev_ts is not None and self._clocks:
+                ts = self._clocks[device_id].to_host(dev_ts, ts)
+            try:
+                st.acc = (float(acc[0]), float(acc[1]), float(acc[2]))
+                st.gyr = (float(gyr[0]), float(gyr[1]), float(gyr[2]))
+                st.quat = (float(quat[0]), float(quat[1]), float(quat[2]), float(quat[3]))
+                st.ts_acc = st.ts_gyr = st.ts_quat = ts
+            except Exception as e:
+                st.clear_triplet()
+                log_system(f"[IMUSync] Bad triplet for {device_id}: {e}", level="WARNING")
+                return
+            self._emit_pending_locked()
 
     # Internals (lock held)
+    def _emit_pending_locked(self) -> None:
+        self._try_emit_locked()
+        row = self._pending_row
+        self._pending_row = None
+        if row:
+            # Appending stays under the lock to keep row order between the two wrist threads.
+            # Completed windows are handed to the buffer processing worker, so this is only a ring write
+            (Racc, Rgyr, Rquat, Lacc, Lgyr, Lquat, ts_emit) = row
+            self.buffer.add_buffer_row(Racc, Rgyr, Rquat, Lacc, Lgyr, Lquat, ts_emit)
+
     # Push synced row to buffer
     def _try_emit_locked(self) -> None:
         L = self._state[self.left_id]
         R = self._state[self.right_id]
+        if self._clocks:
+            self._try_emit_measured_locked(L, R)
+            return
 
         # Optional stale protection
         if self.stale > 0.0:
-            now = time.monotonic()
+            now = self._clock()
             if L.ready() and (now - L.newest_ts() > self.stale):
                 L.clear_triplet(); self._drops_left += 1
             if R.ready() and (now - R.newest_ts() > self.stale):
@@ -152,13 +202,86 @@ class IMUSynchronizer:
 
         self._pending_row = row
 
+    def _try_emit_measured_locked(self, L: _DevState, R: _DevState) -> None:
+        """
+        Device time mode: pairs the queued triplets of the two wrists measured within max_skew of each other,
+        each with the closest one of the other wrist. Rows are pushed to the buffer here.
+        """
+        for st in (L, R):
+            if st.ready():
+                if len(st.measured) >= _MEASURED_MAX:
+                    st.measured.popleft()
+                    if st is L:
+                        self._drops_left += 1
+                    else:
+                        self._drops_right += 1
+                st.measured.append((st.acc, st.gyr, st.quat, st.newest_ts(), st.arrival))
+                st.clear_triplet()
+        qL, qR = L.measured, R.measured
+
+        # Optional stale protection: triplets left waiting for a wrist that went silent
+        if self.stale > 0.0:
+            now = self._clock()
+            while qL and not qR and now - qL[0][3] > self.stale:
+                qL.popleft(); self._drops_left += 1
+            while qR and not qL and now - qR[0][3] > self.stale:
+                qR.popleft(); self._drops_right += 1
+
+        while qL and qR:
+            tL, tR = qL[0][3], qR[0][3]
+            if tR < tL and len(qR) > 1 and abs(qR[1][3] - tL) < tL - tR:
+                qR.popleft(); self._drops_right += 1         # next right sample is closer
+            elif tL < tR and len(qL) > 1 and abs(qL[1][3] - tR) < tR - tL:
+                qL.popleft(); self._drops_left += 1
+            elif abs(tL - tR) <= self.max_skew:
+                Lacc, Lgyr, Lquat, _, aL = qL.popleft()
+                Racc, Rgyr, Rquat, _, aR = qR.popleft()
+                self._emits += 1
+                # Rows carry the fitted measurement time, the trace the arrival of their newest sample
+                self.buffer.add_buffer_row(Racc, Rgyr, Rquat, Lacc, Lgyr, Lquat, max(tL, tR), max(aL, aR))
+            elif tL < tR:
+                qL.popleft(); self._drops_left += 1
+            else:
+                qR.popleft(); self._drops_right += 1
+
     # optional helpers
+    def set_clock(self, clock) -> None:
+        """
+        Replace the clock used for stale checks (default time.monotonic).
+        """
+        self._clock = clock
+
     def get_stats(self) -> Dict[str, int]:
         with self._lock:
             return {"emits": self._emits, "drops_left": self._drops_left, "drops_right": self._drops_right}
 
+    def get_clock_stats(self) -> Dict[str, dict]:
+        """
+        Device clock fit per wrist (samples, rate in host seconds per tick, offset, resets), empty when off.
+        """
+        with self._lock:
+            return {dev: c.get_stats() for dev, c in (self._clocks or {}).items()}
+
     def reset(self) -> None:
         with self._lock:
-            self._state[self.left_id].clear_triplet()
-            self._state[self.right_id].clear_triplet()
-            self._emits = self._drops_left = self._drops_right = 0
\ No newline at end of file
+            for st in self._state.values():
+                st.clear_triplet()
+                st.measured.clear()
+            self._emits = self._drops_left = self._drops_right = 0
+            for c in (self._clocks or {}).values():
+                c.reset()
+
+
+def create_synchronizer(left_id: str = "bc_left", right_id: str = "bc_right", buffer: Optional[DataBuffer] = None):
+    """
+    Returns the synchronizer selected by sync.mode in config.yaml:
+        skew   -> IMUSynchronizer (default)
+        interp -> InterpolatingSynchronizer
+    left_id / right_id: device ids of the subject's wrists, buffer: its DataBuffer (a new one when None)
+    """
+    mode = (get_sync_config() or {}).get("mode", "skew")
+    if mode == "interp":
+        return InterpolatingSynchronizer(left_id, right_id, buffer)
+    if mode != "skew":
+        log_system(f"[IMUSync] Unknown sync mode '{mode}', using 'skew'", level="WARNING")
+    return IMUSynchronizer(left_id, right_id, buffer)
\ No newline at end of file
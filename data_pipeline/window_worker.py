@@ -0,0 +1,297 @@
+# data_pipeline/window_worker.py
+# Processing stage that runs window processing and classification on a dedicated thread.
+#
+# The buffer copies each completed window into a preallocated slot and publishes it here,
+# so the BLE notification thread only pays for a ring copy. Slots are recycled, the hand-off is bounded
+# and what happens when it is full is configurable (processing: section of config.yaml).
+# With several subjects (core/subjects.py) the workers of all buffers are run by one WindowWorkerPool instead
+# of a thread each: windows of one subject are still processed one at a time and in order, subjects with
+# windows ready take turns on the pool threads.
+#
+# Author: Francesco Urru
+# Github: https://github.com/frarvo
+# Repository: https://github.com/frarvo/STOPme
+# License: MIT
+
+from __future__ import annotations
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, Optional, Tuple
+
+import numpy as np
+
+from utils.logger import log_system
+
+OVERFLOW_POLICIES = ("drop_oldest", "drop_newest", "block")
+
+
+class WindowSlot:
+    """
+    Preallocated storage for one window travelling from the buffer to the worker.
+    window: window matrix in the buffer layout, ts: (window_size,) float64 timestamps.
+    ptrs: cached row pointers for the channel-major C call (None for the row layout).
+    trace: latency trace of the window when tracing is enabled.
+    gated: window skipped by the activity gate, only ts[-1] is set (process gets window None).
+    dropped: set by acquire() when the slot was taken back from a queued window (drop_oldest), whose seq it
+    still carries until publish().
+    """
+    __slots__ = ("window", "ts", "ptrs", "seq", "trace", "gated", "dropped")
+
+    def __init__(self, shape: Tuple[int, int], window_size: int,
+                 ptrs_fn: Optional[Callable[[np.ndarray], tuple]] = None):
+        self.window = np.zeros(shape, dtype=np.float32)
+        self.ts = np.zeros(window_size, dtype=np.float64)
+        self.ptrs = ptrs_fn(self.window) if ptrs_fn is not None else None
+        self.seq = 0
+        self.trace = None
+        self.gated = False
+        self.dropped = False
+
+
+class WindowWorker(threading.Thread):
+    """
+    Consumes published window slots and calls process(window, ts, ptrs, trace) on its own thread.
+
+    Producer side (buffer, lock held):
+        slot = worker.acquire()      # None if the window has to be dropped
+        ... fill slot.window / slot.ts ...
+        worker.publish(slot)
+
+    Overflow (all slots queued):
+        drop_oldest: the oldest queued window is discarded and its slot reused (lowest latency)
+        drop_newest: the incoming window is discarded
+        block:       wait up to block_timeout_ms for a free slot, then discard the incoming window
+    """
+
+    def __init__(self,
+                 process: Callable[[np.ndarray, np.ndarray, Optional[tuple], object], None],
+                 shape: Tuple[int, int],
+                 window_size: int,
+                 queue_size: int = 4,
+                 overflow: str = "drop_oldest",
+                 block_timeout_ms: int = 50,
+                 ptrs_fn: Optional[Callable[[np.ndarray], tuple]] = None,
+                 name: str = "WindowWorker",
+                 pool: Optional["WindowWorkerPool"] = None):
+        super().__init__(daemon=True, name=name)
+        self._process = process
+        self._pool = pool
+        self._scheduled = False     # queued on / being run by the pool (pool lock)
+        self._attached = False
+        self.queue_size = max(1, int(queue_size))
+        self.overflow = overflow if overflow in OVERFLOW_POLICIES else "drop_oldest"
+        self.block_timeout = max(0, int(block_timeout_ms)) / 1000.0
+
+        # queue_size slots can wait, one more is being processed
+        self._free = deque(WindowSlot(shape, window_size, ptrs_fn) for _ in range(self.queue_size + 1))
+        self._ready: deque = deque()
+        self._cond = threading.Condition()
+        self._stop_event = threading.Event()
+        self._seq = 0
+
+        # stats
+        self._submitted = 0
+        self._processed = 0
+        self._dropped_oldest = 0
+        self._dropped_newest = 0
+        self._blocked = 0
+        self._errors = 0
+        self._max_depth = 0
+        self._busy_s = 0.0
+        self._max_process_s = 0.0
+
+    # Producer API
+    def acquire(self) -> Optional[WindowSlot]:
+        """
+        Return a free slot to fill, applying the overflow policy when the hand-off is full.
+        A slot taken back from the oldest queued window has dropped set (its seq is the dropped window's).
+        """
+        with self._cond:
+            if not self._free:
+                if self.overflow == "drop_oldest" and self._ready:
+                    self._dropped_oldest += 1
+                    slot = self._ready.popleft()
+                    slot.dropped = True
+                    return slot
+                if self.overflow == "block":
+                    self._blocked += 1
+                    self._cond.wait_for(lambda: self._free or self._stop_event.is_set(), timeout=self.block_timeout)
+                if not self._free:
+                    self._dropped_newest += 1
+                    return None
+            slot = self._free.popleft()
+            slot.dropped = False
+            return slot
+
+    def publish(self, slot: WindowSlot) -> None:
+        """
+        Queue a filled slot for processing.
+        """
+        with self._cond:
+            self._seq += 1
+            slot.seq = self._seq
+            self._submitted += 1
+            self._ready.append(slot)
+            if len(self._ready) > self._max_depth:
+                self._max_depth = len(self._ready)
+            self._cond.notify_all()
+        if self._pool is not None:
+            self._pool.schedule(self)
+
+    def wait_for_room(self, timeout: Optional[float] = None) -> bool:
+        """
+        Block until a slot is free (producer-side backpressure for offline sources).
+        """
+        with self._cond:
+            return self._cond.wait_for(lambda: self._free or self._stop_event.is_set(), timeout=timeout)
+
+    def drain(self, timeout: Optional[float] = None) -> bool:
+        """
+        Block until every published window has been processed.
+        """
+        total = self.queue_size + 1
+        with self._cond:
+            return self._cond.wait_for(lambda: len(self._free) == total or self._stop_event.is_set(),
+                                       timeout=timeout)
+
+    # Thread lifecycle
+    @property
+    def running(self) -> bool:
+        if self._pool is None:
+            return self.is_alive()
+        return self._attached and not self._stop_event.is_set()
+
+    def start(self) -> None:
+        if self._pool is None:
+            super().start()
+            return
+        self._attached = True
+        log_system(f"[{self.name}] Started on {self._pool.name}: queue={self.queue_size} overflow={self.overflow}")
+
+    def run(self) -> None:
+        log_system(f"[{self.name}] Started: queue={self.queue_size} overflow={self.overflow}")
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._ready or self._stop_event.is_set())
+                if self._stop_event.is_set():
+                    return
+                slot = self._ready.popleft()
+            self._run_slot(slot)
+
+    def _has_ready(self) -> bool:
+        with self._cond:
+            return bool(self._ready) and not self._stop_event.is_set()
+
+    def _run_next(self) -> None:
+        """
+        Processes the oldest ready window, if any (pool threads).
+        """
+        with self._cond:
+            if not self._ready or self._stop_event.is_set():
+                return
+            slot = self._ready.popleft()
+        self._run_slot(slot)
+
+    def _run_slot(self, slot: WindowSlot) -> None:
+        t0 = time.perf_counter()
+        try:
+            self._process(None if slot.gated else slot.window, slot.ts, slot.ptrs, slot.trace)
+        except Exception as e:
+            self._errors += 1
+            log_system(f"[{self.name}] Processing error: {type(e).__name__}: {e}", level="ERROR")
+        dt = time.perf_counter() - t0
+
+        with self._cond:
+            self._processed += 1
+            self._busy_s += dt
+            if dt > self._max_process_s:
+                self._max_process_s = dt
+            self._free.append(slot)
+            self._cond.notify_all()
+
+    def stop(self) -> None:
+        """
+        Stop the worker. Windows still queued are discarded.
+        """
+        self._stop_event.set()
+        with self._cond:
+            self._cond.notify_all()
+        if self._pool is None and threading.current_thread() is not self and self.is_alive():
+            self.join()
+        log_system(f"[{self.name}] Stopped. Stats: {self.get_stats()}")
+
+    # optional helpers
+    def get_stats(self) -> Dict[str, float]:
+        with self._cond:
+            return {
+                "submitted": self._submitted,
+                "processed": self._processed,
+                "dropped_oldest": self._dropped_oldest,
+                "dropped_newest": self._dropped_newest,
+                "blocked": self._blocked,
+                "errors": self._errors,
+                "depth": len(self._ready),
+                "max_depth": self._max_depth,
+                "avg_process_ms": (self._busy_s / self._processed * 1000.0) if self._processed else 0.0,
+                "max_process_ms": self._max_process_s * 1000.0,
+            }
+
+
+class WindowWorkerPool:
+    """
+    Threads shared by several WindowWorker (created with pool=...). A worker with windows ready is queued once;
+    a pool thread processes its oldest window and queues it again at the back while it has more, so every
+    worker is run by one thread at a time (windows in order) and subjects take turns.
+    """
+
+    def __init__(self, threads: int, name: str = "WindowPool"):
+        self.name = name
+        self.size = max(1, int(threads))
+        self._runnable: deque = deque()
+        self._cond = threading.Condition()
+        self._stop_event = threading.Event()
+        self._threads = []
+
+    def schedule(self, worker: WindowWorker) -> None:
+        with self._cond:
+            if worker._scheduled or self._stop_event.is_set():
+                return
+            worker._scheduled = True
+            self._runnable.append(worker)
+            self._cond.notify()
+
+    def start(self) -> None:
+        if self._threads:
+            return
+        for i in range(self.size):
+            thread = threading.Thread(target=self._run, daemon=True, name=f"{self.name}-{i}")
+            thread.start()
+            self._threads.append(thread)
+        log_system(f"[{self.name}] Started: {self.size} thread(s)")
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._runnable or self._stop_event.is_set())
+                if self._stop_event.is_set():
+                    return
+                worker = self._runnable.popleft()
+            worker._run_next()
+            with self._cond:
+                # Checked and cleared under the pool lock: a window published meanwhile schedules it again
+                if worker._has_ready() and not self._stop_event.is_set():
+                    self._runnable.append(worker)
+                    self._cond.notify()
+                else:
+                    worker._scheduled = False
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        with self._cond:
+            self._cond.notify_all()
+        for thread in self._threads:
+            if thread is not threading.current_thread():
+                thread.join()
+        self._threads = []
+        log_system(f"[{self.name}] Stopped.")
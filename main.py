@@ -8,31 +8,76 @@
 # Classifier generates stereotipy event and pushes events to queue.
 # Dispatcher consumes event queue, logs to event diary and calls actuation based on actuation policy.
 # Actuation policy decides which actuator to use and for how long. Has memory for most effective.
+# With several wrist pairs in the bluecoins section, each subject has its own chain from synchronizer to dispatcher
+# (core/subjects.py).
+#
+# Usage:
+#   python main.py                          live system (BlueCoin sensors + actuators)
+#   python main.py --record FILE            live system, also records every sensor sample to FILE
+#   python main.py --replay FILE [--speed X] replays a recording through sync/buffer/classifier/dispatcher
+#                                           without hardware (X: 1 real time, N faster, 0 max speed)
 #
 # Author: Francesco Urru
 # Repository: https://github.com/frarvo/STOPme
 # License: MIT
 
+import argparse
+import signal
 import time
 
-from sensors.sensor_manager import SensorManager
-from actuators.actuator_manager import ActuatorManager
-
 from core.actuation_policy import StereotipyActivationPolicy
 from core.event_dispatcher import EventDispatcher
+from core.startup import StartupScheduler, log_first_window, since_launch
 
-from utils.logger import log_system
-from utils.config import get_bluecoin_config
+from utils.logger import log_system, close_event_diary
+from utils.tracing import dump_traces
+from sensors.link_stats import log_link_stats
+from utils.reconnect import log_reconnect_stats
+from utils.config import get_bluecoin_config, get_startup_config
 
 
-def main():
-    log_system("[MAIN] Initializing STOPme system...")
+def run_replay(path: str, speed: float):
+    """
+    Runs the processing chain on a recorded session, no BLE hardware and no actuators.
+    """
+    # Hardware-free imports only
+    from data_pipeline.synchronizer import create_synchronizer
+    from classifiers.stereotipy_classifier import StereotipyClassifier
+    from sensors.recording import ReplaySource
+
+    log_system(f"[MAIN] Initializing STOPme replay of {path}...")
+
+    synchronizer = create_synchronizer()
+    classifier = StereotipyClassifier()
+    synchronizer.buffer.set_features_sink(classifier.recognize)
+    synchronizer.buffer.set_gated_sink(classifier.still)
+    dispatcher = EventDispatcher(actuator_manager=None, policy=StereotipyActivationPolicy(actuator_ids=[]))
+    source = ReplaySource(path, synchronizer, speed=speed)
+
+    synchronizer.buffer.start()
+    dispatcher.start()
+    source.start()
+
+    try:
+        while source.is_alive():
+            source.join(timeout=0.5)
+        synchronizer.buffer.drain(timeout=10)
+    except KeyboardInterrupt:
+        log_system("[MAIN] Termination signal received.")
+    finally:
+        source.stop()
+        dispatcher.stop()
+        synchronizer.buffer.stop()
+        close_event_diary()
+        dump_traces()
+        log_system(f"[MAIN] Replay stats: sync={synchronizer.get_stats()} buffer={synchronizer.buffer.get_stats()}")
+        log_system("[MAIN] Replay complete.")
 
-    # Initialize managers
-    sensor_manager = SensorManager()
-    actuator_manager = ActuatorManager()
 
-    # Scan sensors
+def scan_bluecoins(sensor_manager) -> bool:
+    """
+    Scans for BlueCoin sensors, repeating the scan until the required ones are present.
+    """
     sensor_manager.scan_sensors()
 
     # Repeats scan to ensure that required BlueCoin sensors are present
@@ -56,10 +101,50 @@ def main():
             attempt += 1
         if not expected_names.issubset(actual_sensors()):
             log_system(f"[MAIN] Required BlueCoin sensors not found. Aborting startup.", level="ERROR")
-            return
+            return False
+    return True
+
+
+def start_dispatchers(sensor_manager, actuator_manager, actuator_ids):
+    """
+    Starts the policy and dispatcher of every subject (core/subjects.py). Returns the running dispatchers,
+    None if one failed to start (those already running are stopped).
+    """
+    dispatchers = []
+    for pipeline in sensor_manager.pipelines:
+        try:
+            dispatchers.append(pipeline.start_dispatcher(actuator_manager, actuator_ids))
+        except Exception as e:
+            log_system(f"[MAIN] Failed to start event dispatcher of subject {pipeline.id}: {e}", level="ERROR")
+            stop_dispatchers(dispatchers)
+            return None
+    return dispatchers
+
+
+def stop_dispatchers(dispatchers):
+    for dispatcher in dispatchers:
+        dispatcher.stop()
+
+
+def attach_policies(sensor_manager, actuator_manager):
+    """Actuators started or dropped from now on (startup, registry refresh) are added to/removed from the policies."""
+    policies = [p.policy for p in sensor_manager.pipelines]
+    actuator_manager.set_actuator_listener(lambda actuator_id: [p.add_actuator(actuator_id) for p in policies],
+                                           lambda actuator_id: [p.remove_actuator(actuator_id) for p in policies])
+
 
-    # Scan actuators
-    actuator_manager.scan_actuators()
+def start_sequential(sensor_manager, actuator_manager):
+    """
+    Scans and connects every device one after another, then starts the dispatchers.
+    Returns the running dispatchers, None if startup failed.
+    """
+    if not scan_bluecoins(sensor_manager):
+        return None
+
+    # Scan actuators (those on the BlueCoin adapter without the registry: no background scan while streaming)
+    radios = get_startup_config()["radios"]
+    actuator_manager.scan_actuators(no_registry=[k for k in actuator_manager.KINDS
+                                                 if radios[k] == radios["bluecoin"]])
 
     # Initialize sensors and actuators
     actuator_manager.initialize_actuators()
@@ -70,25 +155,96 @@ def main():
     if not actuators_list:
         log_system("[MAIN] No actuators discovered. Event detection and logging still executing")
 
-    # Instantiate activation policy
-    policy = StereotipyActivationPolicy(actuator_ids=actuators_list)
+    # Activation policy and event dispatcher of each subject
+    dispatchers = start_dispatchers(sensor_manager, actuator_manager, actuators_list)
+    if dispatchers is not None:
+        attach_policies(sensor_manager, actuator_manager)
+    return dispatchers
 
-    # Instantiate event dispatcher
-    dispatcher = EventDispatcher(
-        actuator_manager=actuator_manager,
-        policy=policy
-    )
 
-    # Initialize event dispatcher
-    try:
-        dispatcher.start()
-    except Exception as e:
-        log_system(f"[MAIN] Failed to start event dispatcher: {e}", level="ERROR")
+def start_concurrent(sensor_manager, actuator_manager):
+    """
+    Startup steps on their own threads (core/startup.py): actuators on the BlueCoin adapter are scanned first
+    (no scan on that adapter once the BlueCoins stream, registry refresh included) and connected after the
+    BlueCoins; streaming starts as soon as both BlueCoins are connected; actuators on another radio (LED Wi-Fi)
+    are scanned/connected in parallel. Each actuator kind attaches to the running policies when it comes up.
+    Returns the running dispatchers, None if the BlueCoins could not be started.
+    """
+    cfg = get_startup_config()
+    radios = cfg["radios"]
+
+    # Dispatchers first: events can flow before any actuator is attached
+    dispatchers = start_dispatchers(sensor_manager, actuator_manager, [])
+    if dispatchers is None:
+        return None
+    attach_policies(sensor_manager, actuator_manager)
+
+    def bluecoins():
+        if not scan_bluecoins(sensor_manager) or not sensor_manager.initialize_sensors():
+            return False
+        # Adapter kept until both nodes are connected: scans on the same adapter make connections fail
+        if sensor_manager.wait_connected(cfg["connect_timeout_s"]):
+            log_system(f"[MAIN] Sensors streaming at +{since_launch():.1f}s from launch")
+        else:
+            log_system(f"[MAIN] BlueCoins not connected after {cfg['connect_timeout_s']:g}s, "
+                       f"releasing {radios['bluecoin']} to the actuators", level="WARNING")
+        return True
+
+    def actuators(kind):
+        actuator_manager.scan_kind(kind)
+        actuator_manager.initialize_kind(kind)
+
+    def scan_first(kind):
+        # Never fails: the BlueCoins come after this step
+        try:
+            actuator_manager.scan_kind(kind, use_registry=False)
+        except Exception as e:
+            log_system(f"[MAIN] {kind} scan failed: {e}", level="ERROR")
+
+    def connect(kind):
+        actuator_manager.initialize_kind(kind)
+
+    scheduler = StartupScheduler()
+    kinds = [k for k in actuator_manager.KINDS if actuator_manager.is_enabled(k)]
+    shared = [k for k in kinds if radios[k] == radios["bluecoin"]]
+    for kind in shared:
+        scheduler.add(f"{kind}_scan", lambda k=kind: scan_first(k), resources=[radios[kind]])
+    scheduler.add("bluecoin", bluecoins, resources=[radios["bluecoin"]], after=[f"{k}_scan" for k in shared])
+    for kind in kinds:
+        if kind in shared:
+            scheduler.add(kind, lambda k=kind: connect(k), resources=[radios[kind]], after=("bluecoin",))
+        else:
+            scheduler.add(kind, lambda k=kind: actuators(k), resources=[radios[kind]])
+    scheduler.add("registry_refresh", actuator_manager.start_refresher, after=kinds)
+    scheduler.start()
+
+    if not scheduler.wait("bluecoin"):
+        stop_dispatchers(dispatchers)
+        return None
+    return dispatchers
+
+
+def main(record_path=None):
+    # Hardware stacks are only needed for the live system
+    from sensors.sensor_manager import SensorManager
+    from actuators.actuator_manager import ActuatorManager
+
+    log_system("[MAIN] Initializing STOPme system...")
+
+    # Initialize managers
+    sensor_manager = SensorManager(record_path=record_path)
+    actuator_manager = ActuatorManager()
+    log_first_window(sensor_manager.synchronizer.buffer, sensor_manager.classifier.recognize)
+
+    if get_startup_config()["concurrent"]:
+        dispatchers = start_concurrent(sensor_manager, actuator_manager)
+    else:
+        dispatchers = start_sequential(sensor_manager, actuator_manager)
+    if dispatchers is None:
         sensor_manager.stop_all()
         actuator_manager.stop_all()
         return
 
-
     log_system("[MAIN] System is now running. Press Ctrl+C to terminate.")
 
     try:
@@ -99,11 +255,27 @@ def main():
     except Exception as e:
         log_system(f"[MAIN] Unhandled error in main loop: {e}", level="ERROR")
     finally:
-        dispatcher.stop()
+        stop_dispatchers(dispatchers)
+        close_event_diary()
         sensor_manager.stop_all()
         actuator_manager.stop_all()
+        dump_traces()
+        log_reconnect_stats()
         log_system("[MAIN] System shutdown complete.")
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="STOPme real-time stereotipy detection and feedback")
+    parser.add_argument("--record", metavar="FILE", help="record every sensor sample to FILE")
+    parser.add_argument("--replay", metavar="FILE", help="replay a recorded session instead of using sensors")
+    parser.add_argument("--speed", type=float, default=1.0,
+                        help="replay speed: 1 real time, N times faster, 0 as fast as possible")
+    args = parser.parse_args()
+
+    # Latency histograms, link loss counters and reconnection metrics on demand: kill -USR1 <pid>
+    signal.signal(signal.SIGUSR1, lambda signum, frame: (dump_traces(), log_link_stats(), log_reconnect_stats()))
+
+    if args.replay:
+        run_replay(args.replay, args.speed)
+    else:
+        main(record_path=args.record)
\ No newline at end of file
@@ -0,0 +1,171 @@
+# reprocess.py
+# Offline batch reprocessing of recorded sensor sessions (sensors/recording.py format)
+#
+# Every session runs through the same chain as the live system: synchronizer (sync.mode), DataBuffer
+# windowing and calibration window, feature extraction, FineTree classification. Per-window features and
+# labels are written to <out>/<session>.windows.csv, a per-session summary to <out>/summary.csv.
+# Sessions are spread over a pool of worker processes (spawned, each loads its own copy of the C libraries
+# and their state). Recordings are streamed block by block, windows are classified in batches.
+#
+# Usage:
+#   python reprocess.py SESSIONS [SESSIONS ...] [--out DIR] [--workers N]
+#                       [--backend auto|c|numpy] [--classifier c|numpy] [--batch 256]
+#   SESSIONS: recording files or directories (searched recursively for *.rec)
+#
+# Author: Francesco Urru
+# Repository: https://github.com/frarvo/STOPme
+# License: MIT
+
+import argparse
+import csv
+import multiprocessing as mp
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Dict, List
+
+from utils.logger import log_system
+
+FEATURE_COLUMNS = [f"f{i:02d}" for i in range(18)]
+SUMMARY_COLUMNS = ["session", "records", "windows", "no_class", "non_dangerous", "dangerous", "non_stereotipy",
+                   "elapsed_s", "output", "error"]
+
+
+def find_sessions(inputs: List[str], pattern: str = "*.rec") -> List[Path]:
+    sessions = []
+    for item in inputs:
+        p = Path(item).expanduser()
+        if p.is_dir():
+            sessions.extend(sorted(p.rglob(pattern)))
+        elif p.is_file():
+            sessions.append(p)
+        else:
+            log_system(f"[Reprocess] Not found: {p}", level="WARNING")
+    return sessions
+
+
+def process_session(path: str, out_path: str, backend: str, classifier: str, batch: int) -> Dict:
+    """
+    Runs one recording through synchronizer -> DataBuffer -> features -> classifier (worker process).
+    """
+    import numpy as np
+    import utils.config as config
+
+    # Inline buffer processing in this process, features backend as requested, every window classified
+    proc_cfg = config.CONFIG.setdefault("processing", {})
+    proc_cfg["worker"] = False
+    proc_cfg["backend"] = backend
+    config.CONFIG.setdefault("activity_gate", {})["enable"] = False
+
+    from data_pipeline.synchronizer import create_synchronizer
+    from sensors.recording import iter_updates, apply_update
+    if classifier == "numpy":
+        from classifiers.finetree_numpy import FineTree
+        predict = FineTree.load().predict
+    else:
+        from classifiers.predict_models_wrapper_quat import predict_pericolosa_wrists_quat_batch as predict
+
+    summary = {"session": path, "records": 0, "windows": 0, "output": out_path, "error": ""}
+    counts = np.zeros(4, dtype=np.int64)
+    t0 = time.monotonic()
+
+    pending_feats: List = []
+    pending_ts: List[float] = []
+
+    with open(out_path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["window", "window_end_ts"] + FEATURE_COLUMNS + ["label"])
+
+        def flush():
+            if not pending_feats:
+                return
+            feats = np.stack(pending_feats)
+            labels = predict(feats)
+            first = summary["windows"]
+            for i, (ts, row, label) in enumerate(zip(pending_ts, feats.tolist(), labels.tolist())):
+                writer.writerow([first + i, f"{ts:.6f}"] + [f"{v:.9g}" for v in row] + [label])
+            counts[:] += np.bincount(labels, minlength=4)[:4]
+            summary["windows"] += len(pending_feats)
+            pending_feats.clear()
+            pending_ts.clear()
+
+        def sink(features, window_end_ts):
+            pending_feats.append(np.array(features, dtype=np.float32))
+            pending_ts.append(window_end_ts)
+            if len(pending_feats) >= batch:
+                flush()
+
+        sync = create_synchronizer()
+        sync.buffer.set_features_sink(sink)
+        now = [0.0]
+        if hasattr(sync, "set_clock"):
+            sync.set_clock(lambda: now[0])     # stale checks follow the recording timeline
+
+        try:
+            for device_id, kind, values, ts, dev_ts in iter_updates(path):
+                now[0] = ts
+                apply_update(sync, device_id, kind, values, ts, dev_ts)
+                summary["records"] += 3 if kind == "triplet" else 1
+        except Exception as e:
+            summary["error"] = f"{type(e).__name__}: {e}"
+        flush()
+
+    summary.update(no_class=int(counts[0]), non_dangerous=int(counts[1]), dangerous=int(counts[2]),
+                   non_stereotipy=int(counts[3]), elapsed_s=round(time.monotonic() - t0, 3))
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="STOPme offline reprocessing of recorded sessions")
+    parser.add_argument("sessions", nargs="+", help="recording files or directories")
+    parser.add_argument("--out", default="reprocessed", help="output directory")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="worker processes")
+    parser.add_argument("--backend", choices=("auto", "c", "numpy"), default="auto",
+                        help="feature extraction backend (processing.backend)")
+    parser.add_argument("--classifier", choices=("c", "numpy"), default="c",
+                        help="C library (batched calls) or NumPy FineTree")
+    parser.add_argument("--batch", type=int, default=256, help="windows classified per batch")
+    args = parser.parse_args()
+
+    sessions = find_sessions(args.sessions)
+    if not sessions:
+        log_system("[Reprocess] No sessions to process", level="WARNING")
+        return
+    out_dir = Path(args.out).expanduser()
+    out_dir.mkdir(parents=True, exist_ok=True)
+    workers = max(1, min(args.workers, len(sessions)))
+    log_system(f"[Reprocess] {len(sessions)} sessions, {workers} workers, backend={args.backend} "
+               f"classifier={args.classifier} -> {out_dir}")
+
+    t0 = time.monotonic()
+    summaries = []
+    # Spawned workers: fresh interpreter and fresh library state per process (no fork of logger threads)
+    with ProcessPoolExecutor(max_workers=workers, mp_context=mp.get_context("spawn")) as pool:
+        futures = {}
+        for i, path in enumerate(sessions):
+            out_path = out_dir / f"{i:04d}_{path.stem}.windows.csv"
+            fut = pool.submit(process_session, str(path), str(out_path), args.backend, args.classifier,
+                              max(1, args.batch))
+            futures[fut] = path
+        for fut in as_completed(futures):
+            try:
+                s = fut.result()
+            except Exception as e:
+                s = {"session": str(futures[fut]), "error": f"{type(e).__name__}: {e}"}
+            summaries.append(s)
+            level = "ERROR" if s.get("error") else "INFO"
+            log_system(f"[Reprocess] {s['session']}: {s.get('windows', 0)} windows in "
+                       f"{s.get('elapsed_s', 0)}s {s.get('error', '')}", level=level)
+
+    summaries.sort(key=lambda s: s["session"])
+    with open(out_dir / "summary.csv", "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=SUMMARY_COLUMNS, extrasaction="ignore")
+        writer.writeheader()
+        writer.writerows(summaries)
+    total = sum(s.get("windows", 0) for s in summaries)
+    log_system(f"[Reprocess] Done: {len(summaries)} sessions, {total} windows in {time.monotonic() - t0:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -8,14 +8,19 @@
 
 import time
 import threading
-from typing import Sequence, List
+from typing import Sequence, List, Dict, Iterable, Optional
 
 from blue_st_sdk.manager import Manager, ManagerListener
-from blue_st_sdk.node import NodeStatus, NodeListener
+from blue_st_sdk.node import Node, NodeStatus, NodeListener
 from bluepy.btle import BTLEDisconnectError
 
 from utils.logger import log_system
-from utils.lock import device_reconnection_lock
+from utils.reconnect import get_reconnector
+from utils.config import get_ble_io_config
+from sensors.notification_loop import get_notification_loop
+from utils.device_registry import mark_seen
+from utils.ble_discovery import get_ble_discovery, bluest_nodes
+from sensors.fast_decode import uninstall_fast_path
 
 
 class BlueCoinManagerListener(ManagerListener):
@@ -35,6 +40,7 @@ class BlueCoinNodeListener(NodeListener):
     """ Custom listener for BlueCoin Nodes. Logs events during BLE connections and disconnections. """
     def on_connect(self, node):
         log_system(f"[BlueCoin node] {node.get_name()}: {node.get_tag()} connected")
+        mark_seen("bluecoin", node.get_tag())
 
     def on_disconnect(self, node, unexpected=False):
         log_system(f"[BlueCoin node] {node.get_name()}: {node.get_tag()} disconnected {'unexpectedly' if unexpected else ' '}")
@@ -51,6 +57,21 @@ def scan_bluecoin_devices(timeout: int = 5) -> list:
     """
     nodes = []
 
+    discovery = get_ble_discovery()
+    if discovery is not None:
+        # Shared scan pass, also classifies MetaMotion advertisements (utils/ble_discovery.py)
+        nodes = bluest_nodes(discovery.take("bluecoin", timeout))
+        for node in nodes:
+            try:
+                log_system(f"[BlueCoin Scanner] Found node: {node.get_name()} - {node.get_tag()}")
+            except Exception:
+                log_system(f"[BlueCoin Scanner] Found node: (name/tag unavailable)")
+        if not nodes:
+            log_system("[BlueCoin Scanner] No BlueCoin devices found.", level="WARNING")
+        else:
+            log_system(f"[BlueCoin Scanner] Total devices found: {len(nodes)}")
+        return nodes
+
     log_system(f"[BlueCoin Scanner] Starting BLE scan for {timeout} seconds...")
     manager = Manager.instance()
     listener = BlueCoinManagerListener()
@@ -74,6 +95,57 @@ def scan_bluecoin_devices(timeout: int = 5) -> list:
 
     return nodes
 
+class _KnownScanEntry:
+    """
+    Stands in for the bluepy ScanEntry of a previous scan: what the BlueST Node reads from it
+    (address, address type, advertising data), as stored in the device registry.
+    """
+
+    def __init__(self, addr: str, addr_type: str, scan_data: Iterable):
+        self.addr = addr
+        self.addrType = addr_type
+        self.rssi = 0
+        self._scan_data = [tuple(d) for d in scan_data]
+
+    def getScanData(self):
+        return list(self._scan_data)
+
+
+def bluecoin_registry_entry(node) -> Optional[Dict]:
+    """
+    Device registry entry of a scanned node (name, address type, advertising data), None if unavailable.
+    """
+    try:
+        entry = node._device
+        return {"name": node.get_name(), "addr_type": entry.addrType,
+                "scan_data": [list(d) for d in entry.getScanData()]}
+    except Exception as e:
+        log_system(f"[BlueCoin Scanner] Can't read advertising data of scanned node: {e}", level="WARNING")
+        return None
+
+
+def known_bluecoin_nodes(entries: Dict[str, Dict], names: Iterable[str]) -> list:
+    """
+    Builds BlueST nodes from device registry entries ({address: entry}, most recent first) without scanning,
+    one per wanted name. The node connects directly to the stored address.
+    """
+    wanted = set(names)
+    nodes = []
+    for addr, entry in entries.items():
+        name = entry.get("name")
+        if name not in wanted:
+            continue
+        try:
+            node = Node(_KnownScanEntry(addr, entry.get("addr_type", "public"), entry.get("scan_data") or []))
+        except Exception as e:
+            log_system(f"[BlueCoin Scanner] Known node {name} ({addr}) unusable: {e}", level="WARNING")
+            continue
+        wanted.discard(name)
+        nodes.append(node)
+        log_system(f"[BlueCoin Scanner] Known node: {name} - {addr}")
+    return nodes
+
+
 class BlueCoinThread(threading.Thread):
     """
     Thread for managing connection to a single BlueCoin device with multiple features at the same time.
@@ -91,6 +163,10 @@ class BlueCoinThread(threading.Thread):
         self.node_listener = BlueCoinNodeListener()
         self.device_id = device_id
         self.stop_event = threading.Event()
+        self.connected_event = threading.Event()    # set once the first connection succeeded
+        self.reconnector = get_reconnector("bluecoin", device_id)
+        self._wake = threading.Event()              # disconnection seen by the notification loop, or stop()
+        self._poll_timeout_s = get_ble_io_config()["poll_timeout_s"]
 
         # Distinguish between single istance or list
         if isinstance(feature, (list,tuple)):
@@ -120,6 +196,7 @@ class BlueCoinThread(threading.Thread):
 
     def stop(self):
         self.stop_event.set()
+        self._wake.set()
         if self.is_alive():
             self.join()
         log_system(f"[BlueCoin Thread: {self.device_id}] Thread stopped.")
@@ -143,6 +220,8 @@ class BlueCoinThread(threading.Thread):
                 feature.add_listener(listener)
             except Exception as e:
                 log_system(f"[BlueCoin Thread: {self.device_id}] add_listener error: {e}", level="ERROR")
+        self.reconnector.mark_connected()
+        self.connected_event.set()
         return True
 
     def _start_notifications(self):
@@ -166,12 +245,20 @@ class BlueCoinThread(threading.Thread):
                 pass
 
     def _listen(self):
+        loop = get_notification_loop()
         while not self.stop_event.is_set():
+            if loop is not None and self.node.get_status() == NodeStatus.CONNECTED:
+                self._wake.clear()
+                if loop.register(self.node, self._wake.set):
+                    # Notifications are dispatched by the shared I/O thread, this one waits for a disconnection
+                    self._wake.wait()
+                    loop.unregister(self.node)
+                    continue
             try:
                 if self.node.get_status() != NodeStatus.CONNECTED:
                     self._handle_reconnection()
                 else:
-                    self.node.wait_for_notifications(0.05)
+                    self.node.wait_for_notifications(self._poll_timeout_s)
             except BTLEDisconnectError:
                 log_system(f"[BlueCoin Thread: {self.device_id}] BTLE exception caught", level="ERROR")
                 self._handle_reconnection()
@@ -182,31 +269,25 @@ class BlueCoinThread(threading.Thread):
 
     def _handle_reconnection(self):
         self._stop_notifications()
-        with device_reconnection_lock:
-            while not self.stop_event.is_set():
+        # Backoff and radio exclusion per device (utils/reconnect.py), the other BlueCoin keeps streaming
+        if self.reconnector.reconnect(self._try_reconnect, self.stop_event):
+            # Reattach listeners and re-enable notifications on reconnection
+            for feature, listener in zip(self.features, self.feature_listeners):
                 try:
-                    log_system(f"[BlueCoin Thread: {self.device_id}] Attempting reconnection...")
-                    if self.node.connect():
-                        log_system(f"[BlueCoin Thread: {self.device_id}] Reconnected successfully.")
-                        # Reattach listeners and re-enable notifications on reconnection
-                        for feature, listener in zip(self.features, self.feature_listeners):
-                            try:
-                                feature.add_listener(listener)
-                            except Exception:
-                                pass
-                        self._start_notifications()
-                        return
-                except BTLEDisconnectError:
-                    log_system(f"[BlueCoin Thread: {self.device_id}] Reconnection failed, retrying...", level="WARNING")
-                except Exception as e:
-                    log_system(f"[BlueCoin Thread: {self.device_id}] Reconnection error: {e}", level="ERROR")
-                # 2 seconds interruptable wait
-                for _ in range(20):
-                    if self.stop_event.is_set():
-                        return
-                    time.sleep(0.1)
-
+                    feature.add_listener(listener)
+                except Exception:
+                    pass
+            self._start_notifications()
 
+    def _try_reconnect(self) -> bool:
+        log_system(f"[BlueCoin Thread: {self.device_id}] Attempting reconnection...")
+        try:
+            if self.node.connect():
+                log_system(f"[BlueCoin Thread: {self.device_id}] Reconnected successfully.")
+                return True
+        except BTLEDisconnectError:
+            log_system(f"[BlueCoin Thread: {self.device_id}] Reconnection failed, retrying...", level="WARNING")
+        return False
 
     def _cleanup(self):
         try:
@@ -214,6 +295,12 @@ class BlueCoinThread(threading.Thread):
         except Exception:
             # Doesn't raise exception during shutdown
             pass
+        # SDK decoding back on the features (sensors/fast_decode.py)
+        for feature in self.features:
+            try:
+                uninstall_fast_path(feature)
+            except Exception:
+                pass
         # Remove listener before disconnect
         try:
             self.node.remove_listener(self.node_listener)
@@ -0,0 +1,174 @@
+# sensors/fast_decode.py
+# Fast decode path for the BlueCoin acc/gyr/quaternion notifications
+#
+# The SDK path decodes every notification field by field (LittleEndian.bytes_to_int16 on a slice), builds a
+# Sample and an ExtractedData, takes the feature lock and calls the listeners, which convert get_data() to
+# floats again. Here the payload is unpacked with one precompiled struct and the values go straight to the
+# fused listener of the wrist (FusedFeatureListener.push), without intermediate objects.
+# Payloads (after the 2 byte timestamp), little endian:
+#   acc  : 3 x int16, mg                         (FeatureAccelerometer)
+#   gyr  : 3 x int16, dps x 10                   (FeatureGyroscope)
+#   quat : 3 x int16, qx qy qz x 10000           (FeatureMemsSensorFusionCompact, qw >= 0 reconstructed)
+#   imu  : acc, gyr, quat as above (9 x int16) + optional uint16 sequence counter   (FeatureImuPacket)
+# Values match the SDK / feature classes exactly. Batched NumPy decoders are provided for (n, 6) payload
+# arrays (offline tools, benchmarks/bench_decode.py).
+#
+# Author: Francesco Urru
+# GitHub: https://github.com/frarvo
+# Repository: https://github.com/frarvo/STOPme
+# License: MIT
+
+import math
+import struct
+from typing import Callable, Tuple
+
+import numpy as np
+
+from utils.logger import log_system
+
+PAYLOAD_BYTES = 6
+QUAT_RAW_SCALE = 10000.0
+GYR_SCALE = 10.0
+
+IMU_PACKET_BYTES = 18
+IMU_PACKET_SEQ_BYTES = 20
+
+_VEC3 = struct.Struct("<3h")
+_IMU = struct.Struct("<9h")
+_IMU_SEQ = struct.Struct("<9hH")
+_unpack_from = _VEC3.unpack_from
+_sqrt = math.sqrt
+_Q2 = QUAT_RAW_SCALE * QUAT_RAW_SCALE
+
+
+def _quat_w(x: int, y: int, z: int) -> float:
+    t = _Q2 - (x * x + y * y + z * z)
+    return float(int(_sqrt(t))) if t > 0 else 0.0
+
+
+def decode_acc(data, offset: int = 0) -> Tuple[float, float, float]:
+    x, y, z = _unpack_from(data, offset)
+    return float(x), float(y), float(z)
+
+
+def decode_gyr(data, offset: int = 0) -> Tuple[float, float, float]:
+    x, y, z = _unpack_from(data, offset)
+    return x / GYR_SCALE, y / GYR_SCALE, z / GYR_SCALE
+
+
+def decode_quat_compact(data, offset: int = 0) -> Tuple[float, float, float, float]:
+    x, y, z = _unpack_from(data, offset)
+    return float(x), float(y), float(z), _quat_w(x, y, z)
+
+
+def decode_imu_packet(data, offset: int = 0):
+    """
+    Combined packet -> (acc, gyr, quat, seq). seq is None when the payload has no sequence counter.
+    """
+    if len(data) - offset >= IMU_PACKET_SEQ_BYTES:
+        ax, ay, az, gx, gy, gz, qx, qy, qz, seq = _IMU_SEQ.unpack_from(data, offset)
+    else:
+        ax, ay, az, gx, gy, gz, qx, qy, qz = _IMU.unpack_from(data, offset)
+        seq = None
+    return ((float(ax), float(ay), float(az)),
+            (gx / GYR_SCALE, gy / GYR_SCALE, gz / GYR_SCALE),
+            (float(qx), float(qy), float(qz), _quat_w(qx, qy, qz)),
+            seq)
+
+
+def encode_imu_packet(acc, gyr, quat, seq=None) -> bytes:
+    """Inverse of decode_imu_packet (firmware side packing), used to build packets from recordings."""
+    ints = ([int(round(v)) for v in acc] + [int(round(v * GYR_SCALE)) for v in gyr]
+            + [int(round(v)) for v in quat[:3]])
+    return _IMU.pack(*ints) if seq is None else _IMU_SEQ.pack(*ints, seq & 0xFFFF)
+
+
+DECODERS = {"acc": decode_acc, "gyr": decode_gyr, "quat": decode_quat_compact}
+
+
+def _vec3_block(payloads) -> np.ndarray:
+    return np.frombuffer(payloads, dtype="<i2").reshape(-1, 3).astype(np.float64)
+
+
+def decode_acc_block(payloads) -> np.ndarray:
+    """Concatenated 6 byte payloads (bytes or (n, 6) uint8) -> (n, 3) float64 mg."""
+    return _vec3_block(payloads)
+
+
+def decode_gyr_block(payloads) -> np.ndarray:
+    return _vec3_block(payloads) / GYR_SCALE
+
+
+def decode_quat_compact_block(payloads) -> np.ndarray:
+    """Concatenated 6 byte payloads -> (n, 4) float64 raw x10000 quaternions (x, y, z, w)."""
+    xyz = _vec3_block(payloads)
+    t = _Q2 - np.einsum("ij,ij->i", xyz, xyz)
+    w = np.floor(np.sqrt(np.maximum(t, 0.0)))
+    return np.column_stack((xyz, w))
+
+
+def _sole_listener(feature, listener) -> bool:
+    # Fast path only while listener is the one registered on the feature (SDK Feature._listeners)
+    listeners = getattr(feature, "_listeners", None)
+    return listeners is not None and len(listeners) == 1 and listeners[0] is listener
+
+
+def install_fast_path(feature, kind: str, listener) -> None:
+    """
+    Replaces feature.update on this instance: the node hands the notification payload to it, the values
+    are decoded with DECODERS[kind] and pushed to listener.push(kind, values, timestamp) with the device
+    timestamp the node unwrapped from the notification.
+    The SDK update runs instead when the payload is short or malformed (it raises the SDK exception) and
+    whenever listener is not the only listener of the feature: removed (notifications stopped) or joined by
+    others, which then get SDK samples as usual.
+    Restriction: on the fast path no SDK Sample is built, feature.get_sample() keeps the last one the SDK
+    update produced. Undone by uninstall_fast_path (BlueCoinThread cleanup).
+    """
+    decode: Callable = DECODERS[kind]
+    push = listener.push
+    sdk_update = feature.update
+
+    def update(timestamp, data, offset, notify_update=False):
+        if not _sole_listener(feature, listener):
+            return sdk_update(timestamp, data, offset, notify_update)
+        try:
+            values = decode(data, offset)
+        except struct.error:
+            return sdk_update(timestamp, data, offset, notify_update)
+        if notify_update:
+            push(kind, values, timestamp)
+        return PAYLOAD_BYTES
+
+    feature.update = update
+    log_system(f"[FastDecode] {getattr(listener, 'device_id', '?')}: {kind} fast path installed", level="DEBUG")
+
+
+def install_packet_fast_path(feature, listener) -> None:
+    """
+    Same as install_fast_path for FeatureImuPacket: decoded packets go to
+    listener.push_packet(acc, gyr, quat, seq, timestamp).
+    """
+    push_packet = listener.push_packet
+    sdk_update = feature.update
+
+    def update(timestamp, data, offset, notify_update=False):
+        if not _sole_listener(feature, listener):
+            return sdk_update(timestamp, data, offset, notify_update)
+        try:
+            acc, gyr, quat, seq = decode_imu_packet(data, offset)
+        except struct.error:
+            return sdk_update(timestamp, data, offset, notify_update)
+        if notify_update:
+            push_packet(acc, gyr, quat, seq, timestamp)
+        return IMU_PACKET_BYTES if seq is None else IMU_PACKET_SEQ_BYTES
+
+    feature.update = update
+    log_system(f"[FastDecode] {getattr(listener, 'device_id', '?')}: imu packet fast path installed", level="DEBUG")
+
+
+def uninstall_fast_path(feature) -> None:
+    """
+    Restores the SDK update of a feature the fast path was installed on (no-op otherwise).
+    """
+    if "update" in getattr(feature, "__dict__", {}):
+        del feature.update
@@ -0,0 +1,124 @@
+# sensors/feature_imu_packet.py
+# Combined IMU packet feature: one notification per sample with acc, gyr and compact quaternion.
+# Payload (little endian, after the 2 byte timestamp):
+#   ax ay az (int16, mg) | gx gy gz (int16, dps x 10) | qx qy qz (int16, x 10000) | [seq (uint16)]
+# qw >= 0 is reconstructed as in FeatureMemsSensorFusionCompact. The sequence counter is optional,
+# detected from the payload length.
+# The firmware exposes it on its own characteristic: register_imu_packet_feature() maps the feature mask
+# (imu_packet in config.yaml) to this class before discovery.
+#
+# Author: Francesco Urru
+# GitHub: https://github.com/frarvo
+# Repository: https://github.com/frarvo/STOPme
+# License: MIT
+
+from blue_st_sdk.feature import Feature, Sample, ExtractedData
+from blue_st_sdk.features.field import Field, FieldType
+from blue_st_sdk.utils.blue_st_exceptions import (
+    BlueSTInvalidOperationException,
+    BlueSTInvalidDataException,
+)
+
+from sensors.fast_decode import decode_imu_packet, IMU_PACKET_BYTES, IMU_PACKET_SEQ_BYTES
+from utils.config import get_imu_packet_config
+from utils.logger import log_system
+
+
+class FeatureImuPacket(Feature):
+    """
+    One packed characteristic per sample: acc (mg), gyr (dps), quaternion (raw x10000, qw >= 0) and an
+    optional sequence counter (-1 when the firmware does not send it).
+    """
+
+    FEATURE_NAME = "IMU Packet"
+    FEATURE_DATA_NAME = ["AX", "AY", "AZ", "GX", "GY", "GZ", "QX", "QY", "QZ", "QW", "SEQ"]
+    FEATURE_UNITS = ["mg"] * 3 + ["dps"] * 3 + [""] * 5
+    DATA_LENGTH_BYTES = IMU_PACKET_BYTES
+    DATA_LENGTH_BYTES_SEQ = IMU_PACKET_SEQ_BYTES
+
+    ACC_INDEX = 0
+    GYR_INDEX = 3
+    QUAT_INDEX = 6
+    SEQ_INDEX = 10
+
+    FEATURE_FIELDS = [
+        Field(FEATURE_DATA_NAME[0], FEATURE_UNITS[0], FieldType.Int16, 32767, -32768),
+        Field(FEATURE_DATA_NAME[1], FEATURE_UNITS[1], FieldType.Int16, 32767, -32768),
+        Field(FEATURE_DATA_NAME[2], FEATURE_UNITS[2], FieldType.Int16, 32767, -32768),
+        Field(FEATURE_DATA_NAME[3], FEATURE_UNITS[3], FieldType.Float, 3276.7, -3276.8),
+        Field(FEATURE_DATA_NAME[4], FEATURE_UNITS[4], FieldType.Float, 3276.7, -3276.8),
+        Field(FEATURE_DATA_NAME[5], FEATURE_UNITS[5], FieldType.Float, 3276.7, -3276.8),
+        Field(FEATURE_DATA_NAME[6], FEATURE_UNITS[6], FieldType.Float, +10000.0, -10000.0),
+        Field(FEATURE_DATA_NAME[7], FEATURE_UNITS[7], FieldType.Float, +10000.0, -10000.0),
+        Field(FEATURE_DATA_NAME[8], FEATURE_UNITS[8], FieldType.Float, +10000.0, -10000.0),
+        Field(FEATURE_DATA_NAME[9], FEATURE_UNITS[9], FieldType.Float, +10000.0, 0.0),
+        Field(FEATURE_DATA_NAME[10], FEATURE_UNITS[10], FieldType.Int32, 65535, -1),
+    ]
+
+    def __init__(self, node):
+        super(FeatureImuPacket, self).__init__(self.FEATURE_NAME, node, self.FEATURE_FIELDS)
+
+    def extract_data(self, timestamp, data, offset):
+        """Extract acc, gyr, quaternion (qw reconstructed) and the sequence counter if present."""
+        if len(data) - offset < self.DATA_LENGTH_BYTES:
+            raise BlueSTInvalidDataException(
+                f"There are not {self.DATA_LENGTH_BYTES} bytes available to read."
+            )
+        acc, gyr, quat, seq = decode_imu_packet(data, offset)
+        sample = Sample(
+            list(acc) + list(gyr) + list(quat) + [-1 if seq is None else seq],
+            self.get_fields_description(),
+            timestamp,
+        )
+        return ExtractedData(sample, self.DATA_LENGTH_BYTES if seq is None else self.DATA_LENGTH_BYTES_SEQ)
+
+    @classmethod
+    def get_acc(cls, sample):
+        return cls._slice(sample, cls.ACC_INDEX, 3)
+
+    @classmethod
+    def get_gyr(cls, sample):
+        return cls._slice(sample, cls.GYR_INDEX, 3)
+
+    @classmethod
+    def get_quat(cls, sample):
+        return cls._slice(sample, cls.QUAT_INDEX, 4)
+
+    @classmethod
+    def get_seq(cls, sample):
+        if sample and sample._data and len(sample._data) > cls.SEQ_INDEX and sample._data[cls.SEQ_INDEX] >= 0:
+            return int(sample._data[cls.SEQ_INDEX])
+        return None
+
+    @classmethod
+    def _slice(cls, sample, start, n):
+        if sample and sample._data and len(sample._data) >= start + n:
+            return tuple(float(v) for v in sample._data[start:start + n])
+        return (float("nan"),) * n
+
+    def read_packet(self):
+        """Read one packet: (acc, gyr, quat, seq)."""
+        try:
+            self._read_data()
+            sample = self._get_sample()
+            return self.get_acc(sample), self.get_gyr(sample), self.get_quat(sample), self.get_seq(sample)
+        except (BlueSTInvalidOperationException, BlueSTInvalidDataException) as e:
+            raise e
+
+
+def register_imu_packet_feature() -> bool:
+    """
+    Maps the configured feature mask of the BlueCoin device id to FeatureImuPacket (before discovery).
+    Returns False when disabled or no mask is configured (nodes then expose the three separate features).
+    """
+    cfg = get_imu_packet_config()
+    if not cfg["enable"] or cfg["mask"] is None:
+        return False
+    try:
+        from blue_st_sdk.manager import Manager
+        Manager.add_features_to_node(cfg["device_id"], {cfg["mask"]: FeatureImuPacket})
+        log_system(f"[IMU Packet] Feature registered: device 0x{cfg['device_id']:02X} mask 0x{cfg['mask']:08X}")
+        return True
+    except Exception as e:
+        log_system(f"[IMU Packet] Feature registration failed: {type(e).__name__}: {e}", level="WARNING")
+        return False
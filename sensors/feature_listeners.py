@@ -1,5 +1,8 @@
 # feature_listeners.py
 # Feature listeners modules for BlueCoin sensor data callbacks (accelerometer, gyroscope, quaternions)
+# and per-device listeners (fused features, combined IMU packet) that hand complete triplets to the synchronizer
+# build_feature_listeners picks the features of a node and their listeners (SensorManager, ingest processes)
+# Every notification is also counted in the loss accounting of its device/feature stream (link_stats.py)
 #
 # Author: Francesco Urru
 # Github: https://github.com/frarvo
@@ -7,9 +10,15 @@
 # License: MIT
 
 from blue_st_sdk.feature import FeatureListener
+from blue_st_sdk.features.feature_accelerometer import FeatureAccelerometer
+from blue_st_sdk.features.feature_gyroscope import FeatureGyroscope
+from sensors.feature_mems_sensor_fusion_compact import FeatureMemsSensorFusionCompact
+from sensors.feature_imu_packet import FeatureImuPacket
+from sensors.fast_decode import install_fast_path, install_packet_fast_path
 from utils.logger import log_system
+from sensors.link_stats import get_stream
 import time
-from typing import Sequence, Optional, Tuple
+from typing import List, Sequence, Optional, Tuple
 
 
 def _to_floats(data: Sequence, n:int) -> Optional[Tuple[float, ...]]:
@@ -34,13 +43,17 @@ class AccelerometerFeatureListener(FeatureListener):
         super().__init__()
         self.device_id = device_id
         self.sync = synchronizer
+        self.link = get_stream(device_id, "acc")
 
     def on_update(self, feature, sample):
         try:
             values = _to_floats(sample.get_data(), 3)
             if not values:
                 return
-            self.sync.update(self.device_id, "acc", values, ts=time.monotonic())
+            dev_ts = sample.get_timestamp()
+            if self.link is not None and dev_ts is not None:
+                self.link.observe_ts(dev_ts)
+            self.sync.update(self.device_id, "acc", values, ts=time.monotonic(), dev_ts=dev_ts)
         except Exception as e:
             log_system(f"[Accelerometer Listener: {self.device_id}] {type(e).__name__}: {e}", level="ERROR")
 
@@ -55,13 +68,17 @@ class GyroscopeFeatureListener(FeatureListener):
         super().__init__()
         self.device_id = device_id
         self.sync = synchronizer
+        self.link = get_stream(device_id, "gyr")
 
     def on_update(self, feature, sample):
         try:
             values = _to_floats(sample.get_data(), 3)
             if not values:
                 return
-            self.sync.update(self.device_id, "gyr", values, ts=time.monotonic())
+            dev_ts = sample.get_timestamp()
+            if self.link is not None and dev_ts is not None:
+                self.link.observe_ts(dev_ts)
+            self.sync.update(self.device_id, "gyr", values, ts=time.monotonic(), dev_ts=dev_ts)
         except Exception as e:
             log_system(f"[Gyroscope Listener: {self.device_id}] {type(e).__name__}: {e}", level="ERROR")
 
@@ -76,12 +93,172 @@ class QuaternionFeatureListener(FeatureListener):
         super().__init__()
         self.device_id = device_id
         self.sync = synchronizer
+        self.link = get_stream(device_id, "quat")
 
     def on_update(self, feature, sample):
         try:
             values = _to_floats(sample.get_data(), 4)
             if not values:
                 return
-            self.sync.update(self.device_id, "quat", values, ts=time.monotonic())
+            dev_ts = sample.get_timestamp()
+            if self.link is not None and dev_ts is not None:
+                self.link.observe_ts(dev_ts)
+            self.sync.update(self.device_id, "quat", values, ts=time.monotonic(), dev_ts=dev_ts)
         except Exception as e:
             log_system(f"[Quaternions Listener: {self.device_id}] {type(e).__name__}: {e}", level="ERROR")
+
+
+class FusedFeatureListener(FeatureListener):
+    """
+    Single listener for the accelerometer, gyroscope and quaternion features of one BlueCoin.
+    Collects the latest sample of each kind locally and pushes the complete triplet to the synchronizer
+    with one update_triplet call (one lock acquisition and one emit check instead of three).
+    kinds maps each feature object to "acc", "gyr" or "quat".
+    All notifications of a node are delivered on its BlueCoin thread, so the local triplet needs no lock.
+    """
+
+    _DIMS = {"acc": 3, "gyr": 3, "quat": 4}
+
+    def __init__(self, device_id: str, synchronizer, kinds: dict):
+        super().__init__()
+        self.device_id = device_id
+        self.sync = synchronizer
+        self._kinds = dict(kinds)
+        self._pending = {}
+        self._dev_ts = None
+        self._links = {kind: get_stream(device_id, kind) for kind in set(self._kinds.values())}
+
+    def on_update(self, feature, sample):
+        try:
+            kind = self._kinds.get(feature)
+            if kind is None:
+                return
+            values = _to_floats(sample.get_data(), self._DIMS[kind])
+            if not values:
+                return
+            self.push(kind, values, sample.get_timestamp())
+        except Exception as e:
+            log_system(f"[Fused Listener: {self.device_id}] {type(e).__name__}: {e}", level="ERROR")
+
+    def push(self, kind: str, values, dev_ts=None) -> None:
+        """
+        Decoded sample of one kind, from on_update or straight from the fast decode path (sensors/fast_decode.py).
+        dev_ts: device timestamp of the notification; the triplet carries the newest one.
+        """
+        pending = self._pending
+        pending[kind] = values
+        link = self._links.get(kind)
+        if link is not None and dev_ts is not None:
+            link.observe_ts(dev_ts)
+        if dev_ts is not None and (self._dev_ts is None or dev_ts > self._dev_ts):
+            self._dev_ts = dev_ts
+        if len(pending) == 3:
+            dev_ts, self._dev_ts = self._dev_ts, None
+            self._pending = {}
+            try:
+                self.sync.update_triplet(self.device_id, pending["acc"], pending["gyr"], pending["quat"],
+                                         ts=time.monotonic(), dev_ts=dev_ts)
+            except Exception as e:
+                log_system(f"[Fused Listener: {self.device_id}] {type(e).__name__}: {e}", level="ERROR")
+
+
+class ImuPacketFeatureListener(FeatureListener):
+    """
+    Listener for the combined IMU packet feature (sensors/feature_imu_packet.py) of one BlueCoin.
+    Every notification already carries the complete acc/gyr/quat set, pushed with one update_triplet call.
+    Keeps the last sequence counter received (None if the firmware does not send it), loss accounting
+    (sensors/link_stats.py) uses it when present and the device timestamp otherwise.
+    """
+
+    def __init__(self, device_id: str, synchronizer):
+        super().__init__()
+        self.device_id = device_id
+        self.sync = synchronizer
+        self.last_seq = None
+        self.link = get_stream(device_id, "imu")
+
+    def on_update(self, feature, sample):
+        try:
+            values = _to_floats(sample.get_data(), 11)
+            if not values:
+                return
+            seq = int(values[10])
+            self.push_packet(values[0:3], values[3:6], values[6:10], None if seq < 0 else seq, sample.get_timestamp())
+        except Exception as e:
+            log_system(f"[IMU Packet Listener: {self.device_id}] {type(e).__name__}: {e}", level="ERROR")
+
+    def push_packet(self, acc, gyr, quat, seq, dev_ts=None) -> None:
+        """Decoded packet, from on_update or straight from the fast decode path."""
+        self.last_seq = seq
+        link = self.link
+        if link is not None:
+            if seq is not None:
+                link.observe_seq(seq)
+            elif dev_ts is not None:
+                link.observe_ts(dev_ts)
+        try:
+            self.sync.update_triplet(self.device_id, acc, gyr, quat, ts=time.monotonic(), dev_ts=dev_ts)
+        except Exception as e:
+            log_system(f"[IMU Packet Listener: {self.device_id}] {type(e).__name__}: {e}", level="ERROR")
+
+
+def build_feature_listeners(node, device_id: str, name: str, synchronizer, imu_packet: bool = True,
+                            fused: bool = True, fast_decode: bool = True) -> Tuple[List, List]:
+    """
+    Features of a BlueCoin node and their listeners feeding synchronizer, in BlueCoinThread order:
+        - the combined acc+gyr+quat packet when imu_packet is on and the firmware advertises it
+        - otherwise acc/gyr/quat with one fused listener (fused) or one listener each
+    fast_decode installs the struct decoders of sensors/fast_decode.py. ([], []) when the node has no feature.
+    """
+    # Combined acc+gyr+quat packet when the firmware advertises it, otherwise the three features below
+    feat_imu = None
+    if imu_packet:
+        try:
+            feat_imu = node.get_feature(FeatureImuPacket)
+        except Exception as e:
+            log_system(f"[SensorManager] Error retrieving IMU packet for '{name}': {e}", level="WARNING")
+    if feat_imu:
+        listener = ImuPacketFeatureListener(device_id=device_id, synchronizer=synchronizer)
+        if fast_decode:
+            install_packet_fast_path(feat_imu, listener)
+        return [feat_imu], [listener]
+
+    # Attempt to retrieve feature from node
+    try:
+        feat_acc = node.get_feature(FeatureAccelerometer)
+        feat_gyr = node.get_feature(FeatureGyroscope)
+        feat_quat = node.get_feature(FeatureMemsSensorFusionCompact)
+    except Exception as e:
+        log_system(f"[SensorManager] Error retrieving features for '{name}': {e}", level="ERROR")
+        return [], []
+
+    if fused and feat_acc and feat_gyr and feat_quat:
+        # One listener for the three features, complete triplets go to the synchronizer in one call
+        features = [feat_acc, feat_gyr, feat_quat]
+        listener = FusedFeatureListener(device_id=device_id, synchronizer=synchronizer,
+                                        kinds={feat_acc: "acc", feat_gyr: "gyr", feat_quat: "quat"})
+        if fast_decode:
+            # Payloads decoded with precompiled structs straight into the listener (no SDK samples)
+            for feat, kind in ((feat_acc, "acc"), (feat_gyr, "gyr"), (feat_quat, "quat")):
+                install_fast_path(feat, kind, listener)
+        return features, [listener] * len(features)
+
+    features, listeners = [], []
+    if feat_acc:
+        features.append(feat_acc)
+        listeners.append(AccelerometerFeatureListener(device_id=device_id, synchronizer=synchronizer))
+    else:
+        log_system(f"[SensorManager] {name} is missing Accelerometer", level="WARNING")
+
+    if feat_gyr:
+        features.append(feat_gyr)
+        listeners.append(GyroscopeFeatureListener(device_id=device_id, synchronizer=synchronizer))
+    else:
+        log_system(f"[SensorManager] {name} is missing Gyroscope", level="WARNING")
+
+    if feat_quat:
+        features.append(feat_quat)
+        listeners.append(QuaternionFeatureListener(device_id=device_id, synchronizer=synchronizer))
+    else:
+        log_system(f"[SensorManager] {name} is missing Quaternions", level="WARNING")
+    return features, listeners
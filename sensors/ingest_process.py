@@ -0,0 +1,446 @@
+# sensors/ingest_process.py
+# Process-isolated BlueCoin ingestion over shared-memory rings (ingest section of config.yaml, mode "process")
+#
+# In the default layout the BLE listeners run in the main process, next to synchronization, feature extraction,
+# classification, logging and actuation: anything holding the GIL there (log formatting, actuator subprocess
+# calls, a long window) delays the notifications of both wrists. With mode "process" every BlueCoin is read by
+# its own process (same BlueCoinThread, listeners, fast decode, notification loop and reconnection as in the
+# main process) whose listeners write fixed-size records into a multiprocessing.shared_memory ring instead of
+# calling the synchronizer. IngestSupervisor, in the main process, sweeps the rings every poll_interval_ms and
+# hands the records, in order, to the synchronizer of the subject (or the recording tap), so alignment,
+# windows and everything after them are unchanged.
+# Ring (one writer, the ingest process; one reader, the supervisor):
+#   header   int64[8]: write sequence, heartbeat (monotonic ns), pid, connected, stop request
+#   records  float64[ring_records, 16]: stamp (sequence + 1, written last), kind, arrival ts, device ts (nan: none),
+#            values (acc 3, gyr 3, quat 4 for a triplet, the first 3/4 for a single kind)
+#   Records are published by advancing the write sequence after the record. Each record is a seqlock: the writer
+#   clears the stamp, writes the fields, then sets the stamp; the reader copies what is new, then reads the stamps
+#   again and keeps only the records whose stamp was the expected one both before and after the copy, so a
+#   record the writer was rewriting meanwhile is dropped (reader more than ring_records behind: counted as lost).
+#   There are no explicit memory barriers in Python: the stamp re-read is what rejects torn records.
+# Arrival times are time.monotonic() of the ingest process: CLOCK_MONOTONIC is system-wide, same timeline.
+# Heartbeats: each process beats every heartbeat_s from its main thread; a process that exits or stays silent for
+# heartbeat_timeout_s is killed and started again (restart_initial_s doubling up to restart_max_s). The ring and
+# its sequence survive the restart. Ingest processes connect and reconnect on their own; reconnections still
+# take the radio lock, shared across processes (utils/lock.py FileRadioLock). The device registry is only written
+# by the main process (connections are marked seen when a process reports connected).
+#
+# Author: Francesco Urru
+# GitHub: https://github.com/frarvo
+# Repository: https://github.com/frarvo/STOPme
+# License: MIT
+
+import math
+import multiprocessing as mp
+import os
+import signal
+import threading
+import time
+from multiprocessing import shared_memory
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+from utils.config import (
+    CONFIG, get_imu_packet_config, get_ingest_config, get_reconnect_config, get_startup_config, get_sync_config
+)
+from utils.device_registry import mark_seen
+from utils.lock import use_process_radio_lock
+from utils.logger import log_system, shutdown_logging
+from utils.reconnect import Backoff, CONNECTED
+
+# Header fields
+_SEQ, _HEARTBEAT, _PID, _CONNECTED, _STOP = range(5)
+_HEADER_FIELDS = 8
+_HEADER_BYTES = _HEADER_FIELDS * 8
+
+# Record fields
+RECORD_FIELDS = 16
+_STAMP, _KIND, _TS, _DEV_TS, _VALUES = 0, 1, 2, 3, 4
+KIND_TRIPLET, KIND_ACC, KIND_GYR, KIND_QUAT = 0, 1, 2, 3
+_KIND_CODES = {"acc": KIND_ACC, "gyr": KIND_GYR, "quat": KIND_QUAT}
+_KIND_NAMES = {KIND_ACC: ("acc", 3), KIND_GYR: ("gyr", 3), KIND_QUAT: ("quat", 4)}
+
+
+class ShmRing:
+    """
+    Shared-memory ring of fixed-size sample records. create() in the main process, attach() by name in the
+    ingest process.
+    """
+
+    def __init__(self, shm: shared_memory.SharedMemory, capacity: int, owner: bool):
+        self.shm = shm
+        self.name = shm.name
+        self.capacity = capacity
+        self.owner = owner
+        self.header = np.ndarray((_HEADER_FIELDS,), dtype=np.int64, buffer=shm.buf)
+        self.records = np.ndarray((capacity, RECORD_FIELDS), dtype=np.float64, buffer=shm.buf, offset=_HEADER_BYTES)
+        self._lock = threading.Lock()   # writer side: listeners of one node can run on two threads
+        self.read_seq = 0               # reader side
+        self.lost = 0
+
+    @classmethod
+    def create(cls, capacity: int) -> "ShmRing":
+        size = _HEADER_BYTES + capacity * RECORD_FIELDS * 8
+        ring = cls(shared_memory.SharedMemory(create=True, size=size), capacity, owner=True)
+        ring.header[:] = 0
+        ring.records[:, _STAMP] = 0.0
+        return ring
+
+    @classmethod
+    def attach(cls, name: str, capacity: int) -> "ShmRing":
+        return cls(shared_memory.SharedMemory(name=name), capacity, owner=False)
+
+    # Writer
+    def write(self, kind: int, ts: float, dev_ts, values) -> None:
+        with self._lock:
+            seq = int(self.header[_SEQ])
+            row = self.records[seq % self.capacity]
+            row[_STAMP] = 0.0       # invalid while the fields change (seqlock, see read())
+            row[_KIND] = kind
+            row[_TS] = ts
+            row[_DEV_TS] = math.nan if dev_ts is None else dev_ts
+            row[_VALUES:_VALUES + len(values)] = values
+            row[_STAMP] = seq + 1
+            self.header[_SEQ] = seq + 1
+
+    # Reader
+    def read(self) -> Optional[np.ndarray]:
+        """
+        Copy of the records written since the last read, oldest first, None when there is none.
+        A record is kept only if its stamp is the expected one in the copy and again after the copy: the writer
+        clears the stamp before changing a record, so a record it rewrote during the copy fails one of the two.
+        """
+        write_seq = int(self.header[_SEQ])
+        start = self.read_seq
+        if write_seq <= start:
+            return None
+        if write_seq - start > self.capacity:
+            self.lost += write_seq - start - self.capacity
+            start = write_seq - self.capacity
+        idx = np.arange(start, write_seq) % self.capacity
+        block = self.records[idx]
+        stamps = self.records[idx, _STAMP]      # re-read after the copy
+        expected = np.arange(start + 1, write_seq + 1, dtype=np.float64)
+        valid = (block[:, _STAMP] == expected) & (stamps == expected)
+        if not valid.all():
+            self.lost += int((~valid).sum())
+            block = block[valid]
+        self.read_seq = write_seq
+        return block if len(block) else None
+
+    def close(self) -> None:
+        # Views first, the mapping can't be closed while numpy still exports it
+        self.header = self.records = None
+        try:
+            self.shm.close()
+            if self.owner:
+                self.shm.unlink()
+        except Exception:
+            pass
+
+
+class RingSink:
+    """
+    Stands in for the synchronizer in the listeners of an ingest process: every update becomes a ring record.
+    """
+
+    def __init__(self, ring: ShmRing):
+        self.ring = ring
+
+    def update(self, device_id: str, kind: str, values, ts: float, dev_ts=None) -> None:
+        code = _KIND_CODES.get(kind)
+        if code is not None:
+            self.ring.write(code, ts, dev_ts, values)
+
+    def update_triplet(self, device_id: str, acc, gyr, quat, ts: float, dev_ts=None) -> None:
+        self.ring.write(KIND_TRIPLET, ts, dev_ts, (*acc, *gyr, *quat))
+
+
+def _ingest_main(device_id: str, name: str, address: str, entry: dict, ring_name: str, capacity: int,
+                 radio: Optional[str]) -> None:
+    """
+    Ingest process: connects one BlueCoin and streams it into the ring until the stop request (or the
+    main process goes away).
+    """
+    # Ctrl+C reaches the whole process group: the main process decides when ingestion stops
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda signum, frame: stop.set())
+
+    cfg = get_ingest_config()
+    ring = ShmRing.attach(ring_name, capacity)
+    header = ring.header
+    parent = os.getppid()
+    header[_PID] = os.getpid()
+    header[_CONNECTED] = 0
+    header[_HEARTBEAT] = time.monotonic_ns()
+
+    # Registry file only written by the main process (a stale copy saved from here would drop its updates)
+    CONFIG.setdefault("device_registry", {})["enable"] = False
+    if radio:
+        use_process_radio_lock(radio)
+
+    # BLE stack only in the ingest processes (imported after the first heartbeat, slow on the Raspberry)
+    from sensors.bluecoin import BlueCoinThread, known_bluecoin_nodes
+    from sensors.feature_imu_packet import register_imu_packet_feature
+    from sensors.feature_listeners import build_feature_listeners
+    from sensors.link_stats import LinkStatsReporter, log_link_stats
+    from sensors.notification_loop import stop_notification_loop
+    from utils.reconnect import log_reconnect_stats
+
+    header[_HEARTBEAT] = time.monotonic_ns()
+    tag = f"[Ingest: {device_id}]"
+    thread = None
+    reporter = None
+    try:
+        imu_packet = get_imu_packet_config()["enable"]
+        if imu_packet:
+            register_imu_packet_feature()
+        nodes = known_bluecoin_nodes({address: entry}, [name])
+        if not nodes:
+            log_system(f"{tag} Can't build node {name} ({address})", level="ERROR")
+            return
+        sync_cfg = get_sync_config()
+        features, listeners = build_feature_listeners(nodes[0], device_id, name, RingSink(ring), imu_packet,
+                                                      sync_cfg["fused_listener"], sync_cfg["fast_decode"])
+        if not features:
+            log_system(f"{tag} No features available on node {name}", level="ERROR")
+            return
+        thread = BlueCoinThread(node=nodes[0], feature=features, feature_listener=listeners, device_id=device_id)
+        thread.start()
+        reporter = LinkStatsReporter()
+        reporter.start()
+        log_system(f"{tag} Process {os.getpid()} started for {name} ({address}), {len(features)} features")
+
+        while not stop.is_set() and not header[_STOP]:
+            header[_HEARTBEAT] = time.monotonic_ns()
+            header[_CONNECTED] = int(thread.connected_event.is_set() and thread.reconnector.state == CONNECTED)
+            if os.getppid() != parent or not thread.is_alive():
+                break
+            stop.wait(cfg["heartbeat_s"])
+    finally:
+        header[_CONNECTED] = 0
+        if thread is not None:
+            thread.stop()
+        stop_notification_loop()
+        if reporter is not None:
+            reporter.stop()
+        log_link_stats()
+        log_reconnect_stats()
+        log_system(f"{tag} Process {os.getpid()} exiting")
+        del header
+        ring.close()
+        # multiprocessing ends the process with os._exit: no atexit, flush the log writer here
+        shutdown_logging()
+
+
+class IngestProcess:
+    """
+    Main-process side of one ingest process: its ring, the process, restarts. Takes the place of the
+    BlueCoinThread in SensorManager.threads (device_id, connected_event, stop()).
+    """
+
+    def __init__(self, device_id: str, name: str, address: str, entry: dict, sink, cfg: dict,
+                 radio: Optional[str], target: Optional[Callable] = None):
+        self.device_id = device_id
+        self.name = name
+        self.address = address
+        self.entry = entry
+        self.sink = sink
+        self.cfg = cfg
+        self.radio = radio
+        self.target = target or _ingest_main    # same signature as _ingest_main (benchmarks use a simulated one)
+        self.ring = ShmRing.create(cfg["ring_records"])
+        self.connected_event = threading.Event()    # set once the first connection succeeded
+        self.connected = False
+        self.process: Optional[mp.process.BaseProcess] = None
+        self.restarts = 0
+        self.records = 0
+        self._failures = 0          # restarts since the process last reported connected
+        self._restart_at: Optional[float] = None
+        self._stopped = False
+        rc = get_reconnect_config()
+        self._backoff = Backoff(cfg["restart_initial_s"], cfg["restart_max_s"], rc["backoff_factor"], rc["jitter"])
+        self._ctx = mp.get_context("spawn")     # no fork of a process running BLE and worker threads
+        self._tag = f"[Ingest: {device_id}]"
+
+    def start(self) -> None:
+        header = self.ring.header
+        header[_STOP] = 0
+        header[_CONNECTED] = 0
+        header[_HEARTBEAT] = time.monotonic_ns()
+        self.process = self._ctx.Process(
+            target=self.target, name=f"Ingest-{self.device_id}", daemon=True,
+            args=(self.device_id, self.name, self.address, self.entry, self.ring.name, self.ring.capacity,
+                  self.radio))
+        self.process.start()
+        log_system(f"{self._tag} Started process {self.process.pid} for {self.name}")
+
+    def poll(self) -> int:
+        """
+        Hands the new records to the sink, returns how many.
+        """
+        block = self.ring.read()
+        if block is None:
+            return 0
+        sink = self.sink
+        dev_id = self.device_id
+        for row in block.tolist():
+            dev_ts = None if row[_DEV_TS] != row[_DEV_TS] else row[_DEV_TS]
+            kind = int(row[_KIND])
+            try:
+                if kind == KIND_TRIPLET:
+                    sink.update_triplet(dev_id, row[4:7], row[7:10], row[10:14], row[_TS], dev_ts)
+                else:
+                    kind_name, n = _KIND_NAMES[kind]
+                    sink.update(dev_id, kind_name, row[4:4 + n], row[_TS], dev_ts)
+            except Exception as e:
+                log_system(f"{self._tag} Sink error: {type(e).__name__}: {e}", level="ERROR")
+        self.records += len(block)
+        return len(block)
+
+    def check(self) -> None:
+        """
+        Connection state from the ring header; restart of a process that exited or stopped beating.
+        """
+        if self._stopped:
+            return
+        now = time.monotonic()
+        header = self.ring.header
+        connected = bool(header[_CONNECTED])
+        if connected != self.connected:
+            self.connected = connected
+            if connected:
+                self._failures = 0
+                self.connected_event.set()
+                mark_seen("bluecoin", self.address)
+                log_system(f"{self._tag} Streaming from process {int(header[_PID])}")
+
+        if self._restart_at is not None:
+            if now >= self._restart_at:
+                self._restart_at = None
+                self.restarts += 1
+                self.start()
+            return
+
+        alive = self.process is not None and self.process.is_alive()
+        silent_s = (time.monotonic_ns() - int(header[_HEARTBEAT])) / 1e9
+        if alive and silent_s <= self.cfg["heartbeat_timeout_s"]:
+            return
+        reason = f"no heartbeat for {silent_s:.1f}s" if alive else f"exit code {self.process.exitcode}"
+        self._terminate(grace_s=0.0)
+        self.connected = False
+        header[_CONNECTED] = 0
+        self._failures += 1
+        delay = self._backoff.delay(self._failures)
+        self._restart_at = now + delay
+        log_system(f"{self._tag} Ingest process lost ({reason}), restart in {delay:.1f}s", level="WARNING")
+
+    def stop(self) -> None:
+        if self._stopped:
+            return
+        self._stopped = True
+        self.ring.header[_STOP] = 1
+        self._terminate(grace_s=self.cfg["heartbeat_timeout_s"])
+        log_system(f"{self._tag} Stopped: {self.get_stats()}")
+
+    def _terminate(self, grace_s: float) -> None:
+        process = self.process
+        if process is None:
+            return
+        process.join(grace_s)
+        if process.is_alive():
+            process.terminate()
+            process.join(1.0)
+        if process.is_alive():
+            process.kill()
+            process.join(1.0)
+
+    def close(self) -> None:
+        self.ring.close()
+
+    def get_stats(self) -> Dict[str, object]:
+        return {
+            "pid": self.process.pid if self.process is not None else None,
+            "connected": self.connected,
+            "records": self.records,
+            "lost": self.ring.lost if self.ring.header is not None else None,
+            "restarts": self.restarts,
+        }
+
+
+class IngestSupervisor(threading.Thread):
+    """
+    Main-process thread reading the rings of every ingest process and supervising the processes.
+        add(device_id, name, address, entry, sink): starts the ingest process of one BlueCoin
+                                                    (entry: device registry entry of the node)
+        remove(proc): stops one ingest process (node replaced by a rescan)
+    """
+
+    def __init__(self, cfg: Optional[dict] = None):
+        super().__init__(daemon=True, name="IngestSupervisor")
+        self.cfg = cfg or get_ingest_config()
+        self.radio = get_startup_config()["radios"].get("bluecoin")
+        if self.radio:
+            # Reconnections in the ingest processes and scans here exclude each other on the adapter
+            use_process_radio_lock(self.radio)
+        self.processes: List[IngestProcess] = []
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+
+    def add(self, device_id: str, name: str, address: str, entry: dict, sink,
+            target: Optional[Callable] = None) -> IngestProcess:
+        proc = IngestProcess(device_id, name, address, entry, sink, self.cfg, self.radio, target)
+        proc.start()
+        with self._lock:
+            self.processes.append(proc)
+        if not self.is_alive() and not self._stop_event.is_set():
+            self.start()
+        return proc
+
+    def remove(self, proc: IngestProcess) -> None:
+        with self._lock:
+            if proc not in self.processes:
+                return
+            self.processes.remove(proc)
+        proc.stop()
+        proc.poll()
+        proc.close()
+
+    def run(self) -> None:
+        interval = self.cfg["poll_interval_ms"] / 1000.0
+        heartbeat = self.cfg["heartbeat_s"]
+        next_check = time.monotonic() + heartbeat
+        log_system(f"[IngestSupervisor] Started: poll={self.cfg['poll_interval_ms']:g}ms "
+                   f"ring={self.cfg['ring_records']} records")
+        while not self._stop_event.wait(interval):
+            with self._lock:
+                processes = list(self.processes)
+            for proc in processes:
+                proc.poll()
+            if time.monotonic() >= next_check:
+                next_check = time.monotonic() + heartbeat
+                for proc in processes:
+                    try:
+                        proc.check()
+                    except Exception as e:
+                        log_system(f"[IngestSupervisor] {proc.device_id}: {type(e).__name__}: {e}", level="ERROR")
+
+    def stop(self) -> None:
+        with self._lock:
+            processes = list(self.processes)
+        for proc in processes:
+            proc.stop()
+        self._stop_event.set()
+        if self.is_alive():
+            self.join()
+        for proc in processes:
+            # Last records written before the processes exited
+            proc.poll()
+            proc.close()
+        log_system("[IngestSupervisor] Stopped.")
+
+    def get_stats(self) -> Dict[str, Dict[str, object]]:
+        with self._lock:
+            return {p.device_id: p.get_stats() for p in self.processes}
@@ -0,0 +1,285 @@
+# sensors/link_stats.py
+# Packet loss accounting per device and per feature stream (link_stats section of config.yaml)
+#
+# The synchronizer only knows how many triplets it dropped. The listeners also hand every notification to a
+# StreamStats of its (device, kind) stream, which tells what happened on the link before that:
+#   seq  (firmware counter of the combined IMU packet, uint16): exact, step 1 modulo 65536
+#   ts   (SDK sample timestamp, device ticks unwrapped by the node): the sampling grid (step and phase, in
+#        ticks) is learned from the stream; a notification n grid steps after the previous one means n - 1
+#        notifications were lost. Exact down to about 1.5 ticks per sample, with coarser ticks a few tick
+#        boundary crossings can be miscounted.
+# Every notification is classified as in order, gap (lost notifications before it), reorder (older than the
+# last one, the loss counted for it is taken back) or duplicate (same counter/timestamp again).
+# Jumps longer than max_gap_steps (device reset on reconnection, long outage) restart the stream (resyncs)
+# instead of counting as loss. Duplicates are not counted as received.
+# Totals are plain counters, rates are kept in a fixed ring of one-second buckets over the last window_s.
+# Each stream is written only by the BLE thread of its node, readers take a snapshot without locking.
+# get_link_stats() reads them at runtime, LinkStatsReporter logs a summary every log_interval_s,
+# log_link_stats() on demand (SIGUSR1 in main.py) and at shutdown.
+#
+# Author: Francesco Urru
+# GitHub: https://github.com/frarvo
+# Repository: https://github.com/frarvo/STOPme
+# License: MIT
+
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+from utils.config import get_link_stats_config
+from utils.logger import log_system
+
+_SEQ_MOD = 1 << 16
+_SEQ_HALF = 1 << 15
+_STEP_INIT = 16         # deltas looked at before the nominal timestamp step is trusted
+_ROUND = 0.4            # half-way steps (tick boundary crossings) are not counted as loss
+_DRIFT = 2e-4           # sampling vs tick clock drift allowed for in the timestamp grid
+
+_cfg = get_link_stats_config()
+enabled = _cfg["enable"]
+
+
+class StreamStats:
+    """
+    Loss counters of one (device, kind) notification stream.
+        observe_seq(seq): notification with a firmware sequence counter (uint16)
+        observe_ts(dev_ts): notification with the SDK sample timestamp only
+    """
+    __slots__ = ("device_id", "kind", "source", "received", "lost", "gaps", "reorders", "duplicates", "resyncs",
+                 "_last", "_anchor", "_lo", "_hi", "_k", "_step", "_init", "_max_gap", "_window", "_buckets", "_bucket_sec")
+
+    def __init__(self, device_id: str, kind: str, window_s: int = 60, max_gap_steps: int = 500):
+        self.device_id = device_id
+        self.kind = kind
+        self.source = None              # "seq" or "ts", set by the first notification
+        self.received = 0
+        self.lost = 0
+        self.gaps = 0
+        self.reorders = 0
+        self.duplicates = 0
+        self.resyncs = 0
+        self._last = None
+        self._anchor = 0
+        self._lo = self._hi = 0.0       # interval holding the true time of the last timestamp in order
+        self._k = 0                     # grid steps since the anchor timestamp
+        self._step = 0.0
+        self._init = []                 # first positive timestamp deltas
+        self._max_gap = max(2, int(max_gap_steps))
+        self._window = max(1, int(window_s))
+        self._buckets = [[0, 0] for _ in range(self._window)]       # [received, lost] per second
+        self._bucket_sec = [-1] * self._window
+
+    def _bucket(self):
+        sec = int(time.monotonic())
+        i = sec % self._window
+        if self._bucket_sec[i] != sec:
+            self._bucket_sec[i] = sec
+            b = self._buckets[i]
+            b[0] = b[1] = 0
+        return self._buckets[i]
+
+    def _account(self, lost: int) -> None:
+        b = self._bucket()
+        b[0] += 1
+        self.received += 1
+        if lost > 0:
+            b[1] += lost
+            self.lost += lost
+            self.gaps += 1
+        elif lost < 0:
+            # Late notification that was counted as lost
+            if self.lost > 0:
+                self.lost -= 1
+                if b[1] > 0:
+                    b[1] -= 1
+            self.reorders += 1
+
+    def observe_seq(self, seq: int) -> None:
+        self.source = "seq"
+        last = self._last
+        if last is None:
+            self._last = seq
+            self._account(0)
+            return
+        delta = (seq - last) % _SEQ_MOD
+        if delta == 0:
+            self.duplicates += 1
+        elif delta < _SEQ_HALF:
+            if delta > self._max_gap:
+                self.resyncs += 1
+                self._account(0)
+            else:
+                self._account(delta - 1)
+            self._last = seq
+        elif _SEQ_MOD - delta <= self._max_gap:
+            self._account(-1)
+        else:
+            self.resyncs += 1
+            self._last = seq
+            self._account(0)
+
+    def observe_ts(self, dev_ts) -> None:
+        self.source = "ts"
+        last = self._last
+        if last is None:
+            self._last = self._anchor = dev_ts
+            self._lo, self._hi = dev_ts, dev_ts + 1
+            self._account(0)
+            return
+        step = self._step
+        if not step:
+            # Nominal step from the first deltas, losses are counted once it is known
+            delta = dev_ts - last
+            if delta == 0:
+                self.duplicates += 1
+                return
+            if delta > 0:
+                self._init.append(delta)
+                self._last = dev_ts
+                self._lo, self._hi = dev_ts, dev_ts + 1
+                if len(self._init) >= _STEP_INIT:
+                    mean = sum(self._init) / len(self._init)
+                    near = [d for d in self._init if d < 1.5 * mean]
+                    self._step = sum(near) / len(near)
+                    self._k = sum(max(1, int(d / self._step + 0.5)) for d in self._init)
+                    self._init = []
+            self._account(0)
+            return
+
+        # Position on the sampling grid. Ticks are truncated: the true time of the last sample in order lies in
+        # [lo, hi), narrowed by every sample in order, so steps of a couple of ticks are still resolved
+        err = dev_ts + 0.5 - (self._lo + self._hi) * 0.5
+        n = int(err / step + _ROUND) if err >= 0 else -int(-err / step + 0.5)
+        if n > self._max_gap or -n > self._max_gap:
+            self.resyncs += 1
+            self._last = self._anchor = dev_ts
+            self._lo, self._hi = dev_ts, dev_ts + 1
+            self._k = 0
+            self._account(0)
+            return
+        if n == 0:
+            self.duplicates += 1
+            return
+        if n < 0:
+            self._account(-1)
+            return
+        # Widened by the step uncertainty (estimate error, drift between sampling and tick clocks)
+        margin = n * (1.0 / (self._k + n) + _DRIFT * step)
+        lo = max(self._lo + n * step - margin, dev_ts)
+        hi = min(self._hi + n * step + margin, dev_ts + 1)
+        if lo >= hi:
+            # Step estimate and ticks disagree (drift), restart from this tick
+            lo, hi = dev_ts, dev_ts + 1
+        self._lo, self._hi = lo, hi
+        # Step over the whole stream since the last resync (error below one tick / samples)
+        self._k += n
+        if self._k >= _STEP_INIT:
+            self._step = (dev_ts - self._anchor) / self._k
+        self._last = dev_ts
+        self._account(n - 1)
+
+    def get_stats(self) -> Dict[str, float]:
+        """Totals and rates over the last window_s seconds (loss_rate = lost / (received + lost))."""
+        now = int(time.monotonic())
+        rx = lost = 0
+        for sec, (r, l) in zip(list(self._bucket_sec), [list(b) for b in self._buckets]):
+            if now - self._window < sec <= now:
+                rx += r
+                lost += l
+        total = self.received + self.lost
+        return {
+            "source": self.source,
+            "received": self.received,
+            "lost": self.lost,
+            "gaps": self.gaps,
+            "reorders": self.reorders,
+            "duplicates": self.duplicates,
+            "resyncs": self.resyncs,
+            "loss_rate": self.lost / total if total else 0.0,
+            "window_received": rx,
+            "window_lost": lost,
+            "window_rate_hz": rx / self._window,
+            "window_loss_rate": lost / (rx + lost) if rx + lost else 0.0,
+        }
+
+
+_lock = threading.Lock()
+_streams: Dict[Tuple[str, str], StreamStats] = {}
+
+
+def get_stream(device_id: str, kind: str) -> Optional[StreamStats]:
+    """
+    Stats of the (device, kind) stream, created on first use. None when link_stats is disabled.
+    The same object is returned for a device/kind after a reconnection, counters keep going.
+    """
+    if not enabled:
+        return None
+    key = (device_id, kind)
+    with _lock:
+        stream = _streams.get(key)
+        if stream is None:
+            stream = _streams[key] = StreamStats(device_id, kind, _cfg["window_s"], _cfg["max_gap_steps"])
+        return stream
+
+
+def get_link_stats() -> Dict[str, Dict[str, Dict[str, float]]]:
+    """
+    Returns {device_id: {kind: {...}}} for every stream seen so far.
+    """
+    with _lock:
+        streams = list(_streams.values())
+    out: Dict[str, Dict[str, Dict[str, float]]] = {}
+    for s in streams:
+        out.setdefault(s.device_id, {})[s.kind] = s.get_stats()
+    return out
+
+
+def log_link_stats() -> None:
+    """
+    Write one line per stream to the system log.
+    """
+    stats = get_link_stats()
+    if not stats:
+        return
+    log_system(f"[LinkStats] Notification loss per stream (rates over the last {_cfg['window_s']}s):")
+    for device_id in sorted(stats):
+        for kind, s in sorted(stats[device_id].items()):
+            level = "WARNING" if s["window_loss_rate"] >= _cfg["warn_loss_rate"] else "INFO"
+            log_system(f"[LinkStats] {device_id:9s} {kind:5s} ({s['source']}) rx={s['received']} lost={s['lost']} "
+                       f"({s['loss_rate'] * 100.0:.2f}%) gaps={s['gaps']} reorders={s['reorders']} "
+                       f"dups={s['duplicates']} resyncs={s['resyncs']} | window {s['window_rate_hz']:.1f} Hz "
+                       f"loss={s['window_loss_rate'] * 100.0:.2f}%", level=level)
+
+
+def reset_link_stats() -> None:
+    with _lock:
+        _streams.clear()
+
+
+class LinkStatsReporter(threading.Thread):
+    """
+    Logs the link stats summary every log_interval_s (nothing when the interval is 0).
+    """
+
+    def __init__(self, interval_s: Optional[float] = None):
+        super().__init__(daemon=True, name="LinkStatsReporter")
+        self.interval_s = float(_cfg["log_interval_s"] if interval_s is None else interval_s)
+        self.stop_event = threading.Event()
+
+    def start(self) -> None:
+        if not enabled or self.interval_s <= 0:
+            return
+        log_system(f"[LinkStats] Reporting every {self.interval_s:g}s")
+        super().start()
+
+    def run(self) -> None:
+        while not self.stop_event.wait(self.interval_s):
+            try:
+                log_link_stats()
+            except Exception as e:
+                log_system(f"[LinkStats] {type(e).__name__}: {e}", level="ERROR")
+
+    def stop(self) -> None:
+        self.stop_event.set()
+        if self.is_alive() and threading.current_thread() is not self:
+            self.join()
@@ -0,0 +1,264 @@
+# sensors/notification_loop.py
+# Event-driven BLE notification dispatch for all BlueCoins from one I/O thread (ble_io section of config.yaml)
+#
+# Every BlueCoinThread used to loop on node.get_status() + node.wait_for_notifications(0.05): 20 wake-ups per
+# second per wrist even with nothing to read. bluepy talks to each connected node through a bluepy-helper
+# process and reads its notifications as text lines from the helper stdout pipe. NotificationLoop registers that
+# pipe of every connected node on one epoll (poll where epoll is missing) and calls wait_for_notifications only
+# when the pipe is readable, so the listeners run as soon as a notification line arrives and the process sleeps
+# otherwise. The helper also writes the disconnection status (and its pipe hangs up when it exits) on the same
+# pipe, so a disconnection wakes the loop too: the node is dropped from the loop and its thread is woken to run
+# the reconnection (utils/reconnect.py), then registers the node again.
+# Notes:
+#   - the SDK node lock is not a real lock: a registered node is only touched by the loop thread, BlueCoinThread
+#     unregisters it (and waits for the loop to let go) before enabling/disabling notifications or reconnecting
+#   - a line already read ahead into the pipe buffer is handled with the next readable event, as in bluepy's
+#     own wait (at most one notification behind, caught up level-triggered)
+#   - every housekeeping_s the loop also checks the status of its nodes (disconnections seen by other paths)
+#
+# Author: Francesco Urru
+# GitHub: https://github.com/frarvo
+# Repository: https://github.com/frarvo/STOPme
+# License: MIT
+
+import os
+import select
+import threading
+from typing import Callable, Dict, Optional
+
+from utils.config import get_ble_io_config
+from utils.logger import log_system
+
+_READ = getattr(select, "EPOLLIN", 0x001) | getattr(select, "EPOLLPRI", 0x002)
+_HANGUP = getattr(select, "EPOLLHUP", 0x010) | getattr(select, "EPOLLERR", 0x008)
+_DISPATCH_TIMEOUT_S = 0.001     # wait_for_notifications on a readable pipe (never 0: bluepy then blocks)
+
+
+class _Poller:
+    """epoll where available, poll otherwise, timeouts in seconds (None blocks)."""
+
+    def __init__(self):
+        if hasattr(select, "epoll"):
+            self._p = select.epoll()
+            self._scale = 1.0
+            self.kind = "epoll"
+        else:
+            self._p = select.poll()
+            self._scale = 1000.0
+            self.kind = "poll"
+
+    def register(self, fd: int) -> None:
+        self._p.register(fd, _READ)
+
+    def unregister(self, fd: int) -> None:
+        try:
+            self._p.unregister(fd)
+        except (KeyError, OSError, ValueError):
+            # Already closed by the helper teardown
+            pass
+
+    def poll(self, timeout_s: Optional[float]):
+        return self._p.poll(-1 if timeout_s is None else timeout_s * self._scale)
+
+    def close(self) -> None:
+        if self.kind == "epoll":
+            self._p.close()
+
+
+def helper_fd(node) -> Optional[int]:
+    """
+    File descriptor of the bluepy-helper stdout of a connected node, None when it has no helper running.
+    """
+    try:
+        helper = getattr(node, "_helper", None)
+        return None if helper is None else helper.stdout.fileno()
+    except Exception:
+        return None
+
+
+class _Entry:
+    __slots__ = ("node", "fd", "on_drop", "released")
+
+    def __init__(self, node, fd: int, on_drop: Callable[[], None]):
+        self.node = node
+        self.fd = fd
+        self.on_drop = on_drop
+        self.released = threading.Event()   # set once the loop no longer touches the node
+
+
+class NotificationLoop(threading.Thread):
+    """
+    One I/O thread dispatching the notifications of every registered node.
+        register(node, on_drop): False when the node has no helper pipe (the caller keeps polling);
+                                 on_drop() is called from the loop thread when the node disconnects
+                                 or the loop stops
+        unregister(node): returns once the loop no longer touches the node
+    """
+
+    def __init__(self, housekeeping_s: float = 1.0):
+        super().__init__(daemon=True, name="NotificationLoop")
+        self.housekeeping_s = max(0.05, float(housekeeping_s))
+        self._poller = _Poller()
+        self._wake_r, self._wake_w = os.pipe()
+        os.set_blocking(self._wake_r, False)
+        self._poller.register(self._wake_r)
+        self._lock = threading.Lock()
+        self._pending = []                          # ("add" | "remove", entry), applied by the loop thread
+        self._by_node: Dict[int, _Entry] = {}       # id(node) -> entry (registered or pending)
+        self._by_fd: Dict[int, _Entry] = {}
+        self._stop_event = threading.Event()
+        self.dispatched = 0
+        self.wakeups = 0
+
+    def register(self, node, on_drop: Callable[[], None]) -> bool:
+        fd = helper_fd(node)
+        if fd is None or self._stop_event.is_set():
+            return False
+        entry = _Entry(node, fd, on_drop)
+        with self._lock:
+            if id(node) in self._by_node:
+                return True
+            self._by_node[id(node)] = entry
+            self._pending.append(("add", entry))
+        self._wake()
+        return True
+
+    def unregister(self, node, timeout: float = 2.0) -> None:
+        with self._lock:
+            entry = self._by_node.get(id(node))
+            if entry is None:
+                return
+            self._pending.append(("remove", entry))
+        self._wake()
+        if threading.current_thread() is not self and self.is_alive():
+            entry.released.wait(timeout)
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        self._wake()
+        if self.is_alive() and threading.current_thread() is not self:
+            self.join()
+        log_system(f"[NotificationLoop] Stopped ({self.dispatched} dispatches, {self.wakeups} wake-ups)")
+
+    def _wake(self) -> None:
+        try:
+            os.write(self._wake_w, b"\0")
+        except OSError:
+            pass
+
+    def _apply_pending(self) -> None:
+        with self._lock:
+            pending, self._pending = self._pending, []
+        for op, entry in pending:
+            if op == "add":
+                if self._by_node.get(id(entry.node)) is not entry:
+                    continue
+                try:
+                    self._poller.register(entry.fd)
+                    self._by_fd[entry.fd] = entry
+                except (OSError, ValueError) as e:
+                    # Helper gone between register() and now
+                    log_system(f"[NotificationLoop] Can't watch fd {entry.fd}: {e}", level="WARNING")
+                    self._drop(entry, notify=True)
+            else:
+                self._drop(entry, notify=False)
+
+    def _drop(self, entry: _Entry, notify: bool) -> None:
+        if self._by_fd.get(entry.fd) is entry:
+            del self._by_fd[entry.fd]
+            self._poller.unregister(entry.fd)
+        with self._lock:
+            if self._by_node.get(id(entry.node)) is entry:
+                del self._by_node[id(entry.node)]
+        entry.released.set()
+        if notify:
+            try:
+                entry.on_drop()
+            except Exception as e:
+                log_system(f"[NotificationLoop] on_drop error: {e}", level="ERROR")
+
+    def _dispatch(self, entry: _Entry) -> None:
+        node = entry.node
+        try:
+            # Readable: returns after one notification line (or the disconnection status)
+            node.wait_for_notifications(_DISPATCH_TIMEOUT_S)
+            self.dispatched += 1
+            connected = node.is_connected()
+        except Exception as e:
+            log_system(f"[NotificationLoop] {type(e).__name__}: {e}", level="ERROR")
+            connected = False
+        if not connected:
+            self._drop(entry, notify=True)
+
+    def _housekeeping(self) -> None:
+        for entry in list(self._by_fd.values()):
+            try:
+                connected = entry.node.is_connected() and helper_fd(entry.node) == entry.fd
+            except Exception:
+                connected = False
+            if not connected:
+                self._drop(entry, notify=True)
+
+    def run(self) -> None:
+        log_system(f"[NotificationLoop] Started ({self._poller.kind})")
+        try:
+            while not self._stop_event.is_set():
+                events = self._poller.poll(self.housekeeping_s)
+                self.wakeups += 1
+                self._apply_pending()
+                if not events:
+                    self._housekeeping()
+                    continue
+                for fd, mask in events:
+                    if fd == self._wake_r:
+                        try:
+                            while os.read(self._wake_r, 64):
+                                pass
+                        except (BlockingIOError, OSError):
+                            pass
+                        continue
+                    entry = self._by_fd.get(fd)
+                    if entry is None:
+                        continue
+                    if mask & (_READ | _HANGUP):
+                        self._dispatch(entry)
+        finally:
+            # Threads still registered go back to polling on their own
+            self._apply_pending()
+            with self._lock:
+                entries = list(self._by_node.values())
+            for entry in entries:
+                self._drop(entry, notify=True)
+            self._poller.close()
+            for fd in (self._wake_r, self._wake_w):
+                try:
+                    os.close(fd)
+                except OSError:
+                    pass
+
+
+_loop: Optional[NotificationLoop] = None
+_loop_lock = threading.Lock()
+
+
+def get_notification_loop() -> Optional[NotificationLoop]:
+    """
+    Shared running loop when ble_io.mode is "event", None in "poll" mode (each BlueCoinThread polls).
+    """
+    global _loop
+    cfg = get_ble_io_config()
+    if cfg["mode"] != "event":
+        return None
+    with _loop_lock:
+        if _loop is None or not _loop.is_alive():
+            _loop = NotificationLoop(cfg["housekeeping_s"])
+            _loop.start()
+        return _loop
+
+
+def stop_notification_loop() -> None:
+    global _loop
+    with _loop_lock:
+        loop, _loop = _loop, None
+    if loop is not None:
+        loop.stop()
@@ -0,0 +1,255 @@
+# sensors/recording.py
+# Record and replay of BlueCoin sensor streams (no BLE hardware or SDK needed for replay).
+#
+# File format (little endian):
+#   magic b"STOPRC02", then fixed-size 34 byte records:
+#     ts (float64, arrival time), dev_ts (float64, device timestamp, NaN when unknown), device (uint8),
+#     kind (uint8), values (4 x float32, acc/gyr use the first 3)
+#   kind 255 declares a device index: values hold its id as UTF-8, null padded (max 16 bytes).
+#   Values are the raw firmware units (acc mg, gyr, quat x10000) so float32 is exact.
+#   Version 1 files (magic b"STOPRC01", 26 byte records without dev_ts) are still read, dev_ts NaN.
+# Replay passes dev_ts on, so with sync.device_timestamps rows are aligned on device time as they were live.
+#
+# Author: Francesco Urru
+# Github: https://github.com/frarvo
+# Repository: https://github.com/frarvo/STOPme
+# License: MIT
+
+import struct
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterator, Optional, Tuple
+
+import numpy as np
+
+from utils.logger import log_system
+from utils import tracing
+
+MAGIC = b"STOPRC02"
+MAGIC_V1 = b"STOPRC01"
+KINDS = ("acc", "gyr", "quat")
+KIND_DEVICE = 255
+_KIND_INDEX = {k: i for i, k in enumerate(KINDS)}
+_DIMS = (3, 3, 4)
+
+_RECORD = struct.Struct("<ddBB4f")
+RECORD_DTYPE = np.dtype([("ts", "<f8"), ("dev_ts", "<f8"), ("dev", "u1"), ("kind", "u1"), ("v", "<f4", (4,))])
+RECORD_DTYPE_V1 = np.dtype([("ts", "<f8"), ("dev", "u1"), ("kind", "u1"), ("v", "<f4", (4,))])
+_NAN = float("nan")
+
+
+class SessionRecorder:
+    """
+    Appends every notification (device_id, kind, values, ts, dev_ts) to a recording file.
+    Thread-safe, called from the BLE notification threads of both wrists.
+    """
+
+    def __init__(self, path: str):
+        self.path = Path(path).expanduser()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._devices: Dict[str, int] = {}
+        self._f = open(self.path, "wb", buffering=64 * 1024)
+        self._f.write(MAGIC)
+        self._records = 0
+        log_system(f"[Recorder] Recording sensor stream to {self.path}")
+
+    def record(self, device_id: str, kind: str, values, ts: float, dev_ts: Optional[float] = None) -> None:
+        k = _KIND_INDEX.get(kind)
+        if k is None:
+            return
+        v = tuple(values)
+        if len(v) < 4:
+            v = v + (0.0,) * (4 - len(v))
+        with self._lock:
+            if self._f is None:
+                return
+            dev = self._devices.get(device_id)
+            if dev is None:
+                dev = self._declare_locked(device_id)
+            self._f.write(_RECORD.pack(ts, _NAN if dev_ts is None else dev_ts, dev, k, v[0], v[1], v[2], v[3]))
+            self._records += 1
+
+    def _declare_locked(self, device_id: str) -> int:
+        dev = len(self._devices)
+        self._devices[device_id] = dev
+        name = device_id.encode("utf-8")[:16].ljust(16, b"\0")
+        self._f.write(struct.pack("<ddBB16s", 0.0, _NAN, dev, KIND_DEVICE, name))
+        return dev
+
+    def close(self) -> None:
+        with self._lock:
+            if self._f is None:
+                return
+            self._f.close()
+            self._f = None
+        log_system(f"[Recorder] Closed {self.path} ({self._records} records)")
+
+
+class RecordingTap:
+    """
+    Stands in for the synchronizer in the feature listeners: records each update, then forwards it.
+    """
+
+    def __init__(self, recorder: SessionRecorder, synchronizer):
+        self.recorder = recorder
+        self.sync = synchronizer
+
+    def update(self, device_id: str, kind: str, values, ts: float, dev_ts=None) -> None:
+        try:
+            self.recorder.record(device_id, kind, values, ts, dev_ts)
+        except Exception as e:
+            log_system(f"[Recorder] Write error: {type(e).__name__}: {e}", level="ERROR")
+        self.sync.update(device_id, kind, values, ts, dev_ts)
+
+    def update_triplet(self, device_id: str, acc, gyr, quat, ts: float, dev_ts=None) -> None:
+        try:
+            for kind, values in (("acc", acc), ("gyr", gyr), ("quat", quat)):
+                self.recorder.record(device_id, kind, values, ts, dev_ts)
+        except Exception as e:
+            log_system(f"[Recorder] Write error: {type(e).__name__}: {e}", level="ERROR")
+        self.sync.update_triplet(device_id, acc, gyr, quat, ts, dev_ts)
+
+
+def iter_record_blocks(path: str, block: int = 4096) -> Iterator[Tuple[np.ndarray, Dict[int, str]]]:
+    """
+    Stream a recording as structured arrays of up to `block` sample records (RECORD_DTYPE, dev_ts NaN for
+    version 1 files). Device declarations are consumed here; the second item maps device index -> device id.
+    """
+    devices: Dict[int, str] = {}
+    with open(Path(path).expanduser(), "rb") as f:
+        magic = f.read(len(MAGIC))
+        if magic not in (MAGIC, MAGIC_V1):
+            raise ValueError(f"{path} is not a STOPme recording")
+        dtype = RECORD_DTYPE if magic == MAGIC else RECORD_DTYPE_V1
+        size = dtype.itemsize
+        while True:
+            raw = f.read(block * size)
+            if not raw:
+                return
+            recs = np.frombuffer(raw[: len(raw) - len(raw) % size], dtype=dtype)
+            if dtype is RECORD_DTYPE_V1:
+                v2 = np.empty(len(recs), dtype=RECORD_DTYPE)
+                for name in RECORD_DTYPE_V1.names:
+                    v2[name] = recs[name]
+                v2["dev_ts"] = np.nan
+                recs = v2
+            decl = recs["kind"] == KIND_DEVICE
+            if decl.any():
+                for r in recs[decl]:
+                    devices[int(r["dev"])] = r["v"].tobytes().rstrip(b"\0").decode("utf-8")
+                recs = recs[~decl]
+            if len(recs):
+                yield recs, devices
+
+
+def iter_records(path: str, dev_ts: bool = False) -> Iterator[tuple]:
+    """
+    Stream a recording as (device_id, kind, values, ts) tuples, in file order.
+    dev_ts: (device_id, kind, values, ts, dev_ts) tuples instead, dev_ts None when not recorded.
+    """
+    for recs, devices in iter_record_blocks(path):
+        if dev_ts:
+            for ts, d_ts, dev, kind, v in zip(recs["ts"].tolist(), recs["dev_ts"].tolist(), recs["dev"].tolist(),
+                                              recs["kind"].tolist(), recs["v"].tolist()):
+                yield (devices.get(dev, str(dev)), KINDS[kind], tuple(v[:_DIMS[kind]]), ts,
+                       None if d_ts != d_ts else d_ts)
+        else:
+            for ts, dev, kind, v in zip(recs["ts"].tolist(), recs["dev"].tolist(),
+                                        recs["kind"].tolist(), recs["v"].tolist()):
+                yield devices.get(dev, str(dev)), KINDS[kind], tuple(v[:_DIMS[kind]]), ts
+
+
+def iter_updates(path: str) -> Iterator[tuple]:
+    """
+    Stream a recording as the synchronizer calls that produced it: (device_id, kind, values, ts, dev_ts),
+    kind "triplet" with values (acc, gyr, quat) for the three records RecordingTap.update_triplet writes
+    (acc, gyr, quat of one device with the same ts and dev_ts), so that replay repeats the live calls
+    (one clock fit observation per triplet). Feed them with apply_update.
+    """
+    held = []
+    for rec in iter_records(path, dev_ts=True):
+        if held:
+            first = held[0]
+            if (rec[0] == first[0] and rec[3] == first[3] and rec[4] == first[4]
+                    and rec[1] == KINDS[len(held)]):
+                held.append(rec)
+                if len(held) == 3:
+                    yield first[0], "triplet", (held[0][2], held[1][2], held[2][2]), first[3], first[4]
+                    held = []
+                continue
+            yield from held
+            held = []
+        if rec[1] == KINDS[0]:
+            held.append(rec)
+        else:
+            yield rec
+    yield from held
+
+
+def apply_update(sync, device_id: str, kind: str, values, ts: float, dev_ts: Optional[float] = None) -> None:
+    """Pushes one item of iter_updates into the synchronizer."""
+    if kind == "triplet":
+        sync.update_triplet(device_id, values[0], values[1], values[2], ts, dev_ts)
+    else:
+        sync.update(device_id, kind, values, ts, dev_ts)
+
+
+class ReplaySource(threading.Thread):
+    """
+    Pushes a recording into the synchronizer with the recorded arrival and device timestamps, one
+    update_triplet call per recorded triplet and one update call per single sample (iter_updates).
+
+    speed: 1.0 real time, N for N x faster, <= 0 as fast as possible.
+    At full speed the source waits for room in the buffer processing queue instead of
+    letting the overflow policy drop windows.
+    The synchronizer clock (stale checks) follows the recording timeline.
+    """
+
+    def __init__(self, path: str, synchronizer, speed: float = 1.0):
+        super().__init__(daemon=True, name="ReplaySource")
+        self.path = str(path)
+        self.sync = synchronizer
+        self.speed = float(speed)
+        self.stop_event = threading.Event()
+        self._now = 0.0
+        self.records = 0
+        self.elapsed = 0.0
+
+    def run(self) -> None:
+        log_system(f"[Replay] Replaying {self.path} at "
+                   f"{'max speed' if self.speed <= 0 else f'{self.speed:g}x'}")
+        if hasattr(self.sync, "set_clock"):
+            self.sync.set_clock(lambda: self._now)
+        tracing.use_emit_as_arrival()
+        buffer = getattr(self.sync, "buffer", None)
+        throttle = getattr(buffer, "wait_for_room", None) if self.speed <= 0 else None
+
+        t_start = time.monotonic()
+        ts0: Optional[float] = None
+        try:
+            for device_id, kind, values, ts, dev_ts in iter_updates(self.path):
+                if self.stop_event.is_set():
+                    break
+                if ts0 is None:
+                    ts0 = ts
+                if self.speed > 0:
+                    delay = t_start + (ts - ts0) / self.speed - time.monotonic()
+                    if delay > 0 and self.stop_event.wait(delay):
+                        break
+                elif throttle is not None:
+                    throttle()
+                self._now = ts
+                apply_update(self.sync, device_id, kind, values, ts, dev_ts)
+                self.records += 3 if kind == "triplet" else 1
+        except Exception as e:
+            log_system(f"[Replay] Error: {type(e).__name__}: {e}", level="ERROR")
+        self.elapsed = time.monotonic() - t_start
+        rate = self.records / self.elapsed if self.elapsed > 0 else 0.0
+        log_system(f"[Replay] Finished: {self.records} records in {self.elapsed:.2f}s ({rate:.0f} records/s)")
+
+    def stop(self) -> None:
+        self.stop_event.set()
+        if threading.current_thread() is not self and self.is_alive():
+            self.join()
@@ -6,18 +6,25 @@
 # Repository: https://github.com/frarvo/STOPme
 # License: MIT
 
-from blue_st_sdk.features.feature_accelerometer import FeatureAccelerometer
-from blue_st_sdk.features.feature_gyroscope import FeatureGyroscope
-from sensors.feature_mems_sensor_fusion_compact import FeatureMemsSensorFusionCompact
+import time
+from typing import Optional
 
-from sensors.bluecoin import scan_bluecoin_devices, BlueCoinThread
-from sensors.feature_listeners import AccelerometerFeatureListener, GyroscopeFeatureListener, QuaternionFeatureListener
-from data_pipeline.synchronizer import IMUSynchronizer
-from classifiers.stereotipy_classifier import StereotipyClassifier
+from sensors.feature_imu_packet import register_imu_packet_feature
 
-from utils.config import get_bluecoin_config
+from sensors.bluecoin import scan_bluecoin_devices, BlueCoinThread, known_bluecoin_nodes, bluecoin_registry_entry
+from sensors.recording import SessionRecorder, RecordingTap
+from sensors.link_stats import LinkStatsReporter, log_link_stats
+from sensors.notification_loop import stop_notification_loop
+from sensors.feature_listeners import build_feature_listeners
+from sensors.ingest_process import IngestSupervisor
+from core.subjects import create_pipelines
+
+from utils.config import (
+    get_bluecoin_config, get_sync_config, get_imu_packet_config, get_startup_config, get_ingest_config
+)
 from utils.logger import log_system
-from utils.lock import device_scan_lock, device_connection_lock
+from utils.lock import radio_lock, device_connection_lock
+from utils.device_registry import get_device_registry, RegistryRefresher
 
 
 class SensorManager:
@@ -26,42 +33,104 @@ class SensorManager:
 
     This manager:
     - Loads configuration from config.yaml
-    - Scans for available BlueCoin nodes (scan_sensors)
+    - Scans for available BlueCoin nodes (scan_sensors), known nodes from the device registry skip the scan;
+      a known node not connected after device_registry.connect_check_s triggers a rescan by name, the node found
+      replaces it and its old address is forgotten (stale address: bracelet replaced or re-flashed)
     - Initializes and starts sensor threads with three features per device
-    - Feed samples to a shared synchronizer (sync left and right data streams)
+    - Feed samples to the synchronizer of each subject (sync left and right data streams, core/subjects.py)
+    - Optionally records every sample to a file for later replay (record_path)
+    - Optionally reads every BlueCoin from its own process through a shared-memory ring (ingest.mode "process",
+      sensors/ingest_process.py), same API
+    - Periodically logs the packet loss accounting of every device/feature stream (link_stats)
     """
 
-    def __init__(self):
+    def __init__(self, record_path: Optional[str] = None):
         """Initializes the SensorManager and loads BlueCoin configuration."""
         self.threads = []
         self.config = get_bluecoin_config()
         self.nodes = []
-        self.synchronizer = IMUSynchronizer()
-        self.classifier = StereotipyClassifier()
-        self.synchronizer.buffer.set_features_sink(self.classifier.recognize)
+        # One processing chain per subject; synchronizer/classifier are the first subject's (single subject)
+        self.pipelines, self.pool = create_pipelines()
+        self.synchronizer = self.pipelines[0].synchronizer
+        self.classifier = self.pipelines[0].classifier
+        sync_cfg = get_sync_config()
+        self.fused_listener = sync_cfg.get("fused_listener", True)
+        self.fast_decode = sync_cfg.get("fast_decode", True)
+        self.imu_packet = get_imu_packet_config()["enable"]
+        # Ingest processes: threads then holds their IngestProcess handles (device_id, connected_event, stop())
+        self.ingest = IngestSupervisor() if get_ingest_config()["mode"] == "process" else None
+
+        # Listeners feed their subject's synchronizer, through a recording tap when recording
+        self.recorder = SessionRecorder(record_path) if record_path else None
+        self.link_reporter = None
+        self.registry = get_device_registry()
+        self._known = {}            # name -> address of the nodes built from the device registry
+        self._sensors = {}          # device id -> (name, sink) of the started sensors
+        self.refresher = None
         log_system("[SensorManager] Initialized")
 
     def scan_sensors(self):
-        """Performs BLE scan for BlueCoin nodes and stores results internally."""
-        log_system("[SensorManager] Starting BLE scan for BlueCoin nodes")
-        with device_scan_lock:
-            self.nodes = scan_bluecoin_devices(timeout=5)
+        """
+        Collects the BlueCoin nodes: the configured ones known from the device registry are built directly,
+        a BLE scan runs only when some are missing (its results are recorded in the registry).
+        """
+        expected = {c.get("name") for c in self.config if c.get("name")}
+        with radio_lock(get_startup_config()["radios"]["bluecoin"]):
+            if self.imu_packet:
+                # Feature mask of the combined packet must be known before nodes are discovered
+                register_imu_packet_feature()
+            known = []
+            if self.registry is not None and expected:
+                known = known_bluecoin_nodes(self.registry.known("bluecoin"), expected)
+            missing = expected - {self._node_name(n) for n in known}
+            if known and not missing:
+                log_system("[SensorManager] All BlueCoin nodes known from the device registry, BLE scan skipped")
+                self.nodes = known
+                self._known = {self._node_name(n): n.get_tag() for n in known}
+            else:
+                if known:
+                    log_system(f"[SensorManager] Known BlueCoin nodes: {sorted(expected - missing)}, "
+                               f"scanning for {sorted(missing)}")
+                log_system("[SensorManager] Starting BLE scan for BlueCoin nodes")
+                scanned = scan_bluecoin_devices(timeout=5)
+                self._record_nodes(scanned)
+                # Fresh scan results replace the known nodes of the same name
+                found = {self._node_name(n) for n in scanned}
+                known = [n for n in known if self._node_name(n) not in found]
+                self.nodes = scanned + known
+                self._known = {self._node_name(n): n.get_tag() for n in known}
         log_system(f"[SensorManager] Found {len(self.nodes)} node(s)")
 
-        discovered = []
-        for node in self.nodes:
+    def _record_nodes(self, nodes):
+        """Stores the scanned nodes in the device registry."""
+        if self.registry is None:
+            return
+        entries = {}
+        for node in nodes:
             try:
-                discovered.append(node.get_name())
+                entry = bluecoin_registry_entry(node)
+                if entry and entry.get("name"):
+                    entries[node.get_tag()] = entry
             except Exception as e:
-                log_system(f"[SensorManager] Error retrieving name for scanned node: {e}", level="WARNING")
+                log_system(f"[SensorManager] Error reading scanned node for the registry: {e}", level="WARNING")
+        self.registry.record("bluecoin", entries)
+
+    @staticmethod
+    def _node_name(node):
+        try:
+            return node.get_name()
+        except Exception as e:
+            log_system(f"[SensorManager] Error retrieving name for scanned node: {e}", level="WARNING")
+            return None
 
     def initialize_sensors(self):
         """
-        Initializes sensor threads using the scanned nodes.
+        Initializes sensor threads using the scanned nodes. Returns True when the threads of both
+        BlueCoins of every subject started.
         """
         if not self.nodes:
             log_system("[SensorManager] No scanned nodes available. Run scan_sensors() first.", level="WARNING")
-            return
+            return False
         # Local name->node map
         by_name = {}
         for node in self.nodes:
@@ -72,85 +141,186 @@ class SensorManager:
             except Exception as e:
                 log_system(f"[SensorManager] Can't read node name: {e}", level="WARNING")
 
-        # Expected 2 bluecoins bc_left and bc_right
-        expected = {c.get("id"): c.get("name") for c in self.config if c.get("id") and c.get("name")}
-        left_name = expected.get("bc_left")
-        right_name = expected.get("bc_right")
-
-        if not left_name or not right_name:
-            log_system(f"[SensorManager] Config must include bc_left and bc_right with names.", level="ERROR")
-            return
+        # Two BlueCoins per subject (bc_left and bc_right for the single subject)
+        for pipeline in self.pipelines:
+            if not pipeline.left["name"] or not pipeline.right["name"]:
+                log_system(f"[SensorManager] Config must include left and right names for subject {pipeline.id}.",
+                           level="ERROR")
+                return False
 
         # Check node presence
-        missing = [name for name in (left_name, right_name) if name not in by_name]
+        missing = [dev["name"] for p in self.pipelines for dev in (p.left, p.right) if dev["name"] not in by_name]
         if missing:
             log_system(f"[SensorManager] Missing expected nodes: {missing}", level="ERROR")
-            return
+            return False
+
+        # Start window processing stage before data starts flowing
+        if self.pool is not None:
+            self.pool.start()
+        for pipeline in self.pipelines:
+            pipeline.buffer.start()
 
         # Initialize sensors
+        for pipeline in self.pipelines:
+            sink = RecordingTap(self.recorder, pipeline.synchronizer) if self.recorder else pipeline.synchronizer
+            for dev in (pipeline.left, pipeline.right):
+                self._initialize_sensor(by_name[dev["name"]], dev["id"], dev["name"], sink)
 
-        for sensor_id, expected_name in (("bc_left", left_name), ("bc_right", right_name)):
-            node = by_name[expected_name]
+        if self.link_reporter is None:
+            self.link_reporter = LinkStatsReporter()
+            self.link_reporter.start()
+        if self._known and self.refresher is None:
+            # Connection check of the known nodes only: no background scan while the BlueCoins stream
+            self.refresher = RegistryRefresher([("BlueCoin nodes", self._rescan_unconnected, self._unconnected)],
+                                               delay_s=0)
+            self.refresher.start()
+        log_system("[SensorManager] All sensor threads initialized")
+        return len(self.threads) == 2 * len(self.pipelines)
 
-            # Attempt to retrieve feature from node
-            try:
-                feat_acc = node.get_feature(FeatureAccelerometer)
-                feat_gyr = node.get_feature(FeatureGyroscope)
-                feat_quat = node.get_feature(FeatureMemsSensorFusionCompact)
-            except Exception as e:
-                log_system(f"[SensorManager] Error retrieving features for '{expected_name}': {e}", level="ERROR")
-                continue
+    def _initialize_sensor(self, node, sensor_id, expected_name, sink):
+        """Starts the thread of one BlueCoin with its listeners feeding sink (synchronizer of its subject)."""
+        self._sensors[sensor_id] = (expected_name, sink)
+        if self.ingest is not None:
+            # Read by its own process, rows come back through the shared-memory ring
+            self._start_process(node, sensor_id, expected_name, sink)
+            return
+        features, listeners = build_feature_listeners(node, sensor_id, expected_name, sink, self.imu_packet,
+                                                      self.fused_listener, self.fast_decode)
+        if not features:
+            log_system(f"[SensorManager] No features available on node {expected_name}", level="WARNING")
+            return
 
-            features, listeners = [], []
-            if feat_acc:
-                features.append(feat_acc)
-                listeners.append(AccelerometerFeatureListener(device_id=sensor_id, synchronizer=self.synchronizer))
-            else:
-                log_system(f"[SensorManager] {expected_name} is missing Accelerometer", level="WARNING")
+        self._start_thread(node, sensor_id, expected_name, features, listeners)
 
-            if feat_gyr:
-                features.append(feat_gyr)
-                listeners.append(GyroscopeFeatureListener(device_id=sensor_id, synchronizer=self.synchronizer))
-            else:
-                log_system(f"[SensorManager] {expected_name} is missing Gyroscope", level="WARNING")
+    def _start_process(self, node, sensor_id, expected_name, sink):
+        """Starts the ingest process of one node, built there from its address and advertising data."""
+        try:
+            entry = bluecoin_registry_entry(node)
+            if entry is None:
+                log_system(f"[SensorManager] No advertising data for '{expected_name}', can't start its process",
+                           level="ERROR")
+                return
+            proc = self.ingest.add(sensor_id, expected_name, node.get_tag(), entry, sink)
+            self.threads.append(proc)
+            log_system(f"[SensorManager] Sensor initialized: {sensor_id} ({expected_name}) in process {proc.process.pid}")
+        except Exception as e:
+            log_system(f"[SensorManager] Error starting ingest process for '{sensor_id}'/'{expected_name}': {e}",
+                       level="ERROR")
 
-            if feat_quat:
-                features.append(feat_quat)
-                listeners.append(QuaternionFeatureListener(device_id=sensor_id, synchronizer=self.synchronizer))
-            else:
-                log_system(f"[SensorManager] {expected_name} is missing Quaternions", level="WARNING")
+    def _start_thread(self, node, sensor_id, expected_name, features, listeners):
+        """Initializes and starts the BlueCoin thread of one node."""
+        try:
+            with device_connection_lock:
+                thread = BlueCoinThread(
+                    node=node,
+                    feature=features,
+                    feature_listener=listeners,
+                    device_id=sensor_id
+                )
+                thread.start()
+                self.threads.append(thread)
+            log_system(f"[SensorManager] Sensor initialized: {sensor_id} ({expected_name}) with {len(features)} features")
+        except Exception as e:
+            log_system(f"[SensorManager] Error initializing thread for '{sensor_id}'/'{expected_name}': {e}", level="ERROR")
 
+    def _unconnected(self) -> list:
+        """Names of the sensors started on a node from the device registry that have not connected yet."""
+        return [name for _, name in self._unconnected_threads()]
 
-            if not features:
-                log_system(f"[SensorManager] No features available on node {expected_name}", level="WARNING")
+    def _unconnected_threads(self) -> list:
+        return [(t, self._sensors[t.device_id][0]) for t in list(self.threads)
+                if not t.connected_event.is_set() and self._sensors.get(t.device_id, (None,))[0] in self._known]
+
+    def _rescan_unconnected(self) -> None:
+        """
+        Scans for the known nodes that did not connect: a node found under the same name at another address
+        replaces the old one (thread restarted on it), the old address is forgotten in the device registry.
+        """
+        pending = self._unconnected_threads()
+        if not pending:
+            return
+        with radio_lock(get_startup_config()["radios"]["bluecoin"]):
+            scanned = scan_bluecoin_devices(timeout=5)
+        self._record_nodes(scanned)
+        by_name = {self._node_name(n): n for n in scanned}
+        for thread, name in pending:
+            old = self._known.get(name)
+            node = by_name.get(name)
+            if thread.connected_event.is_set():
+                continue
+            if node is not None and node.get_tag() == old:
+                log_system(f"[SensorManager] {name} found at its known address {old}, still connecting")
                 continue
+            if self.registry is not None:
+                self.registry.forget("bluecoin", old)
+            if node is None:
+                log_system(f"[SensorManager] {name} not found by the rescan, forgot {old}, still retrying it",
+                           level="WARNING")
+                continue
+            log_system(f"[SensorManager] {name} moved from {old} to {node.get_tag()}, replacing the node",
+                       level="WARNING")
+            self._replace_node(thread, name, node)
 
-            # Initialize and start the thread
-            try:
-                with device_connection_lock:
-                    thread = BlueCoinThread(
-                        node=node,
-                        feature=features,
-                        feature_listener=listeners,
-                        device_id=sensor_id
-                    )
-                    thread.start()
-                    self.threads.append(thread)
-                log_system(f"[SensorManager] Sensor initialized: {sensor_id} ({expected_name}) with {len(features)} features")
-            except Exception as e:
-                log_system(f"[SensorManager] Error initializing thread for '{sensor_id}'/'{expected_name}': {e}", level="ERROR")
+    def _replace_node(self, thread, name, node) -> None:
+        """Stops the sensor thread (or ingest process) of a node and starts it again on node."""
+        sensor_id = thread.device_id
+        try:
+            if self.ingest is not None:
+                self.ingest.remove(thread)
+            else:
+                thread.stop()
+        except Exception as e:
+            log_system(f"[SensorManager] Error stopping '{sensor_id}': {e}", level="ERROR")
+        if thread in self.threads:
+            self.threads.remove(thread)
+        self.nodes = [n for n in self.nodes if self._node_name(n) != name] + [node]
+        self._known.pop(name, None)
+        self._initialize_sensor(node, sensor_id, name, self._sensors[sensor_id][1])
 
-        log_system("[SensorManager] All sensor threads initialized")
+    def wait_connected(self, timeout: Optional[float] = None) -> bool:
+        """
+        Waits until every sensor thread has connected its node. False on timeout or without threads.
+        Threads replaced meanwhile (rescan of a known node) are followed.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            threads = list(self.threads)
+            pending = [t for t in threads if not t.connected_event.is_set()]
+            if not pending:
+                return bool(threads)
+            left = None if deadline is None else deadline - time.monotonic()
+            if left is not None and left <= 0:
+                return False
+            pending[0].connected_event.wait(0.5 if left is None else min(left, 0.5))
 
     def stop_all(self):
         """Stops all active sensor threads and clears the list."""
         log_system("[SensorManager] Stopping all sensor threads...")
+        if self.refresher is not None:
+            self.refresher.stop()
+            self.refresher = None
         for thread in self.threads:
             try:
                 thread.stop()
             except Exception as e:
                 log_system(f"[SensorManager] Error stopping thread for device '{thread.device_id}': {e}", level="ERROR")
         self.threads.clear()
+        if self.ingest is not None:
+            self.ingest.stop()
+        stop_notification_loop()
+        if self.link_reporter:
+            self.link_reporter.stop()
+            self.link_reporter = None
+        log_link_stats()
+        try:
+            for pipeline in self.pipelines:
+                pipeline.buffer.stop()
+            if self.pool is not None:
+                self.pool.stop()
+        except Exception as e:
+            log_system(f"[SensorManager] Error stopping window processing: {e}", level="ERROR")
+        if self.recorder:
+            self.recorder.close()
         log_system("[SensorManager] All sensor threads stopped.")
 
     def get_sensors_names(self):
@@ -0,0 +1,124 @@
+# utils/ble_discovery.py
+# Single BLE discovery pass shared by the BlueCoin and MetaMotion subsystems (ble_discovery in config.yaml)
+#
+# BlueCoins used to be found by a blue_st_sdk Manager.discover and MetaMotions by a separate bluepy
+# Scanner().scan: two full scans on the same adapter, back to back. BleDiscovery runs one bluepy LE scan and
+# classifies the advertisements:
+#   bluecoin    BlueST manufacturer data (BlueSTAdvertisingDataParser accepts it), nodes built from the entry
+#   metamotion  Complete Local Name "MetaWear"
+# Each subsystem takes its devices from the last result when it is younger than cache_s and that subsystem
+# has not used it yet; otherwise (first use, rescans) it triggers a new pass, which the others can reuse.
+# BlueST nodes are built when taken, so feature registrations done before (IMU packet mask) apply.
+# Speakers are classic Bluetooth devices, found by bluetoothctl, not by an LE scan.
+#
+# Author: Francesco Urru
+# GitHub: https://github.com/frarvo
+# Repository: https://github.com/frarvo/STOPme
+# License: MIT
+
+import threading
+import time
+from typing import List, Optional
+
+from utils.config import get_ble_discovery_config
+from utils.logger import log_system
+
+_COMPLETE_LOCAL_NAME = 9
+_MANUFACTURER_DATA = 0xFF
+METAWEAR_NAME = "MetaWear"
+
+
+class DiscoveryResult:
+    """
+    Advertisements of one scan pass, classified per subsystem.
+    """
+
+    def __init__(self, entries: list):
+        self.time = time.monotonic()
+        self.entries = entries
+        self.bluest: list = []
+        self.metawear: List[str] = []
+        self.consumers = set()
+        for entry in entries:
+            try:
+                name = entry.getValueText(_COMPLETE_LOCAL_NAME)
+                if name == METAWEAR_NAME:
+                    self.metawear.append(entry.addr)
+                elif entry.getValueText(_MANUFACTURER_DATA) is not None:
+                    self.bluest.append(entry)
+            except Exception as e:
+                log_system(f"[BLE Discovery] Unreadable advertisement: {e}", level="WARNING")
+
+    def age(self) -> float:
+        return time.monotonic() - self.time
+
+
+class BleDiscovery:
+    """
+    Shared LE scanner. take(consumer, timeout) returns the DiscoveryResult the consumer should use.
+    """
+
+    def __init__(self, cache_s: float = 30.0, iface: int = 0):
+        self.cache_s = float(cache_s)
+        self.iface = int(iface)
+        self._lock = threading.Lock()
+        self._last: Optional[DiscoveryResult] = None
+        self.scans = 0
+
+    def take(self, consumer: str, timeout: float) -> DiscoveryResult:
+        with self._lock:
+            last = self._last
+            if last is not None and consumer not in last.consumers and last.age() <= self.cache_s:
+                log_system(f"[BLE Discovery] {consumer}: using the scan from {last.age():.1f}s ago")
+            else:
+                last = self._last = self._scan(timeout)
+            last.consumers.add(consumer)
+            return last
+
+    def _scan(self, timeout: float) -> DiscoveryResult:
+        from bluepy.btle import Scanner
+        log_system(f"[BLE Discovery] Starting BLE scan for {timeout} seconds...")
+        try:
+            entries = list(Scanner(self.iface).scan(timeout))
+        except Exception as e:
+            log_system(f"[BLE Discovery] Scan error: {e}", level="ERROR")
+            entries = []
+        self.scans += 1
+        result = DiscoveryResult(entries)
+        log_system(f"[BLE Discovery] {len(entries)} advertiser(s): {len(result.bluest)} BlueST candidate(s), "
+                   f"{len(result.metawear)} MetaWear")
+        return result
+
+
+def bluest_nodes(result: DiscoveryResult) -> list:
+    """
+    BlueST nodes of a discovery result (entries whose manufacturer data the SDK accepts).
+    """
+    from blue_st_sdk.node import Node
+    nodes = []
+    for entry in result.bluest:
+        try:
+            nodes.append(Node(entry))
+        except Exception:
+            # Manufacturer data of another vendor
+            continue
+    return nodes
+
+
+_discovery: Optional[BleDiscovery] = None
+_discovery_lock = threading.Lock()
+
+
+def get_ble_discovery() -> Optional[BleDiscovery]:
+    """
+    Shared discovery service as configured in config.yaml, None when ble_discovery.enable is off
+    (each subsystem then runs its own scan).
+    """
+    global _discovery
+    cfg = get_ble_discovery_config()
+    if not cfg["enable"]:
+        return None
+    with _discovery_lock:
+        if _discovery is None:
+            _discovery = BleDiscovery(cfg["cache_s"], cfg["iface"])
+        return _discovery
@@ -40,6 +40,44 @@ def debug_system_console_enabled() -> bool:
 def debug_event_console_enabled()-> bool:
     return CONFIG.get("debug_event_console", False)
 
+def get_log_writer_config() -> dict:
+    """
+    Returns the background log writer configuration dictionary from config.yaml
+    Keys:
+        async (bool): write system log records from a background thread with persistent file handles
+        batch_size (int): flush after this many records
+        flush_interval_ms (int): flush at least this often while records are pending
+    """
+    writer_cfg = CONFIG.get("log_writer", {}) or {}
+    return {
+        "async": bool(writer_cfg.get("async", True)),
+        "batch_size": int(writer_cfg.get("batch_size", 256)),
+        "flush_interval_ms": int(writer_cfg.get("flush_interval_ms", 500))
+    }
+
+def get_log_levels() -> dict:
+    """
+    Returns the system log level thresholds from config.yaml
+    Keys:
+        default (str): threshold for untagged messages and unlisted modules ('DEBUG', 'INFO', 'WARNING', 'ERROR')
+        <tag> (str): threshold for one module tag (e.g. DataBuffer, Classifier)
+    """
+    levels = CONFIG.get("log_levels", {}) or {}
+    out = {str(k): str(v).upper() for k, v in levels.items()}
+    out.setdefault("default", "INFO")
+    return out
+
+def get_tracing_config() -> dict:
+    """
+    Returns latency tracing configuration dictionary from config.yaml
+    Keys:
+        enable (bool): stamp every window from sample arrival to actuator command and keep latency histograms
+    """
+    tracing_cfg = CONFIG.get("tracing", {}) or {}
+    return {
+        "enable": bool(tracing_cfg.get("enable", False))
+    }
+
 # METAMOTION
 def get_metamotion_config() -> dict:
     """
@@ -65,27 +103,250 @@ def get_led_strip_config() -> dict:
     return CONFIG.get("led_strip", {})
 
 # BLUECOIN
+def get_startup_config() -> dict:
+    """
+    Returns startup orchestration configuration dictionary from config.yaml (core/startup.py)
+    Keys:
+        concurrent (bool): scan/connect on different radios at the same time, stream as soon as the BlueCoins connect
+        radios (dict): radio used by each device kind ("bluecoin", "metamotion", "speaker", "led");
+                       kinds on the same radio never scan or connect at the same time
+        connect_timeout_s (float): wait for both BlueCoins to connect before the adapter is handed to the actuators
+    """
+    startup_cfg = CONFIG.get("startup", {}) or {}
+    radios = {"bluecoin": "hci0", "metamotion": "hci0", "speaker": "hci0", "led": "wifi"}
+    radios.update({str(k): str(v) for k, v in (startup_cfg.get("radios") or {}).items()})
+    return {
+        "concurrent": bool(startup_cfg.get("concurrent", True)),
+        "radios": radios,
+        "connect_timeout_s": float(startup_cfg.get("connect_timeout_s", 20))
+    }
+
+def get_ble_discovery_config() -> dict:
+    """
+    Returns the shared BLE discovery configuration from config.yaml (utils/ble_discovery.py)
+    Keys:
+        enable (bool): one LE scan classified for BlueCoin and MetaMotion instead of one scan each
+        cache_s (float): a scan result is reused by the other subsystem when younger than this
+        iface (int): HCI adapter index of the scan (0: hci0)
+    """
+    disc_cfg = CONFIG.get("ble_discovery", {}) or {}
+    return {
+        "enable": bool(disc_cfg.get("enable", True)),
+        "cache_s": float(disc_cfg.get("cache_s", 30)),
+        "iface": int(disc_cfg.get("iface", 0))
+    }
+
+def get_reconnect_config() -> dict:
+    """
+    Returns the reconnection supervisor configuration from config.yaml (utils/reconnect.py)
+    Keys:
+        backoff_factor (float): wait growth per failed attempt, once the fast retries are over
+        jitter (float): each wait is randomized by +/- this fraction, so devices dropped together don't retry together
+        bluecoin_initial_s (float): BlueCoin wait after the first failed attempt
+        bluecoin_max_s (float): BlueCoin longest wait between attempts
+        bluecoin_fast_attempts (int): BlueCoin attempts at the initial wait before it grows
+        log_interval_s (float): reconnection metrics written to the system log this often while a device is
+                                down (0: only on demand and at shutdown)
+    Actuators use their own fast_retry_attempts, retry_interval (initial) and retry_sleep (max).
+    """
+    rc_cfg = CONFIG.get("reconnect", {}) or {}
+    return {
+        "backoff_factor": float(rc_cfg.get("backoff_factor", 2.0)),
+        "jitter": float(rc_cfg.get("jitter", 0.2)),
+        "bluecoin_initial_s": float(rc_cfg.get("bluecoin_initial_s", 0.5)),
+        "bluecoin_max_s": float(rc_cfg.get("bluecoin_max_s", 10)),
+        "bluecoin_fast_attempts": int(rc_cfg.get("bluecoin_fast_attempts", 4)),
+        "log_interval_s": float(rc_cfg.get("log_interval_s", 60))
+    }
+
+def get_device_registry_config() -> dict:
+    """
+    Returns the persistent device registry configuration from config.yaml (utils/device_registry.py)
+    Keys:
+        enable (bool): connect to previously seen devices directly, scan only for the missing ones
+        path (str): registry file
+        max_age_days (float): entries not seen by a scan for longer are ignored (0: never expire)
+        refresh_delay_s (float): background rescan of the skipped scans this long after startup (0: off)
+        connect_check_s (float): known devices not connected this long after their thread started are looked
+                                 for with a scan of their kind right away (0: wait for refresh_delay_s);
+                                 BlueCoins by name, a node found at another address replaces the stale one
+        led_probe_timeout_s (float): TCP check of known LED strips before skipping the Wi-Fi scan
+    """
+    reg_cfg = CONFIG.get("device_registry", {}) or {}
+    return {
+        "enable": bool(reg_cfg.get("enable", True)),
+        "path": str(Path(expanduser(str(reg_cfg.get("path", "~/Documents/STOPME/devices.json"))))),
+        "max_age_days": float(reg_cfg.get("max_age_days", 30)),
+        "refresh_delay_s": float(reg_cfg.get("refresh_delay_s", 60)),
+        "connect_check_s": float(reg_cfg.get("connect_check_s", 15)),
+        "led_probe_timeout_s": float(reg_cfg.get("led_probe_timeout_s", 1.0))
+    }
+
 def get_bluecoin_config() -> list[dict]:
     """
-    Returns the list of BlueCoin sensors configurations from config.yaml
+    Returns the list of BlueCoin sensors configurations from config.yaml (every subject's devices)
     each entry has:
-        id: bc_left, bc_right
+        id: bc_left, bc_right (single subject), the ids given in the subject groups otherwise
         name: STOPmeL, STOPmeR
     """
-    return CONFIG.get("bluecoins", []) or []
+    return [dev for subject in get_subjects_config() for dev in (subject["left"], subject["right"])]
+
+def get_subjects_config() -> list[dict]:
+    """
+    Returns the subjects (children wearing a pair of BlueCoins) served by this host, from the bluecoins
+    section of config.yaml. bluecoins is either the single-subject list of devices (ids bc_left, bc_right):
+        - id: bc_left
+          name: "STOPmeL"
+    or a list of subject groups:
+        - subject: s1
+          left:  {id: s1_left,  name: "STOPmeL1"}
+          right: {id: s1_right, name: "STOPmeR1"}
+          actuators: ["meta_AA:BB:CC:DD:EE:FF"]   # optional, actuator ids or addresses (none: every actuator)
+    Each entry has:
+        id (str): subject id ("default" for the single-subject list)
+        left, right (dict): {"id", "name"} of the wrist devices
+        actuators (list[str]): actuators reserved to the subject, empty for every actuator
+    Device ids must be unique across subjects.
+    """
+    entries = CONFIG.get("bluecoins", []) or []
+    if not any(isinstance(e, dict) and "subject" in e for e in entries):
+        by_id = {e.get("id"): e for e in entries if isinstance(e, dict)}
+        return [{
+            "id": "default",
+            "left": {"id": "bc_left", "name": (by_id.get("bc_left") or {}).get("name")},
+            "right": {"id": "bc_right", "name": (by_id.get("bc_right") or {}).get("name")},
+            "actuators": []
+        }]
+    subjects, seen = [], set()
+    for e in entries:
+        if not isinstance(e, dict) or "subject" not in e:
+            raise ValueError(f"bluecoins: mixed device and subject entries ({e})")
+        sid = str(e["subject"])
+        sides = {}
+        for side in ("left", "right"):
+            dev = e.get(side) or {}
+            dev_id = str(dev.get("id") or f"{sid}_{side}")
+            if dev_id in seen:
+                raise ValueError(f"bluecoins: device id {dev_id} used twice")
+            seen.add(dev_id)
+            sides[side] = {"id": dev_id, "name": dev.get("name")}
+        subjects.append({"id": sid, "left": sides["left"], "right": sides["right"],
+                         "actuators": [str(a) for a in (e.get("actuators") or [])]})
+    if len({s["id"] for s in subjects}) != len(subjects):
+        raise ValueError("bluecoins: subject ids must be unique")
+    return subjects
+
+def get_ble_io_config() -> dict:
+    """
+    Returns the BLE notification wait configuration from config.yaml (sensors/notification_loop.py)
+    Keys:
+        mode (str): "event" one I/O thread waits on the bluepy helper pipes of all BlueCoins (epoll),
+                    "poll" every BlueCoin thread polls wait_for_notifications(poll_timeout_s)
+        poll_timeout_s (float): wait per poll ("poll" mode)
+        housekeeping_s (float): longest sleep of the I/O thread without notifications, node status checked then
+    """
+    io_cfg = CONFIG.get("ble_io", {}) or {}
+    mode = str(io_cfg.get("mode", "event")).lower()
+    return {
+        "mode": mode if mode in ("event", "poll") else "event",
+        "poll_timeout_s": float(io_cfg.get("poll_timeout_s", 0.05)),
+        "housekeeping_s": float(io_cfg.get("housekeeping_s", 1.0))
+    }
+
+def get_ingest_config() -> dict:
+    """
+    Returns the BlueCoin ingestion layout from config.yaml (sensors/ingest_process.py)
+    Keys:
+        mode (str): "thread" every BlueCoin is read by a thread of the main process,
+                    "process" every BlueCoin is read by its own process writing into a shared-memory ring
+        ring_records (int): records per ring (one record per sample or triplet)
+        poll_interval_ms (float): main process sweep of the rings
+        heartbeat_s (float): heartbeat period of the ingest processes
+        heartbeat_timeout_s (float): an ingest process silent for longer is killed and restarted
+        restart_initial_s (float): wait before the first restart, doubled (reconnect.backoff_factor) up to restart_max_s
+        restart_max_s (float): longest wait between restarts
+    """
+    ing_cfg = CONFIG.get("ingest", {}) or {}
+    mode = str(ing_cfg.get("mode", "thread")).lower()
+    return {
+        "mode": mode if mode in ("thread", "process") else "thread",
+        "ring_records": max(64, int(ing_cfg.get("ring_records", 4096))),
+        "poll_interval_ms": max(0.5, float(ing_cfg.get("poll_interval_ms", 5))),
+        "heartbeat_s": max(0.05, float(ing_cfg.get("heartbeat_s", 0.5))),
+        "heartbeat_timeout_s": max(0.5, float(ing_cfg.get("heartbeat_timeout_s", 5.0))),
+        "restart_initial_s": max(0.0, float(ing_cfg.get("restart_initial_s", 1.0))),
+        "restart_max_s": max(0.0, float(ing_cfg.get("restart_max_s", 30.0)))
+    }
+
+def get_imu_packet_config() -> dict:
+    """
+    Returns the combined IMU packet feature configuration from config.yaml
+    Keys:
+        enable (bool): use the combined acc+gyr+quat notification when the node advertises it
+        device_id (int): BlueST device identifier the feature mask is registered for
+        mask (int | None): advertised feature bit of the combined packet (None: not registered)
+    """
+    packet_cfg = CONFIG.get("imu_packet", {}) or {}
+    mask = packet_cfg.get("mask")
+    return {
+        "enable": bool(packet_cfg.get("enable", True)),
+        "device_id": int(str(packet_cfg.get("device_id", 0x02)), 0),
+        "mask": None if mask is None else int(str(mask), 0)
+    }
+
+def get_link_stats_config() -> dict:
+    """
+    Returns packet loss accounting configuration dictionary from config.yaml (sensors/link_stats.py)
+    Keys:
+        enable (bool): count gaps, reorders and duplicates per device and feature stream
+        log_interval_s (float): summary written to the system log this often (0: only on demand and at shutdown)
+        window_s (int): seconds covered by the rolling rates
+        max_gap_steps (int): longer jumps restart the stream (device reset, long outage) instead of counting as loss
+        warn_loss_rate (float): summary lines are WARNING when the rolling loss rate reaches this
+    """
+    link_cfg = CONFIG.get("link_stats", {}) or {}
+    return {
+        "enable": bool(link_cfg.get("enable", True)),
+        "log_interval_s": float(link_cfg.get("log_interval_s", 60)),
+        "window_s": int(link_cfg.get("window_s", 60)),
+        "max_gap_steps": int(link_cfg.get("max_gap_steps", 500)),
+        "warn_loss_rate": float(link_cfg.get("warn_loss_rate", 0.05))
+    }
 
 # IMU CONFIGURATION
 def get_sync_config() -> dict:
     """
     Returns synchronization configuration dictionary from config.yaml
     Keys:
+        mode (str): "skew" (drop unaligned triplets) or "interp" (resample both wrists on a common grid)
         max_skew_ms (int): max desync between wrists
         stale_ms (int): drops old wrist data if the other wrist doesn't send data
+        rate_hz (float): interp grid rate
+        max_gap_ms (int): interp does not bridge gaps longer than this
+        block_size (int): interp grid points emitted per block
+        history (int): interp samples kept per wrist and kind
+        fused_listener (bool): one listener per wrist, acc/gyr/quat pushed to the synchronizer as a triplet
+        fast_decode (bool): fused listener fed by the struct decoders of sensors/fast_decode.py (no SDK samples)
+        device_timestamps (bool): align on the device sample timestamps mapped to host time (clock_sync.py)
+        clock_fit_window (int): samples weighing in the device/host clock fit (exponential forgetting)
+        clock_fit_min (int): samples before the fit replaces arrival times
+        clock_max_residual_ms (int): the fit is restarted when arrivals drift further than this from it
     """
     sync_cfg = CONFIG.get("sync", {}) or {}
     return {
+        "mode": str(sync_cfg.get("mode", "skew")).lower(),
         "max_skew_ms": int(sync_cfg.get("max_skew_ms", 25)),
-        "stale_ms": int(sync_cfg.get("stale_ms", 100))
+        "stale_ms": int(sync_cfg.get("stale_ms", 100)),
+        "rate_hz": float(sync_cfg.get("rate_hz", 50)),
+        "max_gap_ms": int(sync_cfg.get("max_gap_ms", 100)),
+        "block_size": int(sync_cfg.get("block_size", 4)),
+        "history": int(sync_cfg.get("history", 64)),
+        "fused_listener": bool(sync_cfg.get("fused_listener", True)),
+        "fast_decode": bool(sync_cfg.get("fast_decode", True)),
+        "device_timestamps": bool(sync_cfg.get("device_timestamps", True)),
+        "clock_fit_window": int(sync_cfg.get("clock_fit_window", 500)),
+        "clock_fit_min": int(sync_cfg.get("clock_fit_min", 20)),
+        "clock_max_residual_ms": int(sync_cfg.get("clock_max_residual_ms", 500))
     }
 
 # BUFFER CONFIGURATION
@@ -97,13 +358,62 @@ def get_buffer_config() -> dict:
         hop_size (int): buffer overlap samples
         calibration_windows (int): number of windows to wait for calibration
         gate_actuation_during_calibration (bool): prevents actuation if not calibrated
+        layout (str): window assembly layout, "channel" (default) or "row"
     """
     buff_cfg = CONFIG.get("buffer", {}) or {}
     return {
         "window_size": int(buff_cfg.get("window_size", 150)),
         "overlap": int(buff_cfg.get("overlap", 75)),
         "debug_print_buffer": bool(buff_cfg.get("debug_print_buffer", True)),
-        "debug_print_features": bool(buff_cfg.get("debug_print_features", True))
+        "debug_print_features": bool(buff_cfg.get("debug_print_features", True)),
+        "layout": str(buff_cfg.get("layout", "channel")).lower()
+    }
+
+# WINDOW PROCESSING CONFIGURATION
+def get_processing_config() -> dict:
+    """
+    Returns window processing stage configuration dictionary from config.yaml
+    Keys:
+        worker (bool): run processing/classification on a dedicated thread instead of the BLE callback
+        queue_size (int): windows that can wait for the worker
+        overflow (str): "drop_oldest", "drop_newest" or "block" when the queue is full
+        block_timeout_ms (int): max wait for a free slot with overflow "block"
+        backend (str): feature extraction, "c" (libProcessDataWristsQuat.so), "numpy" or "auto"
+                       (C library when it loads and matches window_size, NumPy otherwise)
+        pool_threads (int): worker threads shared by the windows of every subject (core/subjects.py);
+                            0: one worker per subject with a single subject, min(subjects, CPUs) otherwise
+    """
+    proc_cfg = CONFIG.get("processing", {}) or {}
+    return {
+        "worker": bool(proc_cfg.get("worker", True)),
+        "queue_size": int(proc_cfg.get("queue_size", 4)),
+        "overflow": str(proc_cfg.get("overflow", "drop_oldest")).lower(),
+        "block_timeout_ms": int(proc_cfg.get("block_timeout_ms", 50)),
+        "backend": str(proc_cfg.get("backend", "auto")).lower(),
+        "pool_threads": int(proc_cfg.get("pool_threads", 0))
+    }
+
+# ACTIVITY GATE CONFIGURATION
+def get_activity_gate_config() -> dict:
+    """
+    Returns the activity gate configuration dictionary from config.yaml (data_pipeline/data_buffer.py)
+    Keys:
+        enable (bool): still windows whose posture has not moved since the last processed still window skip
+                       feature extraction and classification, the result of that window is repeated for them
+        acc_std_g (float): still when the standard deviation of the acceleration norm of each wrist
+                           over the window is at most this (g)
+        gyr_std_dps (float): same for the angular rate norm (dps)
+        acc_drift_g (float): max change of each component of each wrist's mean acceleration from the
+                             reference window (g)
+        angle_drift_deg (float): max rotation of each wrist's mean orientation from the reference window (deg)
+    """
+    gate_cfg = CONFIG.get("activity_gate", {}) or {}
+    return {
+        "enable": bool(gate_cfg.get("enable", False)),
+        "acc_std_g": max(0.0, float(gate_cfg.get("acc_std_g", 0.01))),
+        "gyr_std_dps": max(0.0, float(gate_cfg.get("gyr_std_dps", 1.0))),
+        "acc_drift_g": max(0.0, float(gate_cfg.get("acc_drift_g", 0.02))),
+        "angle_drift_deg": max(0.0, float(gate_cfg.get("angle_drift_deg", 2.0)))
     }
 
 # ACTUATION LANGUAGE CONFIGURATION
@@ -0,0 +1,219 @@
+# utils/device_registry.py
+# Persistent registry of the devices seen by previous scans (device_registry section of config.yaml)
+#
+# Startup used to scan every radio in a row (bluetoothctl, BlueST/bluepy, flux_led Wi-Fi) before connecting
+# to anything. Every scan now records what it found, and the next start connects to the known devices
+# directly: the managers only scan for the kinds (or BlueCoin names) the registry does not cover, and
+# RegistryRefresher rescans in the background once the system is running: right after connect_check_s for a
+# kind with a known device that did not connect, after refresh_delay_s for the others. Devices found by these
+# scans are started, known devices that neither connected nor showed up are forgotten (actuators/actuator_manager.py).
+# Known BlueCoins only get the connect_check_s rescan (by name, no scan while they stream): a node found at another
+# address replaces the stale one, which is forgotten (sensors/sensor_manager.py).
+#
+# File format (JSON, written atomically):
+#   {"version": 1, "devices": {kind: {address: {"name": str, "last_seen": epoch seconds, ...extra}}}}
+#   kinds: "bluecoin" (extra: addr_type, scan_data to rebuild the BlueST node), "metamotion", "speaker", "led"
+# Entries not seen for max_age_days are ignored (and scanned for again).
+#
+# Author: Francesco Urru
+# GitHub: https://github.com/frarvo
+# Repository: https://github.com/frarvo/STOPme
+# License: MIT
+
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from utils.config import get_device_registry_config
+from utils.logger import log_system
+
+KINDS = ("bluecoin", "metamotion", "speaker", "led")
+_VERSION = 1
+
+
+class DeviceRegistry:
+    """
+    Known devices per kind, keyed by address (MAC or IP). Thread-safe, saved on every record().
+    """
+
+    def __init__(self, path: str, max_age_days: float = 30.0):
+        self.path = Path(path).expanduser()
+        self.max_age = float(max_age_days) * 86400.0
+        self._lock = threading.Lock()
+        self._devices: Dict[str, Dict[str, dict]] = {k: {} for k in KINDS}
+        self._load()
+
+    def _load(self) -> None:
+        try:
+            with open(self.path, "r") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return
+        except Exception as e:
+            log_system(f"[DeviceRegistry] Can't read {self.path}, starting empty: {e}", level="WARNING")
+            return
+        if not isinstance(data, dict) or data.get("version") != _VERSION:
+            log_system(f"[DeviceRegistry] Unknown format in {self.path}, starting empty", level="WARNING")
+            return
+        for kind, entries in (data.get("devices") or {}).items():
+            if kind in self._devices and isinstance(entries, dict):
+                self._devices[kind] = {str(a): e for a, e in entries.items() if isinstance(e, dict)}
+        log_system(f"[DeviceRegistry] Loaded {self.path}: " +
+                   ", ".join(f"{k}={len(v)}" for k, v in self._devices.items()))
+
+    def _save_locked(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(self.path.suffix + ".tmp")
+        with open(tmp, "w") as f:
+            json.dump({"version": _VERSION, "devices": self._devices}, f, indent=1, sort_keys=True)
+        os.replace(tmp, self.path)
+
+    def known(self, kind: str) -> Dict[str, dict]:
+        """
+        Returns {address: entry} of the devices of this kind seen within max_age_days, most recent first.
+        """
+        now = time.time()
+        with self._lock:
+            entries = [(a, dict(e)) for a, e in self._devices.get(kind, {}).items()
+                       if self.max_age <= 0 or now - float(e.get("last_seen", 0)) <= self.max_age]
+        entries.sort(key=lambda ae: -float(ae[1].get("last_seen", 0)))
+        return dict(entries)
+
+    def record(self, kind: str, devices: Dict[str, dict]) -> None:
+        """
+        Stores the devices just found by a scan ({address: {"name": ..., extra fields}}) and saves the file.
+        """
+        if not devices:
+            return
+        now = time.time()
+        with self._lock:
+            bucket = self._devices.setdefault(kind, {})
+            for address, info in devices.items():
+                entry = dict(info or {})
+                entry["last_seen"] = now
+                bucket[str(address)] = entry
+            try:
+                self._save_locked()
+            except Exception as e:
+                log_system(f"[DeviceRegistry] Can't write {self.path}: {e}", level="ERROR")
+
+    def touch(self, kind: str, address: str) -> None:
+        """
+        Marks a known device as seen now (successful direct connection), so it does not expire.
+        """
+        with self._lock:
+            entry = self._devices.get(kind, {}).get(address)
+            if entry is None:
+                return
+            entry["last_seen"] = time.time()
+            try:
+                self._save_locked()
+            except Exception as e:
+                log_system(f"[DeviceRegistry] Can't write {self.path}: {e}", level="ERROR")
+
+    def seen_since(self, kind: str, address: str, since: float) -> bool:
+        """
+        True when the device was recorded or connected (touch) at or after since (epoch seconds).
+        """
+        with self._lock:
+            entry = self._devices.get(kind, {}).get(address)
+            return entry is not None and float(entry.get("last_seen", 0)) >= since
+
+    def forget(self, kind: str, address: str) -> None:
+        with self._lock:
+            if self._devices.get(kind, {}).pop(address, None) is None:
+                return
+            try:
+                self._save_locked()
+            except Exception as e:
+                log_system(f"[DeviceRegistry] Can't write {self.path}: {e}", level="ERROR")
+
+
+_registry: Optional[DeviceRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_device_registry() -> Optional[DeviceRegistry]:
+    """
+    Shared registry as configured in config.yaml, None when device_registry.enable is off.
+    """
+    global _registry
+    cfg = get_device_registry_config()
+    if not cfg["enable"]:
+        return None
+    with _registry_lock:
+        if _registry is None:
+            _registry = DeviceRegistry(cfg["path"], cfg["max_age_days"])
+        return _registry
+
+
+def mark_seen(kind: str, address: str) -> None:
+    """
+    Called by the device threads on every successful connection. No-op when the registry is off.
+    """
+    try:
+        registry = get_device_registry()
+        if registry is not None:
+            registry.touch(kind, str(address))
+    except Exception as e:
+        log_system(f"[DeviceRegistry] {type(e).__name__}: {e}", level="ERROR")
+
+
+class RegistryRefresher(threading.Thread):
+    """
+    Runs the scans that startup skipped in the background.
+    scans: list of (label, refresh, pending). refresh() scans, records into the registry and acts on the result
+    (takes the scan lock it needs itself); pending() returns the known devices of the scan that have not
+    connected yet. check_s after start the scans with pending devices run, delay_s after start the others.
+    """
+
+    def __init__(self, scans: List[tuple], delay_s: Optional[float] = None, check_s: Optional[float] = None):
+        super().__init__(daemon=True, name="RegistryRefresher")
+        cfg = get_device_registry_config()
+        self.scans: List[tuple] = list(scans)
+        self.delay_s = float(cfg["refresh_delay_s"] if delay_s is None else delay_s)
+        self.check_s = float(cfg["connect_check_s"] if check_s is None else check_s)
+        self.stop_event = threading.Event()
+
+    def start(self) -> None:
+        if not self.scans or (self.delay_s <= 0 and self.check_s <= 0):
+            return
+        super().start()
+
+    def run(self) -> None:
+        done = set()
+        if self.check_s > 0:
+            if self.stop_event.wait(self.check_s):
+                return
+            for i, (label, refresh, pending) in enumerate(self.scans):
+                if self.stop_event.is_set():
+                    return
+                missing = pending()
+                if missing:
+                    log_system(f"[DeviceRegistry] Known {label} not connected after {self.check_s:g}s: {missing}, "
+                               f"scanning", level="WARNING")
+                    self._refresh(label, refresh)
+                    done.add(i)
+        if self.delay_s <= 0 or self.stop_event.wait(max(0.0, self.delay_s - max(self.check_s, 0.0))):
+            return
+        for i, (label, refresh, _) in enumerate(self.scans):
+            if self.stop_event.is_set():
+                return
+            if i not in done:
+                log_system(f"[DeviceRegistry] Background refresh: {label}")
+                self._refresh(label, refresh)
+
+    @staticmethod
+    def _refresh(label: str, refresh) -> None:
+        try:
+            refresh()
+        except Exception as e:
+            log_system(f"[DeviceRegistry] Background refresh of {label} failed: {e}", level="ERROR")
+
+    def stop(self) -> None:
+        self.stop_event.set()
+        if self.is_alive() and threading.current_thread() is not self:
+            self.join()
@@ -24,6 +24,12 @@ def get_event_queue() -> Queue:
     """
     return _event_queue
 
+def create_event_queue() -> Queue:
+    """
+    Returns a new queue for activity events, same limit as the global one (one per subject, core/subjects.py).
+    """
+    return Queue(maxsize=MAX_Q_SIZE)
+
 def enqueue_drop_oldest(q: Queue, item, kind:Optional[str] = None) -> Tuple[bool, Optional[Any]]:
     """
     Enque 'item'. If queue is full, drops the oldest item. Reduces latency
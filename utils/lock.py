@@ -6,10 +6,83 @@
 # Repository: https://github.com/frarvo/STOPme
 # License: MIT
 
+import fcntl
+import os
+import tempfile
 import threading
+import time
+
+# One lock per radio ("hci0" adapter, "wifi"): scans and connections on the same radio run one at a time,
+# different radios don't wait for each other (startup section of config.yaml, core/startup.py).
+# Reentrant, so a startup step holding its radio can call code taking the same lock.
+# With ingest processes (ingest.mode "process") the BlueCoin radio lock is a FileRadioLock shared with them.
+_radio_locks = {}
+_radio_locks_guard = threading.Lock()
+
+def radio_lock(radio: str) -> threading.RLock:
+    with _radio_locks_guard:
+        lock = _radio_locks.get(radio)
+        if lock is None:
+            lock = _radio_locks[radio] = threading.RLock()
+        return lock
+
+
+class FileRadioLock:
+    """
+    Radio lock shared with other processes (sensors/ingest_process.py): a thread RLock inside the process,
+    an flock on a lock file across processes. The kernel drops the flock when its process dies, so a killed
+    ingest process never leaves the radio locked. Same acquire/release/with interface as threading.RLock.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.RLock()
+        self._depth = 0
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+
+    def acquire(self, blocking: bool = True, timeout: float = -1) -> bool:
+        deadline = None if not blocking or timeout is None or timeout < 0 else time.monotonic() + timeout
+        if not self._local.acquire(blocking, -1 if deadline is None else timeout):
+            return False
+        if self._depth == 0:
+            while True:
+                try:
+                    fcntl.flock(self._fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    break
+                except BlockingIOError:
+                    if not blocking or (deadline is not None and time.monotonic() >= deadline):
+                        self._local.release()
+                        return False
+                    time.sleep(0.01)
+        self._depth += 1
+        return True
+
+    def release(self) -> None:
+        self._depth -= 1
+        if self._depth == 0:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+        self._local.release()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+def use_process_radio_lock(radio: str) -> FileRadioLock:
+    """
+    Replaces the lock of radio with a FileRadioLock on <tmp>/stopme-radio-<radio>.lock, so processes that
+    all call this exclude each other on the radio. Call before the radio is used.
+    """
+    with _radio_locks_guard:
+        lock = _radio_locks.get(radio)
+        if not isinstance(lock, FileRadioLock):
+            path = os.path.join(tempfile.gettempdir(), f"stopme-radio-{radio}.lock")
+            lock = _radio_locks[radio] = FileRadioLock(path)
+        return lock
 
-device_scan_lock = threading.Lock()
 device_connection_lock = threading.Lock()
-device_reconnection_lock = threading.RLock()
 
 logging_lock = threading.Lock()
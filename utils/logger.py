@@ -1,9 +1,17 @@
+import atexit
 import os
+import re
+import threading
+import time
 from datetime import datetime
 from pathlib import Path
+from typing import Dict, Tuple
+from queue import SimpleQueue, Empty
 from utils.lock import logging_lock
 from utils.config import (
     get_log_path,
+    get_log_writer_config,
+    get_log_levels,
     actuation_details_enabled,
     system_log_enabled,
     debug_system_console_enabled,
@@ -76,22 +84,170 @@ def log_events(timestamp: str, feature_type: str, event: str, actuations: list,
                 f.write(header)
             f.write(line_csv)
 
+class _LogWriter(threading.Thread):
+    """
+    Background writer for system log records.
+    Callers enqueue preformatted lines without blocking; this thread prints them to the console if requested,
+    keeps one open handle per log file (rotated when the day changes) and flushes in batches:
+    every batch_size records, every flush_interval_ms, and on shutdown.
+    """
+    _STOP = object()
+
+    def __init__(self, batch_size: int, flush_interval_ms: int):
+        super().__init__(daemon=True, name="LogWriter")
+        self.batch_size = max(1, int(batch_size))
+        self.flush_interval = max(1, int(flush_interval_ms)) / 1000.0
+        self._q = SimpleQueue()
+        self._files = {}    # filename -> (day, handle)
+
+    def submit(self, day: str, filename: str, line: str, console: bool, to_file: bool) -> None:
+        self._q.put((day, filename, line, console, to_file))
+
+    def close(self) -> None:
+        self._q.put(self._STOP)
+        if threading.current_thread() is not self and self.is_alive():
+            self.join()
+
+    def run(self) -> None:
+        pending = 0
+        last_flush = time.monotonic()
+        while True:
+            try:
+                rec = self._q.get(timeout=self.flush_interval)
+            except Empty:
+                rec = None
+            if rec is self._STOP:
+                break
+            if rec is not None:
+                self._write(rec)
+                pending += 1
+            if pending and (pending >= self.batch_size or time.monotonic() - last_flush >= self.flush_interval):
+                self._flush()
+                pending = 0
+                last_flush = time.monotonic()
+
+        # Shutdown: write what is left, flush and close
+        while True:
+            try:
+                rec = self._q.get_nowait()
+            except Empty:
+                break
+            if rec is not self._STOP:
+                self._write(rec)
+        for _, handle in self._files.values():
+            try:
+                handle.close()
+            except Exception:
+                pass
+        self._files.clear()
+
+    def _write(self, rec) -> None:
+        day, filename, line, console, to_file = rec
+        if console:
+            print(line.strip())
+        if not to_file:
+            return
+        try:
+            entry = self._files.get(filename)
+            if entry is None or entry[0] != day:
+                if entry is not None:
+                    entry[1].close()
+                folder = Path(get_log_path()) / day
+                _ensure_dir(folder)
+                entry = (day, open(folder / filename, "a", buffering=64 * 1024))
+                self._files[filename] = entry
+            entry[1].write(line)
+        except Exception as e:
+            print(f"[logger] Log write failed: {type(e).__name__}: {e}")
+
+    def _flush(self) -> None:
+        for _, handle in self._files.values():
+            try:
+                handle.flush()
+            except Exception:
+                pass
+
+
+_writer: _LogWriter = None
+_writer_lock = threading.Lock()
+_writer_closed = False
+
+def _get_writer():
+    """
+    Return the background writer, starting it on first use. None if disabled or shut down.
+    """
+    global _writer
+    if _writer is not None or _writer_closed:
+        return _writer
+    cfg = get_log_writer_config() or {}
+    if not cfg.get("async", True):
+        return None
+    with _writer_lock:
+        if _writer is None and not _writer_closed:
+            writer = _LogWriter(cfg.get("batch_size", 256), cfg.get("flush_interval_ms", 500))
+            writer.start()
+            _writer = writer
+    return _writer
+
+def shutdown_logging():
+    """
+    Flush and close the background log writer. Later messages are written synchronously.
+    Registered with atexit, can also be called explicitly at shutdown.
+    """
+    global _writer, _writer_closed
+    with _writer_lock:
+        writer, _writer = _writer, None
+        _writer_closed = True
+    if writer is not None:
+        writer.close()
+
+atexit.register(shutdown_logging)
+
+# Log levels (thresholds per module tag from log_levels in config.yaml)
+LEVELS = {"DEBUG": 10, "INFO": 20, "WARNING": 30, "ERROR": 40}
+
+def _level_threshold(tag: str = None) -> int:
+    levels = get_log_levels() or {}
+    name = levels.get(tag) if tag is not None else None
+    if name is None:
+        name = levels.get("default", "INFO")
+    return LEVELS.get(str(name).upper(), LEVELS["INFO"])
+
+_default_threshold = _level_threshold()
+
 def log_system(message: str, level: str = "INFO"):
     """
     Log a system-level message to the system log file.
+    Messages below the default threshold (log_levels.default) are discarded.
 
     Parameters:
         message (str): Log message
-        level (str): One of 'INFO', 'WARNING', 'ERROR'
+        level (str): One of 'DEBUG', 'INFO', 'WARNING', 'ERROR'
+    """
+    if LEVELS.get(level.upper(), LEVELS["INFO"]) < _default_threshold:
+        return
+    _emit(message, level)
+
+def _emit(message: str, level: str):
+    """
+    Write one system log record.
+    The record is handed to the background writer (no file I/O on the caller thread) unless
+    log_writer.async is false or logging was shut down.
     """
-    date = datetime.now().strftime("%d-%m-%Y")
-    time = datetime.now().strftime("%H:%M:%S")
-    line = f"[{date} {time}] - {level.upper()} - {message}\n"
+    stamp = datetime.now().strftime("%d-%m-%Y %H:%M:%S")
+    line = f"[{stamp}] - {level.upper()} - {message}\n"
+    console = debug_system_console_enabled()
+    to_file = system_log_enabled()
+
+    writer = _get_writer()
+    if writer is not None:
+        writer.submit(stamp[:10], "System_Log.log", line, console, to_file)
+        return
 
-    if debug_system_console_enabled():
+    if console:
         print(line.strip())
 
-    if not system_log_enabled():
+    if not to_file:
         return
 
     log_base = Path(get_log_path())
@@ -101,9 +257,83 @@ def log_system(message: str, level: str = "INFO"):
         with open(filepath, "a") as f:
             f.write(line)
 
-_last_event_timestamp: datetime = None
-_last_event_file: Path = None
-_last_event_line_idx: int = None
+class SystemLogger:
+    """
+    Leveled system logger for one module tag, e.g. get_logger("DataBuffer") logs "[DataBuffer] ..." lines.
+    The threshold comes from log_levels.<tag> in config.yaml (log_levels.default otherwise).
+    Formatting is deferred: pass %-style args or a callable returning the message.
+    Messages below the threshold are never formatted.
+
+        log = get_logger("Classifier")
+        log.debug("Event enqueued: %s", event)
+        log.debug(lambda: ", ".join(f"{x:.4f}" for x in features))
+    """
+
+    def __init__(self, tag: str):
+        self.tag = tag
+        self._prefix = f"[{tag}] "
+        self.threshold = _level_threshold(tag)
+
+    def is_enabled_for(self, level: str) -> bool:
+        return LEVELS.get(level.upper(), LEVELS["INFO"]) >= self.threshold
+
+    def log(self, level: str, msg, *args) -> None:
+        if LEVELS.get(level, LEVELS["INFO"]) < self.threshold:
+            return
+        if callable(msg):
+            msg = msg()
+        elif args:
+            msg = msg % args
+        _emit(self._prefix + msg, level)
+
+    def debug(self, msg, *args) -> None:
+        if self.threshold <= 10:
+            self.log("DEBUG", msg, *args)
+
+    def info(self, msg, *args) -> None:
+        if self.threshold <= 20:
+            self.log("INFO", msg, *args)
+
+    def warning(self, msg, *args) -> None:
+        self.log("WARNING", msg, *args)
+
+    def error(self, msg, *args) -> None:
+        self.log("ERROR", msg, *args)
+
+
+_loggers = {}
+
+def get_logger(tag: str) -> SystemLogger:
+    """
+    Returns the SystemLogger for a module tag (one instance per tag).
+    """
+    logger = _loggers.get(tag)
+    if logger is None:
+        logger = _loggers.setdefault(tag, SystemLogger(tag))
+    return logger
+
+# Event diary (append-only)
+# Each event is appended to Event_Diary_<source>.log as soon as it is logged:
+#   [dd-mm-YYYY HH:MM:SS] - FEATURE - EVENT - ACTUATIONS
+# When the next event of the same source (subject) arrives the previous interval is closed with a separate
+# record, appended to the file that holds the previous event:
+#   [dd-mm-YYYY HH:MM:SS] - END - EVENT - Duration: MM:SS
+# The CSV view (date,timestamp,feature,event,actuation,duration) is derived from the .log on demand
+# (build_event_csv, or from the command line: python -m utils.logger --csv Event_Diary_<source>.log [...])
+# and for every diary written in this session by close_event_diary, called once by main.py at shutdown.
+_END_TAG = "END"
+_CSV_HEADER = "date,timestamp,feature,event,actuation,duration\n"
+_LEGACY_DURATION = re.compile(r"\s?-\s?Duration: (\d+:\d+)$")
+
+# Open interval per source: (timestamp, diary file, label) of its last event
+_last_events: Dict[str, Tuple[datetime, Path, str]] = {}
+_diary_files: set = set()
+
+def _format_duration(delta) -> str:
+    total_seconds = int(delta.total_seconds())
+    minutes = total_seconds // 60
+    seconds = total_seconds % 60
+    return f"{minutes:02d}:{seconds:02d}"
 
 def log_event(timestamp: str,
               feature_type: str,
@@ -111,7 +341,8 @@ def log_event(timestamp: str,
               actuations: list,
               source: str):
     """
-    Log a new sensor event to file, and retroactively add duration to the previous one if it exists.
+    Append a new sensor event to the event diary and close the previous one with its duration.
+    Constant cost per event: two appends at most, no file is read or rewritten.
 
     Parameters:
         timestamp (str): ISO8601 timestamp
@@ -120,15 +351,11 @@ def log_event(timestamp: str,
         actuations (list): list of dicts with 'target' and 'params'
         source (str): e.g. 'BC_Temperature'
     """
-    global _last_event_timestamp, _last_event_file, _last_event_line_idx
-
     log_base = Path(get_log_path())
     folder = _get_day_folder(log_base)
 
     log_filename = f"Event_Diary_{source}.log"
     log_path = folder / log_filename
-    csv_filename = f"Event_Diary_{source}.csv"
-    csv_path = folder / csv_filename
 
     try:
         now = datetime.fromisoformat(timestamp)
@@ -150,81 +377,89 @@ def log_event(timestamp: str,
         actions.append(formatted)
     action_str = ", ".join(actions)
 
-    if (_last_event_timestamp is not None and
-        _last_event_file is not None and
-        _last_event_line_idx is not None):
-
-        prev_log_path = _last_event_file
-        with logging_lock:
-            with open(prev_log_path, "r") as f_log:
-                log_lines = f_log.readlines()
-
-        if 0 <= _last_event_line_idx < len(log_lines):
-            delta = now - _last_event_timestamp
-            total_seconds = int(delta.total_seconds())
-            minutes = total_seconds // 60
-            seconds = total_seconds % 60
-            duration_str = f"{minutes:02d}:{seconds:02d}"
-
-            old_log_line = log_lines[_last_event_line_idx].rstrip("\n")
-            log_lines[_last_event_line_idx] = old_log_line + f" - Duration: {duration_str}\n"
-
-            with logging_lock:
-                with open(prev_log_path, "w") as f_log:
-                    f_log.writelines(log_lines)
-
-            prev_csv_path = prev_log_path.with_suffix(".csv")
-            if not prev_csv_path.exists():
-                header = "date,timestamp,feature,event,actuation,duration\n"
-
-                with logging_lock:
-                    with open(prev_csv_path, "w") as f_csv:
-                        f_csv.write(header)
-
-            with logging_lock:
-                with open(prev_csv_path, "r") as f_csv:
-                    csv_lines = f_csv.readlines()
-
-            prev_csv_idx = _last_event_line_idx + 1
-            if 0 <= prev_csv_idx < len(csv_lines):
-                old_csv_line = csv_lines[prev_csv_idx].rstrip("\n")
-                csv_lines[prev_csv_idx] = old_csv_line + f",{duration_str}\n"
-                with logging_lock:
-                    with open(prev_csv_path, "w") as f_csv:
-                        f_csv.writelines(csv_lines)
-            else:
-                log_system("[logger] CSV line index out of range; skipping duration update", level="WARNING")
-        else:
-            log_system("[logger] Log line index out of range; skipping duration update", level="WARNING")
-
     line_txt = f"[{date_str} {time_str}] - {feature_type.upper()} - {event} - {action_str}\n"
+
     with logging_lock:
+        # Close the previous interval of this source
+        last = _last_events.get(source)
+        if last is not None:
+            last_timestamp, last_file, last_label = last
+            duration_str = _format_duration(now - last_timestamp)
+            end_txt = f"[{date_str} {time_str}] - {_END_TAG} - {last_label} - Duration: {duration_str}\n"
+            with open(last_file, "a") as f_log:
+                f_log.write(end_txt)
+
         with open(log_path, "a") as f_log:
             f_log.write(line_txt)
 
+        _last_events[source] = (now, log_path, event)
+        _diary_files.add(log_path)
+
     if debug_event_console_enabled():
         print(line_txt.strip())
 
-    if not csv_path.exists():
-        header = "date,timestamp,feature,event,actuation,duration\n"
-        with logging_lock:
-            with open(csv_path, "w") as f_csv:
-                f_csv.write(header)
-
-    csv_line = f"{date_str},{time_str},{feature_type},{event},\"{action_str}\",\n"
+def build_event_csv(log_path, csv_path=None) -> Path:
+    """
+    Build the CSV view of an event diary (.log), pairing each event with its closing duration record.
+    Returns the CSV path (defaults to the .log path with .csv suffix).
+    """
+    log_path = Path(log_path)
+    csv_path = Path(csv_path) if csv_path is not None else log_path.with_suffix(".csv")
 
+    rows = []       # [date, time, feature, event, actuation, duration]
+    open_row = None
     with logging_lock:
-        with open(csv_path, "a") as f_csv:
-            f_csv.write(csv_line)
-
-    try:
-        with logging_lock:
-            with open(log_path, "r") as f:
-                log_lines = f.readlines()
-        prev_count = len(log_lines) - 1
-    except Exception:
-        prev_count = 0
-
-    _last_event_timestamp = now
-    _last_event_file = log_path
-    _last_event_line_idx = prev_count
\ No newline at end of file
+        with open(log_path, "r") as f_log:
+            lines = f_log.readlines()
+
+    for line in lines:
+        line = line.rstrip("\n")
+        if not line.startswith("[") or "] - " not in line:
+            continue
+        stamp, rest = line[1:].split("] - ", 1)
+        parts = rest.split(" - ", 2)
+        if len(parts) < 2:
+            continue
+        if parts[0] == _END_TAG:
+            if open_row is not None and len(parts) == 3 and parts[2].startswith("Duration: "):
+                open_row[5] = parts[2][len("Duration: "):]
+            open_row = None
+            continue
+        date_str, _, time_str = stamp.partition(" ")
+        action_str = parts[2] if len(parts) > 2 else ""
+        # Diaries written before the append-only format carry the duration on the event line
+        legacy = _LEGACY_DURATION.search(action_str)
+        duration = ""
+        if legacy:
+            action_str, duration = action_str[:legacy.start()], legacy.group(1)
+        open_row = [date_str, time_str, parts[0].lower(), parts[1], action_str, duration]
+        rows.append(open_row)
+
+    with open(csv_path, "w") as f_csv:
+        f_csv.write(_CSV_HEADER)
+        for date_str, time_str, feature, event, action_str, duration in rows:
+            f_csv.write(f"{date_str},{time_str},{feature},{event},\"{action_str}\",{duration}\n")
+    return csv_path
+
+def close_event_diary():
+    """
+    Build the CSV view of every event diary written in this session. Call once at shutdown (main.py).
+    """
+    for log_path in sorted(_diary_files):
+        try:
+            build_event_csv(log_path)
+        except Exception as e:
+            log_system(f"[logger] Event CSV build failed for {log_path}: {e}", level="WARNING")
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Build the CSV view of event diaries")
+    parser.add_argument("--csv", metavar="LOG", nargs="+", required=True,
+                        help="event diary files (Event_Diary_<source>.log)")
+    parser.add_argument("--out", metavar="CSV", help="output file (single diary only, default: LOG with .csv suffix)")
+    args = parser.parse_args()
+    if args.out and len(args.csv) > 1:
+        parser.error("--out needs a single diary")
+    for path in args.csv:
+        print(build_event_csv(path, args.out))
@@ -0,0 +1,248 @@
+# utils/reconnect.py
+# Per-device reconnection supervisor (reconnect section of config.yaml)
+#
+# The BlueCoin, LED strip, MetaMotion and speaker threads used to run their whole retry loop inside the
+# process-wide device_reconnection_lock: one device down (LED slow retries sleeping retry_sleep, speaker waiting
+# on its stop event) kept every other device, on any radio, from reconnecting. Each device now has a Reconnector
+# with its own state machine:
+#   connected -> disconnected -> connecting <-> waiting -> connected   (stopped when the thread is stopping)
+# Only a connection attempt holds the radio lock of the device kind (utils/lock.py radio_lock, radios in the
+# startup section): devices on the same adapter still connect one at a time, the waits between attempts hold
+# nothing, devices on other radios never wait.
+# Waits follow a Backoff: fast_attempts at the initial wait, then growing by backoff_factor up to the max wait,
+# every wait randomized by +/- jitter so devices dropped together (bus reset, walking out of range) spread out.
+# Metrics per device (attempts, failures, outages, downtime, state) are read by get_reconnect_stats() and logged
+# by log_reconnect_stats() (SIGUSR1 in main.py, shutdown) and every log_interval_s while a device is down.
+#
+# Author: Francesco Urru
+# GitHub: https://github.com/frarvo
+# Repository: https://github.com/frarvo/STOPme
+# License: MIT
+
+import random
+import threading
+import time
+from typing import Callable, Dict, Optional, Tuple
+
+from utils.config import get_reconnect_config, get_startup_config
+from utils.lock import radio_lock
+from utils.logger import log_system
+
+CONNECTED = "connected"
+DISCONNECTED = "disconnected"
+CONNECTING = "connecting"
+WAITING = "waiting"
+STOPPED = "stopped"
+
+_cfg = get_reconnect_config()
+
+
+class Backoff:
+    """
+    Wait before retry n (n = 1 after the first failed attempt): initial_s for the first fast_attempts retries,
+    then initial_s * factor^k, randomized by +/- jitter and capped at max_s.
+    """
+
+    def __init__(self, initial_s: float, max_s: float, factor: float = 2.0, jitter: float = 0.2,
+                 fast_attempts: int = 0, rng: Optional[random.Random] = None):
+        self.initial_s = max(0.0, float(initial_s))
+        self.max_s = max(self.initial_s, float(max_s))
+        self.factor = max(1.0, float(factor))
+        self.jitter = min(max(0.0, float(jitter)), 1.0)
+        self.fast_attempts = max(0, int(fast_attempts))
+        self._rng = rng or random.Random()
+
+    def delay(self, n: int) -> float:
+        k = max(0, n - self.fast_attempts)
+        base = self.max_s if k > 64 else min(self.max_s, self.initial_s * self.factor ** k)
+        if self.jitter:
+            base *= 1.0 + self.jitter * (2.0 * self._rng.random() - 1.0)
+        return min(base, self.max_s)
+
+
+class Reconnector:
+    """
+    Reconnection state and metrics of one device.
+        mark_connected(): first connection done by the device thread
+        reconnect(attempt, stop_event): retries attempt() (True/False, exceptions count as failures) until it
+                                        succeeds (True) or stop_event is set (False)
+    """
+
+    def __init__(self, kind: str, device_id: str, radio: Optional[str], backoff: Backoff):
+        self.kind = kind
+        self.device_id = device_id
+        self.radio = radio
+        self.backoff = backoff
+        self.state = DISCONNECTED
+        self.attempts = 0
+        self.failures = 0
+        self.reconnections = 0
+        self.outages = 0
+        self.last_error: Optional[str] = None
+        self.last_outage_s = 0.0
+        self.total_down_s = 0.0
+        self.lock_wait_s = 0.0          # time spent waiting for other devices on the same radio
+        self._down_since: Optional[float] = None
+        self._was_connected = False     # first connections (speaker run loop) are not outages
+        self._retry_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def _tag(self) -> str:
+        return f"[Reconnect: {self.kind} {self.device_id}]"
+
+    def mark_connected(self) -> None:
+        with self._lock:
+            self.state = CONNECTED
+            self._was_connected = True
+            self._down_since = None
+            self._retry_at = None
+
+    def reconnect(self, attempt: Callable[[], bool], stop_event: threading.Event) -> bool:
+        now = time.monotonic()
+        with self._lock:
+            if self._down_since is None:
+                self._down_since = now
+                self.outages += self._was_connected
+            self.state = DISCONNECTED
+        lock = radio_lock(self.radio) if self.radio else None
+        interval = _cfg["log_interval_s"]
+        next_log = now + interval if interval > 0 else None
+        n = 0
+        while not stop_event.is_set():
+            # Only the attempt itself excludes the other devices on the radio; stop stays responsive
+            if lock is not None:
+                t0 = time.monotonic()
+                while not lock.acquire(timeout=0.5):
+                    if stop_event.is_set():
+                        return self._stopped()
+                self.lock_wait_s += time.monotonic() - t0
+            try:
+                with self._lock:
+                    self.state = CONNECTING
+                    self.attempts += 1
+                n += 1
+                try:
+                    ok = bool(attempt())
+                    error = None if ok else "attempt failed"
+                except Exception as e:
+                    ok, error = False, f"{type(e).__name__}: {e}"
+            finally:
+                if lock is not None:
+                    lock.release()
+
+            if ok:
+                with self._lock:
+                    down = time.monotonic() - self._down_since
+                    verb = "Reconnected" if self._was_connected else "Connected"
+                    if self._was_connected:
+                        self.reconnections += 1
+                        self.last_outage_s = down
+                        self.total_down_s += down
+                    self.state = CONNECTED
+                    self._was_connected = True
+                    self._down_since = None
+                    self._retry_at = None
+                log_system(f"{self._tag()} {verb} after {down:.1f}s ({n} attempt{'s' if n != 1 else ''})")
+                return True
+
+            delay = self.backoff.delay(n)
+            with self._lock:
+                self.failures += 1
+                self.last_error = error
+                self.state = WAITING
+                self._retry_at = time.monotonic() + delay
+            log_system(f"{self._tag()} Attempt {n} failed ({error}), next in {delay:.1f}s", level="WARNING")
+            if next_log is not None and time.monotonic() >= next_log:
+                next_log = time.monotonic() + interval
+                log_reconnect_stats()
+            if stop_event.wait(delay):
+                break
+        return self._stopped()
+
+    def _stopped(self) -> bool:
+        with self._lock:
+            if self._down_since is not None and self._was_connected:
+                self.total_down_s += time.monotonic() - self._down_since
+            self._down_since = None
+            self.state = STOPPED
+            self._retry_at = None
+        return False
+
+    def get_stats(self) -> Dict[str, object]:
+        now = time.monotonic()
+        with self._lock:
+            down = now - self._down_since if self._down_since is not None and self._was_connected else 0.0
+            return {
+                "kind": self.kind,
+                "radio": self.radio,
+                "state": self.state,
+                "attempts": self.attempts,
+                "failures": self.failures,
+                "reconnections": self.reconnections,
+                "outages": self.outages,
+                "down_s": down,
+                "last_outage_s": self.last_outage_s,
+                "total_down_s": self.total_down_s + down,
+                "lock_wait_s": self.lock_wait_s,
+                "next_retry_s": max(0.0, self._retry_at - now) if self._retry_at is not None else None,
+                "last_error": self.last_error,
+            }
+
+
+def backoff_for(kind: str, cfg: Optional[dict] = None) -> Backoff:
+    """
+    Backoff of a device kind: BlueCoins from the reconnect section, actuators from their own
+    fast_retry_attempts / retry_interval / retry_sleep.
+    """
+    if kind == "bluecoin" or cfg is None:
+        return Backoff(_cfg["bluecoin_initial_s"], _cfg["bluecoin_max_s"], _cfg["backoff_factor"],
+                       _cfg["jitter"], _cfg["bluecoin_fast_attempts"])
+    return Backoff(float(cfg.get("retry_interval", 5)), float(cfg.get("retry_sleep", 60)),
+                   _cfg["backoff_factor"], _cfg["jitter"], int(cfg.get("fast_retry_attempts", 5)))
+
+
+_lock = threading.Lock()
+_reconnectors: Dict[Tuple[str, str], Reconnector] = {}
+
+
+def get_reconnector(kind: str, device_id: str, cfg: Optional[dict] = None) -> Reconnector:
+    """
+    Reconnector of a device, created on first use on the radio of its kind (startup.radios).
+    cfg: the actuator section of config.yaml (backoff_for). The same object is returned for a device
+    re-created by a rescan, metrics keep going.
+    """
+    key = (kind, str(device_id))
+    with _lock:
+        rc = _reconnectors.get(key)
+        if rc is None:
+            radio = get_startup_config()["radios"].get(kind)
+            rc = _reconnectors[key] = Reconnector(kind, str(device_id), radio, backoff_for(kind, cfg))
+        return rc
+
+
+def get_reconnect_stats() -> Dict[str, Dict[str, object]]:
+    """
+    Returns {device_id: {...}} for every device registered so far.
+    """
+    with _lock:
+        reconnectors = list(_reconnectors.values())
+    return {rc.device_id: rc.get_stats() for rc in reconnectors}
+
+
+def log_reconnect_stats() -> None:
+    """
+    Write one line per device to the system log.
+    """
+    stats = get_reconnect_stats()
+    if not stats:
+        return
+    log_system("[Reconnect] Reconnection metrics per device:")
+    for device_id in sorted(stats):
+        s = stats[device_id]
+        level = "WARNING" if s["state"] in (DISCONNECTED, CONNECTING, WAITING) else "INFO"
+        down = f" down {s['down_s']:.0f}s" if s["down_s"] else ""
+        log_system(f"[Reconnect] {s['kind']:10s} {device_id} ({s['radio']}) {s['state']}{down} | "
+                   f"outages={s['outages']} reconnections={s['reconnections']} attempts={s['attempts']} "
+                   f"failures={s['failures']} downtime={s['total_down_s']:.1f}s last={s['last_outage_s']:.1f}s "
+                   f"radio_wait={s['lock_wait_s']:.1f}s" + (f" last_error={s['last_error']}" if s["last_error"] else ""),
+                   level=level)
@@ -0,0 +1,157 @@
+# tracing.py
+# End-to-end latency tracing of processed windows, from BLE notification to actuator command.
+#
+# Each window gets a Trace that is stamped (time.monotonic(), same clock as the listeners) at every stage:
+#   arrival    newest sample of the window at the feature listener (arrival time, not the device-aligned row time)
+#   emit       synchronizer emits the row completing the window
+#   ready      window handed to the processing stage
+#   features   feature extraction done
+#   classified classifier output, event enqueued next
+#   dequeued   dispatcher takes the event from the queue
+#   trigger    ActuatorManager.trigger called
+#   executed   actuator execute() returned
+# Per-stage latencies (from the previous stage and from arrival) are kept in fixed-size log2 histograms,
+# dumped to the system log on demand (dump_traces, SIGUSR1 in main.py) and at shutdown.
+# Replayed rows carry recording timestamps, so replay uses the emit time as arrival (use_emit_as_arrival).
+#
+# Author: Francesco Urru
+# GitHub: https://github.com/frarvo
+# Repository: https://github.com/frarvo/STOPme
+# License: MIT
+
+import threading
+import time
+from typing import Dict, Optional
+
+from utils.config import get_tracing_config
+from utils.logger import log_system
+
+STAGES = ("arrival", "emit", "ready", "features", "classified", "dequeued", "trigger", "executed")
+_BINS = 24  # log2 microsecond bins: [0,1) [1,2) [2,4) ... up to ~8.4 s, last bin open-ended
+
+enabled = bool((get_tracing_config() or {}).get("enable", False))
+emit_as_arrival = False  # row timestamps are not on the time.monotonic() clock (replay)
+
+
+class _Histogram:
+    __slots__ = ("count", "total", "min", "max", "bins")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.min = float("inf")
+        self.max = 0.0
+        self.bins = [0] * _BINS
+
+    def add(self, seconds: float) -> None:
+        us = max(0, int(seconds * 1e6))
+        self.count += 1
+        self.total += seconds
+        if seconds < self.min:
+            self.min = seconds
+        if seconds > self.max:
+            self.max = seconds
+        self.bins[min(us.bit_length(), _BINS - 1)] += 1
+
+    def percentile(self, p: float) -> float:
+        """Upper edge (seconds) of the bin holding the p-th percentile."""
+        if not self.count:
+            return 0.0
+        target = p / 100.0 * self.count
+        seen = 0
+        for i, n in enumerate(self.bins):
+            seen += n
+            if seen >= target:
+                return min((1 << i) / 1e6, self.max)
+        return self.max
+
+    def summary(self) -> Dict[str, float]:
+        if not self.count:
+            return {"count": 0}
+        return {
+            "count": self.count,
+            "mean_ms": self.total / self.count * 1000.0,
+            "min_ms": self.min * 1000.0,
+            "p50_ms": self.percentile(50) * 1000.0,
+            "p90_ms": self.percentile(90) * 1000.0,
+            "p99_ms": self.percentile(99) * 1000.0,
+            "max_ms": self.max * 1000.0,
+        }
+
+
+_lock = threading.Lock()
+_step: Dict[str, _Histogram] = {s: _Histogram() for s in STAGES[1:]}      # previous stage -> stage
+_e2e: Dict[str, _Histogram] = {s: _Histogram() for s in STAGES[1:]}       # arrival -> stage
+
+
+class Trace:
+    """
+    Stage timestamps of one window. mark() records the stage latencies into the shared histograms.
+    """
+    __slots__ = ("arrival", "_last", "stamps")
+
+    def __init__(self, arrival: float):
+        self.arrival = arrival
+        self._last = arrival
+        self.stamps = {"arrival": arrival}
+
+    def mark(self, stage: str, t: Optional[float] = None) -> None:
+        if t is None:
+            t = time.monotonic()
+        self.stamps[stage] = t
+        with _lock:
+            _step[stage].add(t - self._last)
+            _e2e[stage].add(t - self.arrival)
+        self._last = t
+
+    def __repr__(self) -> str:
+        return "Trace(" + ", ".join(f"{k}=+{(v - self.arrival) * 1000.0:.2f}ms" for k, v in self.stamps.items()) + ")"
+
+
+# Trace of the window being handled by the current thread (buffer -> classifier, dispatcher -> actuators)
+_current = threading.local()
+
+def current() -> Optional[Trace]:
+    return getattr(_current, "trace", None)
+
+def set_current(trace: Optional[Trace]) -> None:
+    _current.trace = trace
+
+
+def use_emit_as_arrival() -> None:
+    global emit_as_arrival
+    emit_as_arrival = True
+
+
+def get_trace_stats() -> Dict[str, Dict[str, Dict[str, float]]]:
+    """
+    Returns per-stage latency summaries: {"step": {stage: {...}}, "e2e": {stage: {...}}}.
+    """
+    with _lock:
+        return {
+            "step": {s: h.summary() for s, h in _step.items()},
+            "e2e": {s: h.summary() for s, h in _e2e.items()},
+        }
+
+def dump_traces() -> None:
+    """
+    Write the per-stage latency histograms to the system log.
+    """
+    if not enabled:
+        return
+    stats = get_trace_stats()
+    log_system("[Tracing] Stage latencies (step = from previous stage, e2e = from sample arrival):")
+    for stage in STAGES[1:]:
+        step, e2e = stats["step"][stage], stats["e2e"][stage]
+        if not step.get("count"):
+            continue
+        log_system(f"[Tracing] {stage:10s} n={step['count']:6d} "
+                   f"step p50={step['p50_ms']:.2f} p90={step['p90_ms']:.2f} p99={step['p99_ms']:.2f} "
+                   f"max={step['max_ms']:.2f}ms | "
+                   f"e2e p50={e2e['p50_ms']:.2f} p90={e2e['p90_ms']:.2f} p99={e2e['p99_ms']:.2f} "
+                   f"max={e2e['max_ms']:.2f}ms")
+
+def reset_traces() -> None:
+    with _lock:
+        for h in list(_step.values()) + list(_e2e.values()):
+            h.__init__()